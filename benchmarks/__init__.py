@@ -0,0 +1 @@
+"""rubiq benchmarks"""
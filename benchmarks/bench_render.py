@@ -0,0 +1,25 @@
+"""
+Render benchmarks for pytest-benchmark
+
+    pytest benchmarks/bench_render.py --benchmark-json=results.json
+"""
+
+import pytest
+from rubiq.dummy import dummy_connection, dummy_context
+
+from .shapes import SHAPES
+
+pytest.importorskip('pytest_benchmark')
+
+
+@pytest.mark.parametrize('shape', sorted(SHAPES))
+def test_build(benchmark, shape):
+    benchmark.group = 'build'
+    benchmark(SHAPES[shape])
+
+
+@pytest.mark.parametrize('shape', sorted(SHAPES))
+def test_render(benchmark, shape):
+    benchmark.group = 'render'
+    query = SHAPES[shape]()
+    benchmark(query._as_sql, dummy_connection, dummy_context)
@@ -0,0 +1,144 @@
+"""
+Standalone render benchmark runner
+
+Measures building and rendering every shape of `benchmarks.shapes` and
+writes the results as JSON, optionally comparing them with the results of
+an earlier run:
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --compare results.json --tolerance 0.1
+"""
+
+from functools import partial
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+from rubiq.dummy import dummy_connection, dummy_context
+
+from .shapes import SHAPES
+
+
+def measure(function, repeat=5, min_time=0.2):
+    """Time `function`, returns a dict of per call statistics in seconds
+
+    The number of calls per measurement is calibrated so a measurement takes
+    at least `min_time` seconds; the measurement is repeated `repeat` times.
+    """
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops *= 2 if elapsed <= 0 else max(2, int(min_time / elapsed) + 1)
+    timings = [elapsed / loops]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            function()
+        timings.append((time.perf_counter() - start) / loops)
+    return {
+        'loops': loops,
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'mean': statistics.mean(timings),
+    }
+
+
+def run(shapes=None, repeat=5, min_time=0.2):
+    """Benchmark building and rendering shapes, returns a list of results"""
+    results = []
+    for name, build in sorted(SHAPES.items()):
+        if shapes and name not in shapes:
+            continue
+        query = build()
+        render = partial(query._as_sql, dummy_connection, dummy_context)
+        for phase, function in (('build', build), ('render', render)):
+            result = {'name': name, 'phase': phase}
+            result.update(measure(function, repeat=repeat, min_time=min_time))
+            results.append(result)
+    return results
+
+
+def metadata():
+    """Describe the environment of a benchmark run"""
+    try:
+        commit = subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Compare results with a baseline, returns the regressed results
+
+    Each result gets a `ratio` of its median to the baseline median.
+    """
+    medians = {(result['name'], result['phase']): result['median']
+               for result in baseline['results']}
+    regressions = []
+    for result in results:
+        base = medians.get((result['name'], result['phase']))
+        if not base:
+            continue
+        result['ratio'] = result['median'] / base
+        if result['ratio'] > 1 + tolerance:
+            regressions.append(result)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('shapes', nargs='*', help='shapes to run, all by default')
+    parser.add_argument('--output', '-o', help='write JSON results to a file')
+    parser.add_argument('--compare', help='JSON results of a baseline run')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='relative slowdown reported as a regression')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    results = run(args.shapes, repeat=args.repeat, min_time=args.min_time)
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+
+    for result in results:
+        line = '{name:<14} {phase:<7} {median:12.3f} us'.format(
+            name=result['name'],
+            phase=result['phase'],
+            median=result['median'] * 1e6,
+        )
+        if 'ratio' in result:
+            line += '  x{ratio:.2f}'.format(ratio=result['ratio'])
+        print(line)
+
+    document = {'meta': metadata(), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+
+    if regressions:
+        print('{count} regression(s) over {tolerance:.0%}'.format(
+            count=len(regressions), tolerance=args.tolerance))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
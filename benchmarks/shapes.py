@@ -0,0 +1,103 @@
+"""
+Representative query shapes for render benchmarks
+
+Every shape is a function building a fresh query, so that building and
+rendering can be measured separately.
+"""
+
+from rubiq.query import *
+
+
+def wide_select(columns=200):
+    """SELECT with a long list of aliased columns and expressions"""
+    return SELECT(*(A('alias_{}'.format(i), C('column_{}'.format(i)) * i)
+                    for i in range(columns))).FROM(T.table)
+
+
+def deep_and(terms=500):
+    """WHERE clause with a long AND chain of comparisons"""
+    return (SELECT(C.id).FROM(T.table)
+            .WHERE(AND(*(C('column_{}'.format(i)) > i for i in range(terms)))))
+
+
+def deep_or(depth=100):
+    """WHERE clause with deeply nested OR/AND operators"""
+    condition = C.column_0 == 0
+    for i in range(1, depth):
+        operator = OR if i % 2 else AND
+        condition = operator(condition, C('column_{}'.format(i)) == i)
+    return SELECT(C.id).FROM(T.table).WHERE(condition)
+
+
+def large_in(items=10000):
+    """IN operator with a long list of values"""
+    return SELECT(C.id).FROM(T.table).WHERE(IN(C.id, list(range(items))))
+
+
+def values_rows(rows=1000, columns=5):
+    """Multi row VALUES expression"""
+    values = VALUES(*range(columns))
+    for i in range(1, rows):
+        values(*range(i, i + columns))
+    return SELECT().FROM(A.v(values, columns=[C('c{}'.format(i)) for i in range(columns)]))
+
+
+def nested_sets(depth=50):
+    """Nested UNION/INTERSECT/EXCEPT of SELECTs"""
+    query = SELECT(C.id).FROM(T.table_0)
+    for i in range(1, depth):
+        other = SELECT(C.id).FROM(T('table_{}'.format(i))).WHERE(C.id > i)
+        query = (query | other) if i % 3 else (query - other)
+    return query.ORDER_BY(C.id).LIMIT(10)
+
+
+def multi_join(joins=20):
+    """FROM clause joining many tables"""
+    query = SELECT(T.t0().id).FROM(T.t0)
+    for i in range(1, joins):
+        table = T('t{}'.format(i))
+        query.LEFT_JOIN(table, ON=(T.t0().id == table().t0_id))
+    return query.WHERE(T.t0().id > 0)
+
+
+def ctes(count=20):
+    """Statement with many common table expressions"""
+    query = SELECT(C.id).FROM(T('cte_{}'.format(count - 1)))
+    for i in range(count):
+        source = T.table if i == 0 else T('cte_{}'.format(i - 1))
+        query.WITH(C('cte_{}'.format(i)),
+                   SELECT(C.id, C.value).FROM(source).WHERE(C.value > i))
+    return query
+
+
+def windows(count=20):
+    """Window functions over named and inline windows"""
+    columns = [A('w{}'.format(i), F.sum(C.value).OVER(
+        PARTITION_BY=(C.group,), ORDER_BY=(ASC(C.ts),), ROWS=(-i, 0)))
+        for i in range(count)]
+    query = SELECT(*columns).FROM(T.table)
+    for i in range(count):
+        query.WINDOW('named_{}'.format(i), PARTITION_BY=(C.group,),
+                     ORDER_BY=(DESC(C.ts),), RANGE=(None, 0))
+    return query
+
+
+_base = None
+
+
+def frozen_base():
+    """Varied filter over a frozen query with CTEs, joins and windows"""
+    global _base
+    if _base is None:
+        _base = windows()
+        _base.source = multi_join().source
+        _base.cte = ctes().cte
+        _base.freeze()
+    return _base.copy().WHERE(T.t0().id == 1).LIMIT(10)
+
+
+SHAPES = {shape.__name__: shape for shape in (
+    wide_select, deep_and, deep_or, large_in, values_rows, nested_sets,
+    multi_join, ctes, windows, frozen_base,
+)}
+"""Benchmarked shapes by name"""
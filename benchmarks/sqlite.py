@@ -0,0 +1,227 @@
+"""
+End-to-end overhead benchmark against an in-memory SQLite database
+
+Runs the same workloads as hand written DB-API statements and as rubiq
+queries, reporting the time spent in each phase (build, render, bind,
+execute, fetch) and the throughput of `Query.execute` and raw statements
+at several concurrency levels:
+
+    python -m benchmarks.sqlite --output sqlite.json
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+
+from rubiq.query import *
+from rubiq.sqlite import SQLiteConnection
+
+from .run import metadata
+
+DATABASE = 'file:rubiq_benchmark?mode=memory&cache=shared'
+
+USERS = 10000
+ORDERS = 50000
+CITIES = ('Budapest', 'Lisbon', 'Oslo', 'Riga', 'Vienna')
+
+
+def connect():
+    """Open a connection to the shared benchmark database"""
+    return SQLiteConnection(DATABASE, uri=True, check_same_thread=False)
+
+
+def populate(connection):
+    """Create and fill the benchmark tables"""
+    connection.executescript('''
+        DROP TABLE IF EXISTS orders;
+        DROP TABLE IF EXISTS users;
+        CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, age INTEGER,
+                            city TEXT);
+        CREATE TABLE orders (id INTEGER PRIMARY KEY, user_id INTEGER,
+                             total REAL, created TEXT);
+        CREATE INDEX orders_user_id ON orders (user_id);
+    ''')
+    connection.executemany(
+        'INSERT INTO users VALUES (?, ?, ?, ?)',
+        ((i, 'user {}'.format(i), 18 + i % 60, CITIES[i % len(CITIES)])
+         for i in range(USERS)))
+    connection.executemany(
+        'INSERT INTO orders VALUES (?, ?, ?, ?)',
+        ((i, i % USERS, (i % 997) / 10.0, '2020-01-{:02}'.format(1 + i % 28))
+         for i in range(ORDERS)))
+    connection.commit()
+
+
+def point():
+    return SELECT(C.id, C.name).FROM(T.users).WHERE(C.id == 4242)
+
+
+def in_list():
+    ids = list(range(0, USERS, USERS // 100))
+    return SELECT(C.id, C.name).FROM(T.users).WHERE(IN(C.id, ids))
+
+
+def join():
+    users, orders = T.users(), T.orders()
+    return (SELECT(users.name, orders.total).FROM(T.users)
+            .INNER_JOIN(T.orders, ON=(orders.user_id == users.id))
+            .WHERE(AND(users.city == 'Oslo', orders.total > 50))
+            .ORDER_BY(DESC(orders.total)).LIMIT(100))
+
+
+def aggregate():
+    users, orders = T.users(), T.orders()
+    return (SELECT(users.city, A.orders(F.count(C)), A.average(F.avg(orders.total)))
+            .FROM(T.users).INNER_JOIN(T.orders, ON=(orders.user_id == users.id))
+            .GROUP_BY(users.city))
+
+
+WORKLOADS = {
+    'point': (point, 'SELECT id, name FROM users WHERE id = ?', (4242,)),
+    'in_list': (
+        in_list,
+        'SELECT id, name FROM users WHERE id IN ({})'.format(
+            ', '.join('?' * 100)),
+        tuple(range(0, USERS, USERS // 100)),
+    ),
+    'join': (
+        join,
+        'SELECT users.name, orders.total FROM users INNER JOIN orders '
+        'ON orders.user_id = users.id WHERE users.city = ? AND orders.total > ? '
+        'ORDER BY orders.total DESC LIMIT ?',
+        ('Oslo', 50, 100),
+    ),
+    'aggregate': (
+        aggregate,
+        'SELECT users.city, count(*) AS orders, avg(orders.total) AS average '
+        'FROM users INNER JOIN orders ON orders.user_id = users.id '
+        'GROUP BY users.city',
+        (),
+    ),
+}
+"""Workloads by name: rubiq query builder, raw SQL and raw arguments"""
+
+
+def phases(connection, build, iterations):
+    """Time each phase of executing a rubiq query, in seconds per query"""
+    timings = {phase: [] for phase in ('build', 'render', 'bind', 'execute', 'fetch')}
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        query = build()
+        t1 = time.perf_counter()
+        sql, args = query._as_sql(connection, {})
+        t2 = time.perf_counter()
+        sql, args = connection.bind(sql, args)
+        t3 = time.perf_counter()
+        cursor = connection.connection.execute(sql, args)
+        t4 = time.perf_counter()
+        cursor.fetchall()
+        t5 = time.perf_counter()
+        for phase, elapsed in zip(timings, (t1 - t0, t2 - t1, t3 - t2, t4 - t3, t5 - t4)):
+            timings[phase].append(elapsed)
+    return {phase: statistics.median(values) for phase, values in timings.items()}
+
+
+def raw_phases(connection, sql, args, iterations):
+    """Time executing and fetching a raw statement, in seconds per query"""
+    timings = {'execute': [], 'fetch': []}
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        cursor = connection.connection.execute(sql, args)
+        t1 = time.perf_counter()
+        cursor.fetchall()
+        t2 = time.perf_counter()
+        timings['execute'].append(t1 - t0)
+        timings['fetch'].append(t2 - t1)
+    return {phase: statistics.median(values) for phase, values in timings.items()}
+
+
+def throughput(run, threads, duration):
+    """Run `run(connection)` in parallel threads, returns queries per second"""
+    counts = [0] * threads
+    deadline = time.perf_counter() + duration
+    start = threading.Barrier(threads)
+
+    def worker(index):
+        connection = connect()
+        start.wait()
+        while time.perf_counter() < deadline:
+            run(connection)
+            counts[index] += 1
+        connection.close()
+
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return sum(counts) / duration
+
+
+def benchmark(workloads=None, iterations=200, concurrency=(1, 2, 4, 8), duration=1.0):
+    """Run the workloads, returns a list of result dicts"""
+    connection = connect()
+    populate(connection)
+    results = []
+    for name, (build, sql, args) in sorted(WORKLOADS.items()):
+        if workloads and name not in workloads:
+            continue
+        rubiq = phases(connection, build, iterations)
+        raw = raw_phases(connection, sql, args, iterations)
+        result = {
+            'name': name,
+            'rubiq': rubiq,
+            'raw': raw,
+            'overhead': rubiq['build'] + rubiq['render'] + rubiq['bind'],
+            'overhead_ratio': sum(rubiq.values()) / sum(raw.values()) - 1,
+            'throughput': [],
+        }
+        for threads in concurrency:
+            result['throughput'].append({
+                'threads': threads,
+                'rubiq': throughput(
+                    lambda connection: build().execute(connection).fetchall(),
+                    threads, duration),
+                'raw': throughput(
+                    lambda connection: connection.connection.execute(sql, args).fetchall(),
+                    threads, duration),
+            })
+        results.append(result)
+    connection.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('workloads', nargs='*', help='workloads to run, all by default')
+    parser.add_argument('--output', '-o', help='write JSON results to a file')
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--duration', type=float, default=1.0,
+                        help='seconds to run each throughput measurement')
+    args = parser.parse_args(argv)
+
+    results = benchmark(args.workloads, iterations=args.iterations,
+                        concurrency=args.concurrency, duration=args.duration)
+    for result in results:
+        print('{name}: rubiq overhead {overhead:.1f} us ({ratio:+.0%} of raw)'.format(
+            name=result['name'],
+            overhead=result['overhead'] * 1e6,
+            ratio=result['overhead_ratio'],
+        ))
+        for phase, elapsed in result['rubiq'].items():
+            print('  {phase:<8} {elapsed:10.1f} us'.format(phase=phase, elapsed=elapsed * 1e6))
+        for row in result['throughput']:
+            print('  {threads:>2} threads: {rubiq:10.0f} q/s rubiq {raw:10.0f} q/s raw'.format(**row))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'meta': metadata(), 'results': results}, f, indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
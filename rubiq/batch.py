@@ -0,0 +1,95 @@
+"""
+Query batching
+
+Executes several independent queries in a single round trip:
+
+    batch = Batch(users, orders, settings)
+    users_rows, orders_rows, settings_rows = batch.execute(connection)
+
+Three strategies are available:
+
+- `'multi'` sends the queries as one multi-statement string and reads the
+  results with `cursor.nextset()`, for drivers supporting it;
+- `'json'` sends a `UNION ALL` of the queries, each aggregated into a JSON
+  array of row arrays tagged with its position; this needs PostgreSQL
+  `json_agg` and `json_each`, and returns values decoded from JSON;
+- `'sequential'` executes the queries one after the other, one round trip
+  each, for drivers supporting neither.
+
+Connections declare their default with a `batch_mode` attribute, otherwise
+queries are executed sequentially.
+
+Batched queries are rendered as `Query.execute` renders them, commented and
+notifying the `rubiq.instrument` listeners.
+"""
+
+from __future__ import absolute_import
+from functools import partial
+import json
+
+from . import instrument
+
+MODES = ('multi', 'json', 'sequential')
+
+
+class Batch:
+    """Independent queries executed together, results returned in order"""
+
+    def __init__(self, *queries):
+        self.queries = list(queries)
+
+    def __len__(self):
+        return len(self.queries)
+
+    def add(self, query):
+        """Add a query, returns the position of its result"""
+        self.queries.append(query)
+        return len(self.queries) - 1
+
+    def execute(self, connection, mode=None, **context):
+        """Execute the queries, returns the list of rows of every query"""
+        if not self.queries:
+            return []
+        mode = mode or getattr(connection, 'batch_mode', None) or 'sequential'
+        if mode not in MODES:
+            raise ValueError('Unknown batch mode: {mode}'.format(mode=mode))
+        if mode == 'sequential':
+            return self._sequential(connection, context)
+        run = partial(getattr(self, '_' + mode), connection)
+        return instrument.execute_batch(self.queries, connection, context, run)
+
+    def _multi(self, connection, rendered):
+        sql, args = zip(*rendered)
+        cursor = connection.cursor()
+        cursor.execute('; '.join(sql), tuple(arg for query_args in args for arg in query_args))
+        results = [cursor.fetchall()]
+        while cursor.nextset():
+            results.append(cursor.fetchall())
+        if len(results) != len(self.queries):
+            raise RuntimeError('Expected {expected} results, got {count}'.format(
+                expected=len(self.queries), count=len(results)))
+        return results
+
+    def _json(self, connection, rendered):
+        parts = []
+        args = []
+        for tag, (sql, query_args) in enumerate(rendered):
+            # rows as arrays of their values, json objects (not jsonb) keep
+            # the order and the repeated names of the columns
+            parts.append(
+                'SELECT {tag} AS tag, json_agg((SELECT json_agg(c.value ORDER BY c.n) '
+                'FROM json_each(row_to_json(t)) WITH ORDINALITY AS c(key, value, n))) '
+                'AS rows FROM ({sql}) AS t'.format(tag=tag, sql=sql))
+            args.extend(query_args)
+        cursor = connection.cursor()
+        cursor.execute(' UNION ALL '.join(parts), tuple(args))
+        results = [[] for _ in self.queries]
+        for tag, rows in cursor.fetchall():
+            if isinstance(rows, str):
+                rows = json.loads(rows)
+            results[tag] = [tuple(row or ()) for row in rows or ()]
+        return results
+
+    def _sequential(self, connection, context):
+        return [query.execute(connection, **context).fetchall()
+                for query in self.queries]
@@ -0,0 +1,252 @@
+"""
+Query result cache
+
+Caches the rows of `SELECT` queries by their rendered SQL and arguments:
+
+    cache = ResultCache(ttl=30)
+    rows = cache.execute(query, connection).fetchall()
+
+Each entry records the tables its query reads. Executing other queries
+through the cache invalidates the entries reading the tables they refer
+to; writes made by other means are announced with `invalidate`.
+"""
+
+from __future__ import absolute_import
+from collections import OrderedDict
+import threading
+import time
+
+from .query.select import BaseSelect, SELECT
+from .sql.alias import relation_name
+from .sql.base import SQL
+from .sql.expression import InOperator
+from .sql.table import Table, VALUES
+from .sql.tree import single_pass, walk
+
+
+def tables(query):
+    """Return the names of the tables a query refers to, CTEs excluded"""
+    ctes = {relation_name(cte.name) for node in walk(query)
+            if isinstance(node, SELECT) for cte in node.cte}
+    return {node._name for node in walk(query)
+            if isinstance(node, Table)} - ctes
+
+
+def _lengths(query):
+    """Return the lengths of the `IN` lists and `VALUES` rows of a query,
+    which its fingerprint leaves out"""
+    lengths = []
+    for node in walk(query):
+        if isinstance(node, InOperator) and not isinstance(node.right, SQL):
+            lengths.append(len(node.right))
+        elif isinstance(node, VALUES):
+            lengths.append(len(node.rows))
+    return tuple(lengths)
+
+
+class Backend:
+    """Interface of result cache storages"""
+
+    def get(self, key):
+        """Return the value stored for a key, `None` if unknown or expired"""
+        raise NotImplementedError()
+
+    def set(self, key, value, ttl, tables):
+        """Store a value for `ttl` seconds, depending on a set of tables"""
+        raise NotImplementedError()
+
+    def invalidate(self, tables):
+        """Drop the values depending on any of the tables"""
+        raise NotImplementedError()
+
+    def clear(self):
+        raise NotImplementedError()
+
+
+class MemoryBackend(Backend):
+    """In-process LRU storage of at most `max_entries` values and, if given,
+    `max_rows` rows in total"""
+
+    def __init__(self, max_entries=1024, max_rows=None):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.rows = 0
+        self._entries = OrderedDict()  # key: (expires, value, tables)
+        self._tables = {}  # table: keys
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] is not None and entry[0] < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl, tables):
+        size = len(value.rows)
+        if self.max_rows is not None and size > self.max_rows:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            expires = None if ttl is None else time.monotonic() + ttl
+            self._entries[key] = expires, value, tables
+            self.rows += size
+            for table in tables:
+                self._tables.setdefault(table, set()).add(key)
+            while len(self._entries) > self.max_entries or (
+                    self.max_rows is not None and self.rows > self.max_rows):
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, tables):
+        with self._lock:
+            for table in tables:
+                for key in list(self._tables.get(table, ())):
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tables.clear()
+            self.rows = 0
+
+    def _remove(self, key):
+        _, value, tables = self._entries.pop(key)
+        self.rows -= len(value.rows)
+        for table in tables:
+            keys = self._tables[table]
+            keys.discard(key)
+            if not keys:
+                del self._tables[table]
+
+
+class Result:
+    """Cached result of a query"""
+
+    def __init__(self, description, rows):
+        self.description = description
+        self.rows = rows
+
+
+class CachedCursor:
+    """Read-only cursor over a cached result"""
+
+    def __init__(self, result, hit):
+        self.description = result.description
+        self.rowcount = len(result.rows)
+        self.hit = hit
+        self._rows = result.rows
+        self._position = 0
+
+    def fetchone(self):
+        if self._position >= len(self._rows):
+            return None
+        self._position += 1
+        return self._rows[self._position - 1]
+
+    def fetchmany(self, size=1):
+        rows = self._rows[self._position:self._position + size]
+        self._position += len(rows)
+        return list(rows)
+
+    def fetchall(self):
+        rows = self._rows[self._position:]
+        self._position = len(self._rows)
+        return list(rows)
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def close(self):
+        pass
+
+
+class ResultCache:
+    """Cache of query results with time to live and table invalidation
+
+    Entries are keyed by the rendered SQL and arguments, or with `key` set
+    to `'fingerprint'` by the query fingerprint, the lengths of its `IN`
+    lists and `VALUES` rows and its arguments, which keeps queries rendered
+    differently for different connections together. Queries holding
+    iterators are not cached.
+    """
+
+    def __init__(self, backend=None, ttl=60, key='sql'):
+        self.backend = MemoryBackend() if backend is None else backend
+        self.ttl = ttl
+        self.key = key
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        """Count of invalidations, a result read before one is not stored"""
+        # guards the counters and orders storing results with invalidations
+        self._lock = threading.Lock()
+
+    def _key(self, query, connection, context):
+        """Return the key of a query and its `(sql, args)` rendering
+
+        Either is `None` for queries holding iterators, the key for queries
+        with unhashable arguments.
+        """
+        if single_pass(query):
+            return None, None
+        rendered = sql, args = query._as_sql(connection, context)
+        if self.key == 'fingerprint':
+            sql = query.fingerprint().digest, _lengths(query)
+        try:
+            key = sql, tuple(args)
+            hash(key)
+        except TypeError:
+            return None, rendered  # unhashable arguments
+        return key, rendered
+
+    def execute(self, query, connection, ttl=None, **context):
+        """Execute a query, returns a `CachedCursor` for `SELECT` queries
+
+        Other queries invalidate the entries of the tables they refer to
+        once executed and return the cursor of their execution.
+        """
+        if not isinstance(query, BaseSelect):
+            cursor = query.execute(connection, **context)
+            self.invalidate(*tables(query))
+            return cursor
+        key, rendered = self._key(query, connection, context)
+        result = None if key is None else self.backend.get(key)
+        with self._lock:
+            if result is not None:
+                self.hits += 1
+                return CachedCursor(result, hit=True)
+            self.misses += 1
+            generation = self.generation
+        cursor = query._execute(connection, context, rendered)
+        result = Result(cursor.description, tuple(cursor.fetchall()))
+        if key is None:
+            return CachedCursor(result, hit=False)
+        with self._lock:
+            # invalidated while executing, the result may be stale
+            if generation == self.generation:
+                self.backend.set(key, result, self.ttl if ttl is None else ttl,
+                                 frozenset(tables(query)))
+        return CachedCursor(result, hit=False)
+
+    def invalidate(self, *tables):
+        """Drop the cached results of queries reading any of the tables"""
+        with self._lock:
+            self.generation += 1
+            self.backend.invalidate(tables)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self.backend.clear()
@@ -0,0 +1,130 @@
+"""
+Columnar result fetching
+
+Fetches query results into one NumPy array per output column:
+
+    columns = fetch_columns(query, connection, dtypes={'total': 'float64'})
+    columns['total'].mean()
+
+NumPy is only imported when results are fetched.
+"""
+
+from __future__ import absolute_import
+from collections import OrderedDict
+import importlib
+
+from .rows import column_names
+
+
+def _numpy():
+    try:
+        return importlib.import_module('numpy')
+    except ImportError:
+        raise ImportError('Fetching columns requires NumPy')
+
+
+def _dtype(numpy, values):
+    """Infer the dtype of column values, NULLs aside, `None` if all are NULL"""
+    values = [value for value in values if value is not None]
+    if not values:
+        return None
+    if all(isinstance(value, (bool, int, float)) for value in values):
+        return numpy.asarray(values).dtype
+    return numpy.dtype(object)
+
+
+def unique_names(names):
+    """Replace the repeated names of columns with their position, e.g. `_2`,
+    as `rows.row_type` does"""
+    seen = set()
+    unique = []
+    for index, name in enumerate(names):
+        if name in seen:
+            name = '_{index}'.format(index=index)
+        seen.add(name)
+        unique.append(name)
+    return unique
+
+
+class _Column:
+    """Array of a column grown batch by batch, with the mask of its NULLs"""
+
+    def __init__(self, numpy, dtype, capacity):
+        self.numpy = numpy
+        self.infer = dtype is None
+        # dtype of a column holding only NULLs so far is unknown
+        self.known = not self.infer
+        self.array = numpy.empty(capacity, dtype=dtype or object)
+        self.mask = None
+
+    def resize(self, capacity):
+        self.array.resize((capacity,), refcheck=False)
+        if self.mask is not None:
+            # new entries are zeros, i.e. not masked
+            self.mask.resize((capacity,), refcheck=False)
+
+    def set(self, start, values):
+        numpy = self.numpy
+        end = start + len(values)
+        if self.infer:
+            dtype = _dtype(numpy, values)
+            if dtype is not None and not self.known:
+                self.array = numpy.zeros(len(self.array), dtype=dtype)
+                self.mask = numpy.zeros(len(self.array), dtype=bool)
+                self.mask[:start] = True
+                self.known = True
+            elif dtype is not None and dtype != self.array.dtype:
+                self.array = self.array.astype(numpy.result_type(self.array.dtype, dtype))
+        nulls = [value is None for value in values]
+        if self.array.dtype != object and any(nulls):
+            if self.mask is None:
+                self.mask = numpy.zeros(len(self.array), dtype=bool)
+            self.mask[start:end] = nulls
+            values = [0 if null else value for null, value in zip(nulls, values)]
+        self.array[start:end] = values
+
+    def finish(self, size):
+        """Return the column array of `size` rows"""
+        self.resize(size)
+        if self.mask is None or not self.mask.any():
+            return self.array
+        if self.array.dtype == object:
+            self.array[self.mask] = None
+            return self.array
+        return self.numpy.ma.masked_array(self.array, self.mask)
+
+
+def fetch_columns(query, connection, dtypes=None, batch_size=10000, **context):
+    """Execute a query and return its columns as arrays, by name
+
+    `dtypes` maps column names to dtypes, or lists the dtypes of every
+    column. Dtypes not given are inferred, numbers and booleans as such and
+    anything else as objects, and promoted as further batches of rows are
+    fetched, e.g. from integers to floats. NULLs are `None` in object
+    columns and masked in others, which are then `numpy.ma.MaskedArray`.
+    Repeated column names are replaced with the column position, e.g. `_2`.
+    Rows are fetched in batches of `batch_size` into arrays grown as needed.
+    """
+    numpy = _numpy()
+    cursor = query.execute(connection, **context)
+    names = unique_names(column_names(query, cursor.description))
+    if dtypes is None:
+        dtypes = {}
+    elif not isinstance(dtypes, dict):
+        dtypes = dict(zip(names, dtypes))
+
+    columns = [_Column(numpy, dtypes.get(name), batch_size) for name in names]
+    capacity = batch_size
+    size = 0
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        if size + len(rows) > capacity:
+            capacity = max(capacity * 2, size + len(rows))
+            for column in columns:
+                column.resize(capacity)
+        for column, values in zip(columns, zip(*rows)):
+            column.set(size, values)
+        size += len(rows)
+    return OrderedDict((name, column.finish(size)) for name, column in zip(names, columns))
@@ -0,0 +1,105 @@
+"""
+SQL comment tagging
+
+Appends a sqlcommenter style comment to executed queries, telling where they
+come from in database statistics and logs:
+
+    Query.commenter = Commenter(application='dashboards')
+
+    with comment_tags(route='/users/<id>', request_id=request.id):
+        query.execute(connection)
+
+executes `SELECT ... /*application='dashboards',function='show',
+module='app.views',request_id='...',route='%%2Fusers%%2F%%3Cid%%3E'*/`.
+
+`Query.commenter` is process-global, shared by every thread. A connection
+with a `commenter` attribute uses its own commenter instead, `None` turning
+comments off:
+
+    connection.commenter = Commenter(application='reports')
+
+The caller part of a comment is computed once per call site and tags set
+with `comment_tags` change only with their values, so statements executed
+from the same place keep the same text for statement caches. Tags varying
+per execution, like request ids, do not.
+"""
+
+from __future__ import absolute_import
+from contextlib import contextmanager
+from urllib.parse import quote
+import contextvars
+import sys
+
+_tags = contextvars.ContextVar('rubiq_comment_tags', default={})
+
+
+@contextmanager
+def comment_tags(**tags):
+    """Add tags to the comments of the queries executed in a context"""
+    token = _tags.set(dict(_tags.get(), **tags))
+    try:
+        yield
+    finally:
+        _tags.reset(token)
+
+
+def format_comment(tags):
+    """Format tags as a sqlcommenter comment
+
+    Keys and values are URL encoded, quotes included, `%` doubled for
+    `format` paramstyle drivers and values quoted; tags are sorted by key.
+    """
+    if not tags:
+        return ''
+    items = ','.join("{key}='{value}'".format(
+        key=quote(str(key), safe=''),
+        value=quote(str(value), safe=''),
+    ) for key, value in sorted(tags.items()))
+    return '/*{items}*/'.format(items=items.replace('%', '%%'))
+
+
+class Commenter:
+    """Tagger of executed queries
+
+    Comments carry the given static tags, the module and function executing
+    the query with `caller`, the tags of the current `comment_tags` context
+    and with `fingerprint` the query fingerprint, which costs rendering the
+    query once more.
+    """
+
+    def __init__(self, caller=True, fingerprint=False, **tags):
+        self.caller = caller
+        self.fingerprint = fingerprint
+        self.tags = tags
+        self._sites = {}
+
+    def _caller(self):
+        """Return the tags of the first caller outside of rubiq"""
+        frame = sys._getframe(2)
+        while frame is not None and frame.f_globals.get('__name__', '').partition('.')[0] == 'rubiq':
+            frame = frame.f_back
+        if frame is None:
+            return {}
+        site = frame.f_code, frame.f_lineno
+        tags = self._sites.get(site)
+        if tags is None:
+            tags = self._sites[site] = {
+                'module': frame.f_globals.get('__name__'),
+                'function': frame.f_code.co_name,
+            }
+        return tags
+
+    def tag(self, query):
+        """Return the tags of a query executed by the current caller"""
+        tags = dict(self.tags)
+        if self.caller:
+            tags.update(self._caller())
+        tags.update(_tags.get())
+        if self.fingerprint:
+            tags['fingerprint'] = query.fingerprint().digest
+        return tags
+
+    def __call__(self, query, sql):
+        """Append the comment of a query to its rendered SQL"""
+        comment = format_comment(self.tag(query))
+        return '{sql} {comment}'.format(sql=sql, comment=comment) if comment else sql
@@ -0,0 +1,268 @@
+"""
+Query execution instrumentation
+
+Listeners are registered for events of `Query.execute`:
+
+- `before_render` and `after_render` around rendering the query,
+- `before_execute` and `after_execute` around executing it,
+- `on_error` when rendering or executing raises.
+
+Each listener is called with an `Event`, which is filled in as the query
+proceeds. Queries are executed without any overhead while no listener is
+registered.
+"""
+
+from __future__ import absolute_import
+from bisect import bisect_left
+from collections import OrderedDict
+import threading
+import time
+
+EVENTS = ('before_render', 'after_render', 'before_execute', 'after_execute', 'on_error')
+
+_listeners = {event: [] for event in EVENTS}
+_lock = threading.Lock()
+
+active = False
+"""Whether any listener is registered"""
+
+
+class Event:
+    """State of an instrumented query execution"""
+
+    def __init__(self, name, query, connection):
+        self.name = name
+        self.query = query
+        self.connection = connection
+        self.fingerprint = None
+        self.statement = None
+        self.sql = None
+        self.args = None
+        self.render_time = None
+        self.execute_time = None
+        self.rowcount = None
+        self.error = None
+
+    def __repr__(self):
+        return '<Event {name} {fingerprint}>'.format(
+            name=self.name, fingerprint=self.fingerprint)
+
+
+def listen(event, listener=None):
+    """Register a listener for an event, can be used as a decorator"""
+    if event not in _listeners:
+        raise ValueError('Unknown event: {event}'.format(event=event))
+    if listener is None:
+        return lambda listener: listen(event, listener)
+    global active
+    with _lock:
+        # listeners are replaced, not mutated, so dispatch needs no lock
+        _listeners[event] = _listeners[event] + [listener]
+        active = True
+    return listener
+
+
+def remove(event, listener):
+    """Unregister a listener of an event"""
+    global active
+    with _lock:
+        listeners = list(_listeners[event])
+        listeners.remove(listener)
+        _listeners[event] = listeners
+        active = any(_listeners.values())
+
+
+def _dispatch(name, event):
+    event.name = name
+    for listener in _listeners[name]:
+        listener(event)
+
+
+def render(query, connection, context, rendered=None):
+    """Return the `(sql, args)` a query is executed as, commented
+
+    `rendered` is the `(sql, args)` of the query if already rendered.
+    """
+    sql, args = query._as_sql(connection, context) if rendered is None else rendered
+    return query.comment(connection, sql), args
+
+
+def _render(event, context, rendered=None):
+    _dispatch('before_render', event)
+    start = time.perf_counter()
+    event.sql, event.args = render(event.query, event.connection, context, rendered)
+    event.render_time = time.perf_counter() - start
+    event.fingerprint, event.statement = event.query.fingerprint()
+    _dispatch('after_render', event)
+
+
+def execute(query, connection, context, rendered=None):
+    """Render and execute a query, notifying listeners, see `render`"""
+    event = Event('before_render', query, connection)
+    try:
+        _render(event, context, rendered)
+        _dispatch('before_execute', event)
+        start = time.perf_counter()
+        cursor = connection.cursor()
+        cursor.execute(event.sql, event.args)
+        event.execute_time = time.perf_counter() - start
+        event.rowcount = getattr(cursor, 'rowcount', None)
+        _dispatch('after_execute', event)
+    except Exception as error:
+        event.error = error
+        if event.name == 'before_execute':
+            # failed, e.g. timed out, while executing
+            event.execute_time = time.perf_counter() - start
+        _dispatch('on_error', event)
+        raise
+    return cursor
+
+
+def execute_batch(queries, connection, context, run):
+    """Render queries and execute them together, notifying listeners
+
+    `run(rendered)` executes the list of the `(sql, args)` of the queries
+    and returns the list of their rows. Every query has its own events, the
+    execution time of each is that of the whole batch.
+    """
+    if not active:
+        return run([render(query, connection, context) for query in queries])
+    events = [Event('before_render', query, connection) for query in queries]
+    start = None
+    try:
+        for event in events:
+            _render(event, context)
+        for event in events:
+            _dispatch('before_execute', event)
+        start = time.perf_counter()
+        results = run([(event.sql, event.args) for event in events])
+        execute_time = time.perf_counter() - start
+        for event, rows in zip(events, results):
+            event.execute_time = execute_time
+            event.rowcount = len(rows)
+            _dispatch('after_execute', event)
+    except Exception as error:
+        execute_time = None if start is None else time.perf_counter() - start
+        for event in events:
+            event.error = error
+            if event.name == 'before_execute':
+                event.execute_time = execute_time
+            _dispatch('on_error', event)
+        raise
+    return results
+
+
+class Histogram:
+    """Counts of durations in logarithmic buckets"""
+
+    BOUNDS = tuple(base * 10 ** exponent for exponent in range(-5, 2)
+                   for base in (1, 2.5, 5))
+    """Upper bounds of the buckets in seconds, the last bucket is unbounded"""
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+
+    def add(self, value):
+        self.counts[bisect_left(self.BOUNDS, value)] += 1
+
+    def percentile(self, percent):
+        """Return the upper bound of the bucket holding a percentile"""
+        total = sum(self.counts)
+        if not total:
+            return None
+        rank = total * percent / 100.0
+        seen = 0
+        for bound, count in zip(self.BOUNDS + (float('inf'),), self.counts):
+            seen += count
+            if count and seen >= rank:
+                return bound
+        return float('inf')
+
+
+class Stats:
+    """Execution statistics of a query fingerprint"""
+
+    def __init__(self, fingerprint, sql):
+        self.fingerprint = fingerprint
+        self.sql = sql
+        self.count = 0
+        self.errors = 0
+        self.rows = 0
+        self.render_time = 0.0
+        self.execute_time = 0.0
+        self.histogram = Histogram()
+
+    @property
+    def total_time(self):
+        return self.render_time + self.execute_time
+
+    def __repr__(self):
+        return '<Stats {fingerprint} count={count} time={time:.6f}>'.format(
+            fingerprint=self.fingerprint, count=self.count, time=self.total_time)
+
+
+class QueryStats:
+    """In-process aggregator of execution statistics per query fingerprint
+
+        stats = QueryStats().install()
+        ...
+        for entry in stats.report():
+            print(entry.sql, entry.count, entry.histogram.percentile(95))
+    """
+
+    def __init__(self):
+        self.stats = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _entry(self, event):
+        entry = self.stats.get(event.fingerprint)
+        if entry is None:
+            entry = self.stats.setdefault(event.fingerprint,
+                                          Stats(event.fingerprint, event.statement))
+        return entry
+
+    def after_execute(self, event):
+        with self._lock:
+            entry = self._entry(event)
+            entry.count += 1
+            entry.render_time += event.render_time
+            entry.execute_time += event.execute_time
+            if event.rowcount is not None and event.rowcount > 0:
+                entry.rows += event.rowcount
+            entry.histogram.add(event.render_time + event.execute_time)
+
+    def on_error(self, event):
+        if event.fingerprint is None:
+            return  # failed to render
+        with self._lock:
+            self._entry(event).errors += 1
+
+    def install(self):
+        listen('after_execute', self.after_execute)
+        listen('on_error', self.on_error)
+        return self
+
+    def uninstall(self):
+        remove('after_execute', self.after_execute)
+        remove('on_error', self.on_error)
+
+    def __enter__(self):
+        return self.install()
+
+    def __exit__(self, *exc_info):
+        self.uninstall()
+
+    def __getitem__(self, fingerprint):
+        return self.stats[fingerprint]
+
+    def __len__(self):
+        return len(self.stats)
+
+    def reset(self):
+        with self._lock:
+            self.stats.clear()
+
+    def report(self):
+        """Return the statistics, the most time consuming first"""
+        with self._lock:
+            return sorted(self.stats.values(), key=lambda entry: -entry.total_time)
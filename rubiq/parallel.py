@@ -0,0 +1,67 @@
+"""
+Parallel rendering
+
+Renders large numbers of queries in a pool of worker processes:
+
+    for sql, args in render_parallel(queries, SQLiteConnection, workers=8):
+        ...
+
+Queries are sent to the workers in chunks, so each inter-process round trip
+carries many queries. At most two chunks per worker are in flight, so
+queries are read from their iterable as the renderings are consumed.
+"""
+
+from __future__ import absolute_import
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import os
+
+from .dummy import dummy_connection
+
+_connection = None
+_context = None
+
+
+def _initialize(connection, context):
+    global _connection, _context
+    _connection = connection() if isinstance(connection, type) else connection
+    _context = context
+
+
+def _render(queries):
+    return [query._as_sql(_connection, _context) for query in queries]
+
+
+def chunks(iterable, size):
+    """Split an iterable into lists of `size` items"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def render_parallel(queries, connection=dummy_connection, workers=None,
+                    chunksize=256, context=None):
+    """Render queries in worker processes, yields `(sql, args)` in order
+
+    `connection` renders the queries in the workers: a picklable connection,
+    or a connection class instantiated without arguments in every worker,
+    e.g. one holding a database connection. Queries and their arguments are
+    pickled, see `SQL.freeze` for sharing immutable queries.
+    """
+    context = {} if context is None else context
+    workers = workers or os.cpu_count() or 1
+    pending = chunks(queries, chunksize)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_initialize,
+                             initargs=(connection, context)) as executor:
+        futures = deque(executor.submit(_render, chunk)
+                        for chunk in islice(pending, workers * 2))
+        while futures:
+            rendered = futures.popleft().result()
+            chunk = next(pending, None)
+            if chunk is not None:
+                futures.append(executor.submit(_render, chunk))
+            yield from rendered
@@ -0,0 +1,114 @@
+"""
+Pipelined execution
+
+Queues queries on a connection and executes them in batches, returning a
+future for the result of every query:
+
+    with Pipeline(connection, batch_size=500) as pipeline:
+        futures = [pipeline.submit(query) for query in queries]
+    rowcounts = [future.result() for future in futures]
+
+Connections with a `pipeline()` context manager, like psycopg 3 ones, send
+every query of a batch before waiting for any result. A query failing sets
+its exception on its future and the rest of its batch is skipped, their
+futures failing with `PipelineAborted`. When the pipeline reports an error
+on exit that no query result raises, no result of the batch is trusted:
+its first future fails with the error and the others are aborted.
+"""
+
+from __future__ import absolute_import
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+
+class PipelineAborted(Exception):
+    """Raised for queries skipped after an earlier query of their batch failed"""
+
+    def __init__(self, error):
+        super().__init__('Skipped after an earlier query failed: {error!r}'.format(
+            error=error))
+        self.error = error
+
+
+@contextmanager
+def _sequential():
+    yield
+
+
+def _result(cursor):
+    """Return the rows of a query returning rows, its row count otherwise"""
+    if cursor.description is not None:
+        return cursor.fetchall()
+    return cursor.rowcount
+
+
+class Pipeline:
+    """Queue of queries executed in batches of `batch_size`"""
+
+    def __init__(self, connection, batch_size=100):
+        self.connection = connection
+        self.batch_size = batch_size
+        self.queue = []
+
+    def __len__(self):
+        return len(self.queue)
+
+    def submit(self, query, **context):
+        """Queue a query, returns the `Future` of its result"""
+        future = Future()
+        self.queue.append((query, context, future))
+        if len(self.queue) >= self.batch_size:
+            self.flush()
+        return future
+
+    def flush(self):
+        """Execute the queued queries"""
+        batch, self.queue = self.queue, []
+        if not batch:
+            return
+        pipeline = getattr(self.connection, 'pipeline', None) or _sequential
+        cursors = []
+        exit_error = None
+        try:
+            with pipeline():
+                for query, context, future in batch:
+                    cursors.append(query.execute(self.connection, **context))
+        except Exception as exc:
+            exit_error = exc
+
+        results = []
+        error = None
+        for cursor in cursors:
+            try:
+                results.append(_result(cursor))
+            except Exception as exc:
+                error = exc
+                break
+        if error is None:
+            error = exit_error
+            if exit_error is not None and len(results) == len(batch):
+                # the failed query cannot be told from its result
+                results = []
+        for (_, _, future), result in zip(batch, results):
+            future.set_result(result)
+        # the first query without a result failed, the rest is skipped
+        pending = [future for _, _, future in batch if not future.done()]
+        if pending:
+            pending[0].set_exception(error)
+            for future in pending[1:]:
+                future.set_exception(PipelineAborted(error))
+
+    def abort(self, error=None):
+        """Drop the queued queries, failing their futures"""
+        batch, self.queue = self.queue, []
+        for _, _, future in batch:
+            future.set_exception(PipelineAborted(error))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+        else:
+            self.abort(exc_value)
@@ -0,0 +1,171 @@
+"""
+Render profiler
+
+Collects per node type counters of `_as_sql` calls while active:
+
+    with RenderProfiler(memory=True) as profiler:
+        query._as_sql(connection, context)
+    print(profiler.report())
+
+The `_as_sql` methods are wrapped on entering the profiler and restored on
+leaving it, rendering is not slowed down while no profiler is active.
+"""
+
+from __future__ import absolute_import
+from functools import wraps
+import threading
+import time
+import tracemalloc
+
+from .sql.base import SQL
+
+
+class NodeStats:
+    """Render counters of a node type"""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.time = 0.0
+        self.own_time = 0.0
+        self.memory = 0
+
+    def __repr__(self):
+        return '<NodeStats {name} calls={calls} time={time:.6f}>'.format(
+            name=self.name, calls=self.calls, time=self.time)
+
+
+def _classes(cls=SQL):
+    """Iterate over the subclasses of `SQL` defining their own `_as_sql`"""
+    seen = set()
+    stack = [cls]
+    while stack:
+        cls = stack.pop()
+        if cls in seen:
+            continue
+        seen.add(cls)
+        if '_as_sql' in cls.__dict__:
+            yield cls
+        stack.extend(cls.__subclasses__())
+
+
+class RenderProfiler:
+    """Profiler of the `_as_sql` calls of every node type
+
+    `time` is the cumulative time spent rendering nodes of a type, `own_time`
+    excludes the time spent rendering their children. With `memory`,
+    `tracemalloc` traces the bytes rendered nodes leave allocated, children
+    included; tracing slows rendering down considerably.
+
+    Only one profiler may be active at a time.
+    """
+
+    _active = None
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.stats = {}
+        self._patched = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        if RenderProfiler._active is not None:
+            raise RuntimeError('A render profiler is already active')
+        RenderProfiler._active = self
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+        else:
+            self._tracing = False
+        for cls in _classes():
+            original = cls.__dict__['_as_sql']
+            self._patched.append((cls, original))
+            cls._as_sql = self._wrap(cls, original)
+
+    def stop(self):
+        for cls, original in reversed(self._patched):
+            cls._as_sql = original
+        self._patched = []
+        if self._tracing:
+            tracemalloc.stop()
+        RenderProfiler._active = None
+
+    def _wrap(self, cls, render):
+        profiler = self
+        name = cls.__name__
+
+        @wraps(render)
+        def _as_sql(self, connection, context):
+            # subclasses inheriting `_as_sql` are counted under their own
+            # name, `super()._as_sql` calls under the name of the superclass
+            key = type(self).__name__ if type(self)._as_sql is _as_sql else name
+            stack, depth = profiler._state()
+            stack.append(0.0)
+            depth[key] = depth.get(key, 0) + 1
+            memory = tracemalloc.get_traced_memory()[0] if profiler.memory else 0
+            start = time.perf_counter()
+            try:
+                return render(self, connection, context)
+            finally:
+                elapsed = time.perf_counter() - start
+                if profiler.memory:
+                    memory = tracemalloc.get_traced_memory()[0] - memory
+                own = elapsed - stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                depth[key] -= 1
+                # time of nested nodes of the same type is counted once
+                profiler._record(key, elapsed if not depth[key] else 0.0, own, memory)
+
+        return _as_sql
+
+    def _state(self):
+        """Return the child time stack and nesting depths of this thread"""
+        local = self._local
+        if not hasattr(local, 'stack'):
+            local.stack, local.depth = [], {}
+        return local.stack, local.depth
+
+    def _record(self, name, elapsed, own, memory):
+        with self._lock:
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = NodeStats(name)
+            stats.calls += 1
+            stats.time += elapsed
+            stats.own_time += own
+            stats.memory += max(memory, 0)
+
+    def reset(self):
+        with self._lock:
+            self.stats.clear()
+
+    def sorted(self, key='own_time'):
+        """Return the counters, sorted by an attribute in decreasing order"""
+        return sorted(self.stats.values(), key=lambda stats: -getattr(stats, key))
+
+    def report(self, key='own_time', limit=None):
+        """Format the counters as a table"""
+        lines = ['{name:<24} {calls:>8} {time:>12} {own:>12} {memory:>12}'.format(
+            name='node', calls='calls', time='time (ms)', own='own (ms)',
+            memory='memory (B)')]
+        for stats in self.sorted(key)[:limit]:
+            lines.append('{name:<24} {calls:>8} {time:>12.3f} {own:>12.3f} {memory:>12}'.format(
+                name=stats.name,
+                calls=stats.calls,
+                time=stats.time * 1e3,
+                own=stats.own_time * 1e3,
+                memory=stats.memory if self.memory else '-',
+            ))
+        return '\n'.join(lines)
+
+
+from . import query  # noqa: F401 register every node type
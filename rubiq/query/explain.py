@@ -0,0 +1,252 @@
+"""Query plans
+
+`explain` executes `EXPLAIN` for a query and parses the plan returned by the
+database into a tree of `PlanNode`. PostgreSQL plans are read in the JSON
+and text formats, SQLite plans from `EXPLAIN QUERY PLAN`.
+"""
+
+from __future__ import absolute_import
+import json
+import re
+
+
+class PlanNode:
+    """Node of a query plan
+
+    Costs and row counts are estimates of the planner, the `actual_` ones are
+    measured and only known for analyzed plans. Unknown values are `None`.
+    """
+
+    def __init__(self, node_type, relation=None, index=None, startup_cost=None,
+                 total_cost=None, rows=None, width=None, actual_rows=None,
+                 actual_time=None, loops=None, detail=None, children=None):
+        self.node_type = node_type
+        self.relation = relation
+        self.index = index
+        self.startup_cost = startup_cost
+        self.total_cost = total_cost
+        self.rows = rows
+        self.width = width
+        self.actual_rows = actual_rows
+        self.actual_time = actual_time
+        self.loops = loops
+        self.detail = detail
+        self.children = children or []
+
+    def __repr__(self):
+        return '<PlanNode {node_type!r} {relation!r} cost={cost}>'.format(
+            node_type=self.node_type,
+            relation=self.relation,
+            cost=self.total_cost,
+        )
+
+    def walk(self):
+        """Iterate over this node and its descendants, depth first"""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    @property
+    def seq_scan(self):
+        """Whether the node reads a whole table"""
+        if self.node_type == 'SCAN':  # SQLite
+            return self.index is None and self.relation is not None
+        return self.node_type in ('Seq Scan', 'Parallel Seq Scan')
+
+
+class Plan:
+    """Parsed query plan"""
+
+    def __init__(self, root, planning_time=None, execution_time=None, raw=None):
+        self.root = root
+        self.planning_time = planning_time
+        self.execution_time = execution_time
+        self.raw = raw
+
+    def __repr__(self):
+        return '<Plan {root!r}>'.format(root=self.root)
+
+    def __iter__(self):
+        return self.root.walk()
+
+    @property
+    def total_cost(self):
+        """Estimated total cost of the query"""
+        return self.root.total_cost
+
+    @property
+    def rows(self):
+        """Estimated number of rows returned by the query"""
+        return self.root.rows
+
+    def seq_scans(self):
+        """Return the nodes reading whole tables"""
+        return [node for node in self if node.seq_scan]
+
+    def index_scans(self):
+        """Return the nodes reading tables through an index"""
+        return [node for node in self if node.index is not None]
+
+    def uses_index(self, relation=None):
+        """Tell whether an index is used, on the given relation if any"""
+        return any(relation is None or node.relation == relation
+                   for node in self.index_scans())
+
+    @classmethod
+    def from_json(cls, document):
+        """Parse a PostgreSQL `EXPLAIN (FORMAT JSON)` document"""
+        if isinstance(document, str):
+            document = json.loads(document)
+        if isinstance(document, list):
+            document = document[0]
+        return cls(_bitmap_scans(_json_node(document['Plan'])),
+                   planning_time=document.get('Planning Time'),
+                   execution_time=document.get('Execution Time'),
+                   raw=document)
+
+    @classmethod
+    def from_text(cls, lines):
+        """Parse PostgreSQL `EXPLAIN` text output, given as lines"""
+        root = None
+        planning_time = execution_time = None
+        stack = []  # (indent, node)
+        for line in lines:
+            match = _TEXT_NODE.match(line)
+            if match is None:
+                time = _TEXT_TIME.match(line)
+                if time and time.group(1) == 'Planning':
+                    planning_time = float(time.group(2))
+                elif time:
+                    execution_time = float(time.group(2))
+                continue
+            node = _text_node(match)
+            indent = len(match.group('indent'))
+            while stack and stack[-1][0] >= indent:
+                stack.pop()
+            if stack:
+                stack[-1][1].children.append(node)
+            elif root is None:
+                root = node
+            stack.append((indent, node))
+        if root is None:
+            raise ValueError('No plan nodes in EXPLAIN output')
+        return cls(_bitmap_scans(root), planning_time=planning_time,
+                   execution_time=execution_time, raw=list(lines))
+
+    @classmethod
+    def from_sqlite(cls, rows):
+        """Parse SQLite `EXPLAIN QUERY PLAN` rows of `(id, parent, _, detail)`"""
+        root = PlanNode('QUERY PLAN')
+        nodes = {0: root}
+        for id, parent, _, detail in rows:
+            node = _sqlite_node(detail)
+            nodes.get(parent, root).children.append(node)
+            nodes[id] = node
+        return cls(root, raw=[tuple(row) for row in rows])
+
+
+def _json_node(data):
+    return PlanNode(
+        data['Node Type'],
+        relation=data.get('Relation Name'),
+        index=data.get('Index Name'),
+        startup_cost=data.get('Startup Cost'),
+        total_cost=data.get('Total Cost'),
+        rows=data.get('Plan Rows'),
+        width=data.get('Plan Width'),
+        actual_rows=data.get('Actual Rows'),
+        actual_time=data.get('Actual Total Time'),
+        loops=data.get('Actual Loops'),
+        detail=data,
+        children=[_json_node(child) for child in data.get('Plans', ())],
+    )
+
+
+def _bitmap_scans(node, relation=None):
+    """Attribute bitmap index scans to the relation of their heap scan
+
+    Bitmap index scans only name their index, as `on <index>` in the text
+    format, the relation is named by the enclosing bitmap heap scan.
+    """
+    if node.node_type == 'Bitmap Index Scan':
+        if node.index is None:
+            node.index, node.relation = node.relation, None
+        if node.relation is None:
+            node.relation = relation
+    elif node.node_type == 'Bitmap Heap Scan':
+        relation = node.relation
+    for child in node.children:
+        _bitmap_scans(child, relation)
+    return node
+
+
+_TEXT_NODE = re.compile(
+    r'(?P<indent>\s*(?:->\s+)?)(?P<label>\S.*?)\s+'
+    r'\(cost=(?P<startup>[\d.]+)\.\.(?P<total>[\d.]+) rows=(?P<rows>\d+) width=(?P<width>\d+)\)'
+    r'(?:\s+\(actual time=[\d.]+\.\.(?P<time>[\d.]+) rows=(?P<actual_rows>\d+) loops=(?P<loops>\d+)\))?'
+)
+_TEXT_TIME = re.compile(r'\s*(Planning|Execution) [Tt]ime: ([\d.]+) ms')
+_TEXT_LABEL = re.compile(
+    r'(?P<type>.+?)(?: using (?P<index>\S+))?(?: on (?P<relation>\S+)(?: \S+)?)?$')
+
+
+def _text_node(match):
+    label = _TEXT_LABEL.match(match.group('label'))
+    actual = match.group('time') is not None
+    return PlanNode(
+        label.group('type'),
+        relation=label.group('relation'),
+        index=label.group('index'),
+        startup_cost=float(match.group('startup')),
+        total_cost=float(match.group('total')),
+        rows=int(match.group('rows')),
+        width=int(match.group('width')),
+        actual_rows=int(match.group('actual_rows')) if actual else None,
+        actual_time=float(match.group('time')) if actual else None,
+        loops=int(match.group('loops')) if actual else None,
+        detail=match.group('label'),
+    )
+
+
+_SQLITE_DETAIL = re.compile(
+    r'(?P<type>SCAN|SEARCH)(?: TABLE)? (?P<relation>\S+)(?: AS \S+)?'
+    r'(?: USING (?:COVERING )?(?:INDEX (?P<index>\S+)|(?P<pk>INTEGER PRIMARY KEY)))?')
+
+
+def _sqlite_node(detail):
+    match = _SQLITE_DETAIL.match(detail)
+    if match is None:
+        return PlanNode(detail, detail=detail)
+    return PlanNode(
+        match.group('type'),
+        relation=match.group('relation'),
+        index=match.group('index') or match.group('pk'),
+        detail=detail,
+    )
+
+
+def explain(query, connection, analyze=False, format='json', **context):
+    """Execute `EXPLAIN` for a query and return its parsed `Plan`
+
+    Connections declaring `dialect = 'sqlite'` are asked for `EXPLAIN QUERY
+    PLAN`, which can neither analyze nor format plans.
+    """
+    sql, args = query._as_sql(connection, context)
+    if getattr(connection, 'dialect', None) == 'sqlite':
+        if analyze:
+            raise ValueError('SQLite cannot EXPLAIN ANALYZE')
+        cursor = connection.cursor()
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, args)
+        return Plan.from_sqlite(cursor.fetchall())
+
+    if format not in ('json', 'text'):
+        raise ValueError('Unknown EXPLAIN format: {format}'.format(format=format))
+    options = ['ANALYZE'] if analyze else []
+    options.append('FORMAT {format}'.format(format=format.upper()))
+    cursor = connection.cursor()
+    cursor.execute('EXPLAIN ({options}) {sql}'.format(
+        options=', '.join(options), sql=sql), args)
+    rows = cursor.fetchall()
+    if format == 'json':
+        return Plan.from_json(rows[0][0])
+    return Plan.from_text(row[0] for row in rows)
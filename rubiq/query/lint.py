@@ -0,0 +1,188 @@
+"""Static performance linter
+
+Finds query patterns that are likely slow from the syntax tree alone:
+
+    for issue in lint(query):
+        print(issue.rule, issue.message)
+
+Rules are functions of a node and the tuple of its ancestors, the query
+first, yielding messages. `RULES` holds the default rules by name, projects
+pass their own mapping to `lint` and `Linter`, or register rules with the
+`rule` decorator.
+"""
+
+from __future__ import absolute_import
+from collections import OrderedDict, namedtuple
+import warnings
+
+from .. import instrument
+from ..sql.base import SQL
+from ..sql.expression import BinaryOperator, FunctionCall, Identifier, InOperator, Value, WindowFunctionCall
+from ..sql.query import Query
+from ..sql.table import CrossJoin
+from ..sql.tree import children, walk, wildcard_qualifier
+from .select import BaseSelect, From, SELECT
+
+Issue = namedtuple('Issue', 'rule message node')
+Issue.__doc__ = """Finding of a lint rule"""
+
+
+class PerformanceWarning(UserWarning):
+    """Warning about a query pattern that is likely slow"""
+
+
+class LintError(Exception):
+    """Raised for queries with lint issues in strict mode"""
+
+    def __init__(self, issues):
+        super().__init__('; '.join('{rule}: {message}'.format(
+            rule=issue.rule, message=issue.message) for issue in issues))
+        self.issues = issues
+
+
+RULES = OrderedDict()
+"""Default rules by name"""
+
+
+def rule(name, rules=RULES):
+    """Decorator registering a rule function under a name"""
+    def register(function):
+        rules[name] = function
+        return function
+    return register
+
+
+def max_offset(threshold=1000):
+    """Make a rule reporting OFFSET values above a threshold"""
+    def large_offset(node, parents):
+        if isinstance(node, BaseSelect) and isinstance(node.offset, int) \
+                and node.offset > threshold:
+            yield 'OFFSET {offset} reads and discards {offset} rows, ' \
+                'paginate on a key instead'.format(offset=node.offset)
+    return large_offset
+
+
+RULES['large_offset'] = max_offset()
+
+
+LIKE_OPERATORS = ('LIKE', 'NOT LIKE', 'ILIKE', 'NOT ILIKE')
+"""Operators taking `%` and `_` wildcard patterns, unlike regular expressions"""
+
+
+@rule('leading_wildcard')
+def leading_wildcard(node, parents):
+    if isinstance(node, BinaryOperator) and node.op in LIKE_OPERATORS:
+        pattern = node.right.value if isinstance(node.right, Value) else node.right
+        if isinstance(pattern, str) and pattern[:1] in ('%', '_'):
+            yield '{op} pattern {pattern!r} starts with a wildcard and ' \
+                'cannot use an index'.format(op=node.op, pattern=pattern)
+
+
+def _nested(node):
+    return isinstance(node, Query)
+
+
+@rule('function_on_column')
+def function_on_column(node, parents):
+    if not isinstance(node, From) or node.where is None:
+        return
+    for child in walk(SQL.wrap(node.where), prune=_nested):
+        if not isinstance(child, BinaryOperator):
+            continue
+        for side in (child.left, child.right):
+            if isinstance(side, FunctionCall) and not isinstance(side, WindowFunctionCall) \
+                    and any(isinstance(param, Identifier) for param in side.params):
+                yield 'Function {name}() applied to a column in WHERE prevents ' \
+                    'index use'.format(name=side.name)
+
+
+@rule('select_star_subquery')
+def select_star_subquery(node, parents):
+    if not isinstance(node, SELECT) or not any(isinstance(parent, Query) for parent in parents):
+        return
+    if isinstance(parents[-1], FunctionCall) and parents[-1].name.upper() == 'EXISTS':
+        return
+    if not node.columns or any(wildcard_qualifier(column) is not None
+                               for column in node.columns):
+        yield 'SELECT * in a subquery reads every column'
+
+
+@rule('not_in_subquery')
+def not_in_subquery(node, parents):
+    if isinstance(node, InOperator) and node.op == 'NOT IN' and isinstance(node.right, Query):
+        yield 'NOT IN against a subquery is not planned as an anti-join, ' \
+            'use NOT EXISTS'
+
+
+@rule('unfiltered_cross_join')
+def unfiltered_cross_join(node, parents):
+    if isinstance(node, From) and node.where is None and any(
+            isinstance(join, CrossJoin) for join in walk(node.source)):
+        yield 'CROSS JOIN without a WHERE clause returns the product of the ' \
+            'joined relations'
+
+
+@rule('unlimited_order')
+def unlimited_order(node, parents):
+    if isinstance(node, BaseSelect) and node.order and node.limit is None \
+            and not parents:
+        yield 'ORDER BY without LIMIT sorts the whole result'
+
+
+def _walk(query):
+    """Iterate over `(node, ancestors)` pairs of a query tree"""
+    stack = [(query, ())]
+    while stack:
+        node, parents = stack.pop()
+        yield node, parents
+        parents += (node,)
+        stack.extend((child, parents) for child in reversed(list(children(node))))
+
+
+def lint(query, rules=None, strict=False):
+    """Return the `Issue` list of a query
+
+    With `strict` set to `'warn'` every issue is also issued as a
+    `PerformanceWarning`, with any other true value a `LintError` is raised
+    if there are issues.
+    """
+    rules = RULES if rules is None else rules
+    issues = [Issue(name, message, node)
+              for node, parents in _walk(query)
+              for name, check in rules.items()
+              for message in check(node, parents)]
+    if issues and strict == 'warn':
+        for issue in issues:
+            warnings.warn('{rule}: {message}'.format(
+                rule=issue.rule, message=issue.message), PerformanceWarning, stacklevel=2)
+    elif issues and strict:
+        raise LintError(issues)
+    return issues
+
+
+class Linter:
+    """Lint every executed query, warning or raising as `lint` does in
+    strict mode
+
+        Linter(strict='warn').install()
+    """
+
+    def __init__(self, rules=None, strict='warn'):
+        self.rules = rules
+        self.strict = strict
+
+    def before_render(self, event):
+        lint(event.query, rules=self.rules, strict=self.strict)
+
+    def install(self):
+        instrument.listen('before_render', self.before_render)
+        return self
+
+    def uninstall(self):
+        instrument.remove('before_render', self.before_render)
+
+    def __enter__(self):
+        return self.install()
+
+    def __exit__(self, *exc_info):
+        self.uninstall()
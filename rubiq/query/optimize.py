@@ -0,0 +1,662 @@
+"""Query optimizer passes
+
+Passes rewrite a query in place and return it, like the builder methods do;
+frozen queries raise `AttributeError` when rewritten, see `SQL.thaw`. Every
+pass only applies rewrites it can prove to preserve the result of the query
+and leaves anything it cannot reason about untouched.
+"""
+
+from __future__ import absolute_import
+import copy
+
+from ..sql.alias import Alias, SubqueryAlias, TableAlias, column_name, relation_name
+from ..sql.base import SQL
+from ..sql.expression import AND, BinaryOperator, ChainOperator, FunctionCall, Identifier, Value, WindowFunctionCall
+from ..sql.query import Query
+from ..sql.sort import Sorting
+from ..sql.table import ConditionalJoin, CrossJoin, Join, NaturalJoin, T, Table
+from ..sql.tree import children, relations, single_pass, transform, walk, wildcard_qualifier
+from .select import CTE, SELECT, SelectSet
+
+
+def _references(nodes, skip=(), nested=True):
+    """Collect the column names referenced under nodes
+
+    Returns a set of identifier names as written, with wildcards recorded as
+    `*` or `qualifier.*`. Nodes in `skip` (compared by identity) are not
+    descended into, nor are subqueries unless `nested` is true.
+    """
+    skip = {id(node) for node in skip}
+    names = set()
+    stack = list(nodes)
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (list, tuple)):
+            stack.extend(node)
+            continue
+        if not isinstance(node, SQL) or id(node) in skip:
+            continue
+        if not nested and isinstance(node, Query):
+            continue
+        if isinstance(node, Identifier):
+            names.add(node._name)
+            continue
+        qualifier = wildcard_qualifier(node)
+        if qualifier is not None:
+            names.add(qualifier + '.*' if qualifier else '*')
+            continue
+        if isinstance(node, SELECT) and not node.columns:
+            names.add('*')
+        for child in children(node):
+            if isinstance(node, FunctionCall) and wildcard_qualifier(child) == '':
+                # count(*) and alike do not read any column
+                continue
+            stack.append(child)
+    return names
+
+
+def _used_columns(references, qualifiers):
+    """Return the column names `references` may read from a relation
+
+    Returns `None` when the relation is read through a wildcard. Unqualified
+    references are assumed to read the relation.
+    """
+    if '*' in references:
+        return None
+    used = set()
+    for name in references:
+        qualifier, _, column = name.rpartition('.')
+        if not qualifier:
+            used.add(column)
+        elif qualifier in qualifiers:
+            if column == '*':
+                return None
+            used.add(column)
+    return used
+
+
+def _merged_columns(query):
+    """Return the column names the USING joins under a query match on
+
+    Returns `None` if there is a NATURAL join, which matches on every
+    column the joined relations have in common.
+    """
+    names = set()
+    for join in walk(query):
+        if isinstance(join, NaturalJoin):
+            return None
+        if isinstance(join, ConditionalJoin) and join.using is not None:
+            using = join.using if isinstance(join.using, (list, tuple)) else (join.using,)
+            names.update(relation_name(SQL.wrap(column, id=True)) for column in using)
+    return names
+
+
+def _update(query, rewritten):
+    """Give a query the attributes of its rewritten copy"""
+    for attr, value in vars(rewritten).items():
+        setattr(query, attr, value)
+
+
+def _ordinal(expr):
+    """Tell whether a GROUP BY or ORDER BY item refers to a column by position"""
+    if isinstance(expr, Sorting):
+        expr = expr.expr
+    if isinstance(expr, Value):
+        expr = expr.value
+    return isinstance(expr, int) and not isinstance(expr, bool)
+
+
+def _prune_select(select, names, used):
+    """Return a copy of `select` without the columns not named in `used`
+
+    `names` are the output names of the columns. Returns the copy and the
+    indices of the kept columns, or `None` if nothing could be pruned.
+    """
+    if not isinstance(select, SELECT) or not select.columns:
+        return None
+    if select.dup is SELECT.DUP.DISTINCT:
+        # dropping columns changes which rows are distinct
+        return None
+    if len(names) != len(select.columns):
+        return None
+    if any(wildcard_qualifier(column) is not None for column in select.columns):
+        return None
+    if any(_called(column, SET_RETURNING) for column in select.columns):
+        # set returning functions multiply rows
+        return None
+    group_by = select.source.group_by if select.source is not None else None
+    if not group_by and (any(_called(column, AGGREGATES) for column in select.columns)
+                         or (select.source is not None and select.source.having)):
+        # aggregates without GROUP BY return a single row
+        return None
+    if any(_ordinal(expr) for expr in tuple(group_by or ()) + tuple(select.order or ())):
+        # positions of the kept columns change
+        return None
+    # clauses of the query itself may refer to its output names
+    inner = _references((select.source, select.order, select.dup_columns,
+                         select.windows), nested=False)
+    inner |= {name.rpartition('.')[2] for name in inner}
+    keep = [index for index, name in enumerate(names)
+            if name is None or name in used or name in inner]
+    if not keep:
+        # a query must project at least one column
+        keep = [0]
+    if len(keep) == len(select.columns):
+        return None
+    # the query may be shared with other parts of the tree
+    pruned = copy.copy(select)
+    object.__setattr__(pruned, 'columns', type(select.columns)(
+        select.columns[index] for index in keep))
+    return pruned, keep
+
+
+def _prune_subquery(query, alias):
+    """Return a copy of a FROM clause subquery alias with a pruned projection
+
+    Returns `None` if nothing could be pruned.
+    """
+    select = alias._origin
+    if alias._columns:
+        names = [column_name(SQL.wrap(column, id=True))
+                 for column in alias._columns]
+    else:
+        names = [column_name(column) for column in getattr(select, 'columns', ())]
+    merged = _merged_columns(query)
+    used = _used_columns(_references((query,), skip=(alias,)),
+                         {relation_name(alias._alias)})
+    if used is None or merged is None:
+        return None
+    pruned = _prune_select(select, names, used | merged)
+    if pruned is None:
+        return None
+    select, keep = pruned
+    alias = copy.copy(alias)
+    object.__setattr__(alias, '_origin', select)
+    if alias._columns:
+        object.__setattr__(alias, '_columns', tuple(alias._columns[index] for index in keep))
+    return alias
+
+
+def _prune_cte(query, cte):
+    """Return a copy of a common table expression with a pruned projection
+
+    Returns `None` if nothing could be pruned.
+    """
+    if cte.recursive:
+        return None
+    name = relation_name(cte.name)
+    qualifiers = {name}
+    for node in walk(query):
+        # the CTE may be referenced under table aliases
+        if isinstance(node, TableAlias) and relation_name(node._origin) == name:
+            qualifiers.add(relation_name(node._alias))
+    columns = cte.name.params if isinstance(cte.name, FunctionCall) else None
+    if columns:
+        names = [column_name(SQL.wrap(column, id=True)) for column in columns]
+    else:
+        names = [column_name(column) for column in getattr(cte.query, 'columns', ())]
+    merged = _merged_columns(query)
+    used = _used_columns(_references((query,), skip=(cte,)), qualifiers)
+    if used is None or merged is None:
+        return None
+    pruned = _prune_select(cte.query, names, used | merged)
+    if pruned is None:
+        return None
+    select, keep = pruned
+    cte = copy.copy(cte)
+    object.__setattr__(cte, 'query', select)
+    if columns:
+        object.__setattr__(cte, 'name', FunctionCall(
+            cte.name.name, *(columns[index] for index in keep)))
+    return cte
+
+
+def _prune(node):
+    """Prune the subqueries and CTEs of a query and its descendants
+
+    Pruned queries are copies, see `transform`.
+    """
+    if not isinstance(node, SELECT):
+        return None
+    aliases = {}
+    if node.source is not None:
+        for relation in relations(node.source.source):
+            if isinstance(relation, SubqueryAlias):
+                aliases[id(relation)] = _prune_subquery(node, relation)
+    ctes = [_prune_cte(node, cte) or cte for cte in node.cte]
+    pruned = node
+    if any(aliases.values()) or any(new is not old for new, old in zip(ctes, node.cte)):
+        pruned = copy.copy(node)
+        object.__setattr__(pruned, 'cte', type(node.cte)(ctes))
+        if node.source is not None:
+            object.__setattr__(pruned, 'source', transform(
+                node.source, lambda relation: aliases.get(id(relation))))
+    return transform(pruned, lambda child: None if child is pruned else _prune(child))
+
+
+def prune_columns(query):
+    """Remove projections of subqueries and CTEs the query does not read
+
+    Columns referenced by the enclosing query, either qualified with the
+    alias or CTE name or unqualified, are kept along with the columns the
+    inner query refers to by name itself. Inner queries are left untouched
+    when they are read through a wildcard, use `DISTINCT`, project a
+    wildcard or a set returning function, aggregate without `GROUP BY` or
+    refer to their columns by position, nor when the query has NATURAL
+    joins; columns USING joins match on are kept. Pruned inner queries are
+    copies, so queries shared with other parts of the tree are not affected.
+    """
+    pruned = transform(query, _prune)
+    if pruned is not query:
+        _update(query, pruned)
+    return query
+
+
+def _joins(owner, attr):
+    """Iterate over `(owner, attribute, join)` for joins under a FROM source"""
+    node = getattr(owner, attr)
+    if isinstance(node, Join):
+        yield owner, attr, node
+        yield from _joins(node, 'left')
+        yield from _joins(node, 'right')
+
+
+def _conjuncts(expr):
+    """Iterate over the operands of a top level AND chain"""
+    if isinstance(expr, ChainOperator) and expr.sqliter.sep == ' AND ':
+        for operand in expr.sqliter:
+            yield from _conjuncts(operand)
+    else:
+        yield expr
+
+
+def _join_columns(join, qualifier):
+    """Return the columns of the right side a join matches on equality"""
+    if join.using is not None:
+        using = join.using if isinstance(join.using, (list, tuple)) else (join.using,)
+        return {relation_name(SQL.wrap(column, id=True)) for column in using}
+    columns = set()
+    for expr in _conjuncts(join.on):
+        if not isinstance(expr, BinaryOperator) or expr.op != '=':
+            continue
+        for column, other in ((expr.left, expr.right), (expr.right, expr.left)):
+            if not isinstance(column, Identifier):
+                continue
+            column_qualifier, _, name = column._name.rpartition('.')
+            if column_qualifier != qualifier:
+                continue
+            # the other side must be known not to come from the joined table
+            other = _references((SQL.wrap(other),))
+            if all(ref.rpartition('.')[0] not in ('', qualifier) for ref in other):
+                columns.add(name)
+    return columns
+
+
+def _unique_keys(keys, table):
+    """Return the unique keys declared for a table as tuples of columns"""
+    return [(key,) if isinstance(key, str) else tuple(key)
+            for key in keys.get(table, ())]
+
+
+def _eliminate_join(select, keys):
+    """Remove a single redundant LEFT JOIN from a query"""
+    for owner, attr, join in _joins(select.source, 'source'):
+        if not isinstance(join, ConditionalJoin) or join.type is not Join.TYPE.LEFT:
+            continue
+        right = join.right
+        if isinstance(right, TableAlias) and isinstance(right._origin, Table):
+            table, qualifier = right._origin._name, relation_name(right._alias)
+        elif isinstance(right, Table):
+            table = qualifier = right._name
+        else:
+            continue
+        columns = _join_columns(join, qualifier)
+        if not any(set(key) <= columns for key in _unique_keys(keys, table)):
+            continue
+        condition = (join.on,) if join.on is not None else join.using
+        if not isinstance(condition, (list, tuple)):
+            condition = (condition,)
+        references = _references((select,), skip=(right,) + tuple(condition))
+        if any(ref == '*' or ref.rpartition('.')[0] in ('', qualifier)
+               for ref in references):
+            continue
+        setattr(owner, attr, join.left)
+        return True
+    return False
+
+
+def eliminate_joins(query, keys):
+    """Remove LEFT JOINs whose joined table the query never reads
+
+    `keys` maps table names to their unique keys, each a column name or a
+    sequence of column names, as returned by `Schema.unique_keys()`. A join
+    is removed only when its condition matches a unique key of the joined
+    table by equality, so it cannot multiply rows, and no other part of the
+    query refers to the table; unqualified column references are assumed to
+    refer to it.
+    """
+    for node in walk(query):
+        if isinstance(node, SELECT) and node.source is not None:
+            while _eliminate_join(node, keys):
+                pass
+    return query
+
+
+AGGREGATES = {
+    'array_agg', 'avg', 'bit_and', 'bit_or', 'bool_and', 'bool_or', 'count',
+    'every', 'json_agg', 'json_object_agg', 'jsonb_agg', 'jsonb_object_agg',
+    'max', 'min', 'stddev', 'stddev_pop', 'stddev_samp', 'string_agg', 'sum',
+    'var_pop', 'var_samp', 'variance', 'xmlagg',
+}
+"""Names of aggregate functions predicates must not be pushed across"""
+
+VOLATILE = {
+    'clock_timestamp', 'gen_random_uuid', 'nextval', 'random', 'setval',
+    'timeofday', 'uuid_generate_v4',
+}
+"""Names of volatile functions whose evaluation count must not change"""
+
+SET_RETURNING = {
+    'generate_series', 'generate_subscripts', 'json_array_elements',
+    'json_array_elements_text', 'json_each', 'json_each_text',
+    'json_object_keys', 'json_populate_recordset', 'json_to_recordset',
+    'jsonb_array_elements', 'jsonb_array_elements_text', 'jsonb_each',
+    'jsonb_each_text', 'jsonb_object_keys', 'jsonb_path_query',
+    'jsonb_populate_recordset', 'jsonb_to_recordset', 'regexp_matches',
+    'regexp_split_to_table', 'string_to_table', 'unnest',
+}
+"""Names of set returning functions, which change the number of rows"""
+
+
+def _calls(node, names):
+    """Tell whether a window function or a function in `names` is called"""
+    for node in walk(SQL.wrap(node)):
+        if isinstance(node, WindowFunctionCall):
+            return True
+        if isinstance(node, FunctionCall) and node.name.lower() in names:
+            return True
+    return False
+
+
+def _nested(node):
+    """Tell whether a node evaluates apart from the rows of its query"""
+    return isinstance(node, (WindowFunctionCall, Query))
+
+
+def _called(node, names, nested=False):
+    """Tell whether an expression itself calls a function in `names`
+
+    Unless `nested` is true, calls in window functions and subqueries are
+    not counted, they do not aggregate or multiply the rows of the query of
+    the expression.
+    """
+    for node in walk(SQL.wrap(node), prune=None if nested else _nested):
+        if isinstance(node, FunctionCall) and not isinstance(node, WindowFunctionCall) \
+                and node.name.lower() in names:
+            return True
+    return False
+
+
+def _filtered_relations(source):
+    """Iterate over the relations a WHERE clause filters before any outer join
+
+    Relations on the nullable side of an outer join are not included, as
+    filtering them before the join would produce NULL extended rows instead
+    of removing rows.
+    """
+    if isinstance(source, CrossJoin):
+        yield from _filtered_relations(source.left)
+        yield from _filtered_relations(source.right)
+    elif isinstance(source, Join):
+        if source.type in (Join.TYPE.INNER, Join.TYPE.LEFT):
+            yield from _filtered_relations(source.left)
+        if source.type in (Join.TYPE.INNER, Join.TYPE.RIGHT):
+            yield from _filtered_relations(source.right)
+    else:
+        yield source
+
+
+def _pushdown_target(select, names):
+    """Return the columns of a query predicates can be pushed into
+
+    Returns a mapping of output names to projected expressions, or `None` if
+    predicates cannot be moved into the query.
+    """
+    if not isinstance(select, SELECT) or select.source is None:
+        return None
+    if select.limit is not None or select.offset is not None:
+        return None
+    if select.source.group_by or select.source.having or select.windows:
+        return None
+    if not select.columns or len(names) != len(select.columns):
+        return None
+    if any(_calls(column, AGGREGATES) for column in select.columns):
+        return None
+    columns = {}
+    for name, column in zip(names, select.columns):
+        if isinstance(column, TableAlias):
+            # scalar subqueries are not worth evaluating twice
+            continue
+        if isinstance(column, Alias):
+            column = column._origin
+        if name is not None and not _calls(column, VOLATILE | SET_RETURNING):
+            columns[name] = column
+    if select.dup_columns:
+        # with DISTINCT ON only the distinct columns can be filtered early
+        distinct = {repr(SQL.wrap(column)) for column in select.dup_columns}
+        columns = {name: column for name, column in columns.items()
+                   if repr(SQL.wrap(column)) in distinct}
+    return columns
+
+
+def _pushdown_targets(select):
+    """Map qualifiers of relations in the FROM clause to pushdown targets
+
+    Targets are `(owner, attribute, query, columns)` tuples, where the query
+    is the `attribute` of `owner`.
+    """
+    targets = {}
+    ctes = {relation_name(cte.name): cte for cte in select.cte if not cte.recursive}
+    for relation in _filtered_relations(select.source.source):
+        if isinstance(relation, SubqueryAlias):
+            if relation._lateral:
+                continue
+            owner, attr, query = relation, '_origin', relation._origin
+            if relation._columns:
+                names = [column_name(SQL.wrap(column, id=True))
+                         for column in relation._columns]
+            else:
+                names = [column_name(column)
+                         for column in getattr(query, 'columns', ())]
+            qualifier = relation_name(relation._alias)
+        elif isinstance(relation, (Table, Identifier, TableAlias)):
+            origin = relation._origin if isinstance(relation, TableAlias) else relation
+            cte = ctes.get(relation_name(origin))
+            if cte is None or not isinstance(origin, (Table, Identifier)):
+                continue
+            # filtering the CTE must not affect its other references
+            uses = sum(1 for node in walk(select, prune=lambda node: node is cte)
+                       if isinstance(node, (Table, Identifier))
+                       and node._name == origin._name)
+            if uses != 1:
+                continue
+            owner, attr, query = cte, 'query', cte.query
+            if isinstance(cte.name, FunctionCall):
+                names = [column_name(SQL.wrap(column, id=True))
+                         for column in cte.name.params]
+            else:
+                names = [column_name(column)
+                         for column in getattr(query, 'columns', ())]
+            qualifier = relation_name(relation._alias if relation is not origin else origin)
+        else:
+            continue
+        columns = _pushdown_target(query, names)
+        if columns:
+            targets[qualifier] = owner, attr, query, columns
+    return targets
+
+
+def _push_predicates(select):
+    """Move conjuncts of the WHERE clause of a query into its subqueries"""
+    targets = _pushdown_targets(select)
+    if not targets:
+        return
+    kept = []
+    copies = {}
+    for expr in _conjuncts(select.source.where):
+        references = _references((SQL.wrap(expr),))
+        qualifiers = {name.rpartition('.')[0] for name in references}
+        if len(qualifiers) != 1 or any(isinstance(node, Query) for node in walk(SQL.wrap(expr))):
+            kept.append(expr)
+            continue
+        qualifier, = qualifiers
+        if qualifier not in targets or _calls(expr, VOLATILE):
+            kept.append(expr)
+            continue
+        owner, attr, query, columns = targets[qualifier]
+        if not all(name.rpartition('.')[2] in columns for name in references):
+            kept.append(expr)
+            continue
+        if qualifier not in copies:
+            # the query may be shared with other parts of the tree
+            copies[qualifier] = query.copy()
+            setattr(owner, attr, copies[qualifier])
+        query = copies[qualifier]
+
+        def substitute(node):
+            if isinstance(node, Identifier):
+                return columns[node._name.rpartition('.')[2]]
+            return None
+
+        expr = transform(SQL.wrap(expr), substitute)
+        where = query.source.where
+        query.source.where = expr if where is None else AND(where, expr)
+    if not kept:
+        select.source.where = None
+    elif len(kept) == 1:
+        select.source.where = kept[0]
+    else:
+        select.source.where = AND(*kept)
+
+
+def push_predicates(query):
+    """Move WHERE conditions into the subqueries and CTEs they filter
+
+    Conjuncts of a WHERE clause referring only to the columns of a single
+    subquery or once-referenced, non-recursive CTE are rewritten in terms of
+    its projection and moved into its WHERE clause, of a copy of the
+    subquery or CTE query. Queries that aggregate, use window functions or
+    limits are not filtered early, neither are relations on the nullable
+    side of outer joins, nor columns projecting window, set returning or
+    volatile functions. Under `DISTINCT ON` only conditions on the distinct
+    expressions are pushed down.
+    """
+    for node in walk(query):
+        if isinstance(node, SELECT) and node.source is not None \
+                and node.source.where is not None:
+            _push_predicates(node)
+    return query
+
+
+def _local_names(query):
+    """Return the names of relations a query and its subqueries define"""
+    names = set()
+    for node in walk(query):
+        if isinstance(node, SELECT):
+            names.update(relation_name(cte.name) for cte in node.cte)
+            if node.source is not None:
+                for relation in relations(node.source.source):
+                    if isinstance(relation, TableAlias):
+                        names.add(relation_name(relation._alias))
+                    elif isinstance(relation, (Table, Identifier)):
+                        names.add(relation._name)
+    return names
+
+
+def _hoistable(query, ctes):
+    """Tell whether a subquery can be evaluated on its own in a CTE
+
+    Subqueries referring to relations of enclosing queries (as far as
+    qualified references tell) or to CTEs of the statement are not.
+    """
+    local = _local_names(query)
+    for name in _references((query,)):
+        qualifier = name.rpartition('.')[0]
+        if qualifier and qualifier not in local:
+            return False
+    return not any(isinstance(node, (Table, Identifier)) and node._name in ctes
+                   for node in walk(query))
+
+
+def _output_names(query):
+    """Return the column names of a query, `None` if unknown or ambiguous"""
+    while isinstance(query, SelectSet):
+        query = query.left
+    if not isinstance(query, SELECT):
+        return None
+    names = [column_name(column) for column in query.columns]
+    if not names or None in names or len(set(names)) != len(names):
+        return None
+    return names
+
+
+def extract_subqueries(query, MATERIALIZED=None, prefix='subquery_'):
+    """Hoist repeated subqueries into common table expressions
+
+    Subqueries rendering identically at several places of the query are
+    moved into a CTE named after `prefix` and replaced by a query selecting
+    their columns from it, so the database evaluates them once. The largest
+    duplicates are hoisted first. `MATERIALIZED` is passed on to the created
+    CTEs.
+
+    Correlated subqueries are recognized by their qualified references only,
+    so references to enclosing queries must be qualified. Subqueries calling
+    volatile functions, whose evaluations differ, subqueries holding
+    iterators, which comparing would consume, and FROM clause subqueries
+    with unnamed or duplicate column names are left alone. Other subqueries
+    with such columns, e.g. scalar aggregates, select `*` from their CTE.
+    """
+    if not isinstance(query, SELECT) or any(cte.recursive for cte in query.cte):
+        return query
+    ctes = {relation_name(cte.name) for cte in query.cte}
+    taken = ctes | {node._name for node in walk(query)
+                    if isinstance(node, (Table, Identifier))}
+    while True:
+        lateral = {id(node._origin) for node in walk(query)
+                   if isinstance(node, SubqueryAlias) and node._lateral}
+        # the enclosing query reads the columns of FROM subqueries by name
+        sources = {id(relation._origin) for node in walk(query)
+                   if isinstance(node, SELECT) and node.source is not None
+                   for relation in relations(node.source.source)
+                   if isinstance(relation, SubqueryAlias)}
+        occurrences = {}
+        for node in walk(query):
+            if node is query or not isinstance(node, Query):
+                continue
+            if id(node) in lateral or single_pass(node) or not _hoistable(node, ctes):
+                continue
+            if _output_names(node) is None and id(node) in sources:
+                continue
+            if _called(node, VOLATILE, nested=True):
+                continue
+            occurrences.setdefault(repr(node), []).append(node)
+        repeated = [(len(key), nodes) for key, nodes in occurrences.items()
+                    if len(nodes) > 1]
+        if not repeated:
+            return query
+        _, nodes = max(repeated, key=lambda item: item[0])
+        name = next(prefix + str(index) for index in range(1, len(taken) + 2)
+                    if prefix + str(index) not in taken)
+        taken.add(name)
+        ctes.add(name)
+        cte = CTE(Identifier(name), nodes[0], MATERIALIZED=MATERIALIZED)
+        ids = {id(node) for node in nodes}
+        columns = [Identifier(column) for column in _output_names(nodes[0]) or ()]
+
+        def replace(node):
+            if id(node) in ids:
+                return SELECT(*columns).FROM(T(name))
+            return None
+
+        _update(query, transform(query, replace))
+        query.cte = [cte] + list(query.cte)
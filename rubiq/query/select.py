@@ -2,7 +2,7 @@
 
 from __future__ import absolute_import
 from ..sql.query import DataManipulationQuery
-from ..sql.base import SQL, SQLIterator
+from ..sql.base import SQL, SQLIterator, fragment, modifiable_copy
 from ..sql.name import F
 from ..sql.window import Window
 from enum import Enum
@@ -42,6 +42,18 @@ class BaseSelect(DataManipulationQuery):
         self.offset = offset
         return self
 
+    def explain(self, connection, analyze=False, format='json', **context):
+        """
+        Return the parsed `Plan` of the query, see `explain.explain`
+        """
+        return explain(self, connection, analyze=analyze, format=format, **context)
+
+    def rows(self, connection, **context):
+        """
+        Execute the query and iterate over its rows as named tuples
+        """
+        return rows(self, self.execute(connection, **context))
+
     def count(self, connection, **context):
         """
         Return count of rows in result
@@ -100,6 +112,14 @@ class SELECT(BaseSelect):
         self.windows = []
         self.cte = []
 
+    def fetch_columns(self, connection, dtypes=None, batch_size=10000, **context):
+        """Execute the query and return its columns as NumPy arrays, by name
+
+        See `rubiq.columnar.fetch_columns`.
+        """
+        return fetch_columns(self, connection, dtypes=dtypes,
+                             batch_size=batch_size, **context)
+
     def ALL(self, *columns):
         self.dup = self.DUP.ALL
         self.dup_columns = columns
@@ -123,8 +143,9 @@ class SELECT(BaseSelect):
             dup_args = ()
 
         if self.columns:
-            columns_sql, columns_args = SQLIterator(
-                self.columns)._as_sql(connection, context)
+            columns_sql, columns_args = SQL.merge(
+                fragment(SQL.wrap(column), connection, context)
+                for column in self.columns)
         else:
             columns_sql = u'*'
             columns_args = ()
@@ -136,7 +157,7 @@ class SELECT(BaseSelect):
         args = dup_args + columns_args
 
         if self.source is not None:
-            source_sql, source_args = self.source._as_sql(connection, context)
+            source_sql, source_args = fragment(self.source, connection, context)
             sql += source_sql
             args += source_args
         if self.windows:
@@ -144,7 +165,7 @@ class SELECT(BaseSelect):
             for name, window in sorted(self.windows):
                 alias_sql, alias_args = SQL.wrap(
                     name, id=True)._as_sql(connection, context)
-                window_sql, window_args = window._as_sql(connection, context)
+                window_sql, window_args = fragment(window, connection, context)
                 windows.append(u'{name} AS {window}'.format(
                     name=alias_sql,
                     window=window_sql,
@@ -159,8 +180,8 @@ class SELECT(BaseSelect):
         args += order_limit_args
 
         if self.cte:
-            cte_sql, cte_args = SQLIterator(
-                self.cte)._as_sql(connection, context)
+            cte_sql, cte_args = SQL.merge(
+                fragment(cte, connection, context) for cte in self.cte)
             sql = u'WITH {cte} {query}'.format(
                 cte=cte_sql,
                 query=sql,
@@ -170,11 +191,14 @@ class SELECT(BaseSelect):
         return sql, args
 
     def copy(self):
-        copy = self.set_copy()
-        copy.order = self.order
-        copy.limit = self.limit
-        copy.offset = self.offset
-        copy.set = [query.copy() for query in self.set]
+        """Return a modifiable copy sharing the clauses of the query
+
+        Copying a frozen query is the cheap way to vary some of its clauses,
+        the frozen ones keep their rendering cached, see `fragment`.
+        """
+        copy = modifiable_copy(self)
+        if copy.source is not None:
+            copy.source = copy.source.copy()
         return copy
 
     def FROM(self, *args, **kwargs):
@@ -314,13 +338,13 @@ class From(SQL):
         self.having = None
 
     def _as_sql(self, connection, context):
-        sql, args = SQL.wrap(self.source)._as_sql(connection, context)
+        sql, args = fragment(SQL.wrap(self.source), connection, context)
         sql = u' FROM {source}'.format(
             source=sql,
         )
         if self.where:
-            where_sql, where_args = SQL.wrap(
-                self.where)._as_sql(connection, context)
+            where_sql, where_args = fragment(
+                SQL.wrap(self.where), connection, context)
             sql += u' WHERE {condition}'.format(
                 condition=where_sql,
             )
@@ -333,8 +357,8 @@ class From(SQL):
             )
             args += group_args
         if self.having:
-            having_sql, having_args = SQL.wrap(
-                self.having)._as_sql(connection, context)
+            having_sql, having_args = fragment(
+                SQL.wrap(self.having), connection, context)
             sql += u' HAVING {condition}'.format(
                 condition=having_sql,
             )
@@ -342,11 +366,8 @@ class From(SQL):
         return sql, args
 
     def copy(self):
-        copy = self.__class__(source=self.source.copy())
-        copy.where = None if self.where is None else self.where.copy()
-        copy.group_by = None if self.group_by is None else self.group_by.copy()
-        copy.having = None if self.having is None else self.having.copy()
-        return copy
+        """Return a modifiable copy sharing the clauses"""
+        return modifiable_copy(self)
 
     def CROSS_JOIN(self, *args, **kwargs):
         kwargs.setdefault('parens', False)
@@ -395,17 +416,25 @@ class From(SQL):
 class CTE(SQL):
     """Wrapper for common table expressions"""
 
-    def __init__(self, name, query, RECURSIVE=False):
+    def __init__(self, name, query, RECURSIVE=False, MATERIALIZED=None):
         self.name = name
         self.query = query
         self.recursive = RECURSIVE
+        self.materialized = MATERIALIZED
 
     def _as_sql(self, connection, context):
         name_sql, name_args = SQL.wrap(
             self.name, id=True)._as_sql(connection, context)
-        query_sql, query_args = self.query._as_sql(connection, context)
-        sql = u'{name} AS ({query})'.format(
+        query_sql, query_args = fragment(self.query, connection, context)
+        if self.materialized is None:
+            materialized = u''
+        elif self.materialized:
+            materialized = u'MATERIALIZED '
+        else:
+            materialized = u'NOT MATERIALIZED '
+        sql = u'{name} AS {materialized}({query})'.format(
             name=name_sql,
+            materialized=materialized,
             query=query_sql,
         )
         if self.recursive:
@@ -414,3 +443,6 @@ class CTE(SQL):
 
 
 from ..sql.alias import SubqueryAlias
+from .explain import explain
+from ..columnar import fetch_columns
+from ..rows import rows
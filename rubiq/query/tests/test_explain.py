@@ -0,0 +1,136 @@
+import json
+import pytest
+from rubiq.query import *
+from rubiq.query.explain import Plan
+from rubiq.sqlite import SQLiteConnection
+
+
+PG_JSON = [{
+    'Plan': {
+        'Node Type': 'Hash Join', 'Startup Cost': 1.09, 'Total Cost': 2.24,
+        'Plan Rows': 5, 'Plan Width': 36,
+        'Plans': [
+            {'Node Type': 'Seq Scan', 'Relation Name': 'orders', 'Startup Cost': 0.0,
+             'Total Cost': 1.05, 'Plan Rows': 5, 'Plan Width': 8},
+            {'Node Type': 'Hash', 'Startup Cost': 1.04, 'Total Cost': 1.04,
+             'Plan Rows': 4, 'Plan Width': 36, 'Plans': [
+                 {'Node Type': 'Index Scan', 'Relation Name': 'users',
+                  'Index Name': 'users_pkey', 'Startup Cost': 0.0,
+                  'Total Cost': 1.04, 'Plan Rows': 4, 'Plan Width': 36},
+             ]},
+        ],
+    },
+    'Planning Time': 0.1,
+}]
+
+PG_TEXT = '''\
+Hash Join  (cost=1.09..2.24 rows=5 width=36) (actual time=0.030..0.033 rows=5 loops=1)
+  Hash Cond: (o.user_id = u.id)
+  ->  Seq Scan on orders o  (cost=0.00..1.05 rows=5 width=8) (actual time=0.005..0.006 rows=5 loops=1)
+  ->  Hash  (cost=1.04..1.04 rows=4 width=36) (actual time=0.010..0.010 rows=4 loops=1)
+        ->  Index Scan using users_pkey on users u  (cost=0.00..1.04 rows=4 width=36) (actual time=0.003..0.004 rows=4 loops=1)
+Planning Time: 0.081 ms
+Execution Time: 0.061 ms'''.splitlines()
+
+
+def check(plan):
+    assert plan.total_cost == 2.24
+    assert plan.rows == 5
+    assert [node.node_type for node in plan] == ['Hash Join', 'Seq Scan', 'Hash', 'Index Scan']
+    assert [node.relation for node in plan.seq_scans()] == ['orders']
+    assert plan.uses_index('users') and not plan.uses_index('orders')
+
+
+def test_json():
+    plan = Plan.from_json(json.dumps(PG_JSON))
+    check(plan)
+    assert plan.planning_time == 0.1
+
+
+def test_text():
+    plan = Plan.from_text(PG_TEXT)
+    check(plan)
+    assert plan.root.actual_rows == 5
+    assert plan.root.children[1].children[0].index == 'users_pkey'
+    assert plan.execution_time == 0.061
+
+
+PG_BITMAP_JSON = [{'Plan': {
+    'Node Type': 'Bitmap Heap Scan', 'Relation Name': 'orders', 'Alias': 'o',
+    'Startup Cost': 4.18, 'Total Cost': 12.64, 'Plan Rows': 4, 'Plan Width': 8,
+    'Plans': [
+        {'Node Type': 'BitmapOr', 'Startup Cost': 8.36, 'Total Cost': 8.36,
+         'Plan Rows': 8, 'Plan Width': 0, 'Plans': [
+             {'Node Type': 'Bitmap Index Scan', 'Index Name': 'orders_user_id',
+              'Startup Cost': 0.0, 'Total Cost': 4.18, 'Plan Rows': 4, 'Plan Width': 0},
+             {'Node Type': 'Bitmap Index Scan', 'Index Name': 'orders_total',
+              'Startup Cost': 0.0, 'Total Cost': 4.18, 'Plan Rows': 4, 'Plan Width': 0},
+         ]},
+    ],
+}}]
+
+PG_BITMAP_TEXT = '''\
+Bitmap Heap Scan on orders o  (cost=4.18..12.64 rows=4 width=8)
+  Recheck Cond: (user_id = 1)
+  ->  Bitmap Index Scan on orders_user_id  (cost=0.00..4.18 rows=4 width=0)
+        Index Cond: (user_id = 1)'''.splitlines()
+
+
+def test_bitmap_json():
+    plan = Plan.from_json(PG_BITMAP_JSON)
+    assert plan.uses_index('orders') and not plan.uses_index('orders_user_id')
+    assert [(node.relation, node.index) for node in plan.index_scans()] == [
+        ('orders', 'orders_user_id'), ('orders', 'orders_total')]
+    assert plan.seq_scans() == []
+
+
+def test_bitmap_text():
+    plan = Plan.from_text(PG_BITMAP_TEXT)
+    assert plan.uses_index('orders') and not plan.uses_index('orders_user_id')
+    scan, = plan.index_scans()
+    assert (scan.node_type, scan.relation, scan.index) == (
+        'Bitmap Index Scan', 'orders', 'orders_user_id')
+
+
+class Connection(SQLiteConnection):
+    """SQLite connection answering EXPLAIN with a canned PostgreSQL plan"""
+
+    dialect = 'postgresql'
+
+    def cursor(self):
+        connection = self
+
+        class Cursor:
+            def execute(self, sql, args):
+                connection.executed = sql, args
+
+            def fetchall(self):
+                return [(json.dumps(PG_JSON),)]
+
+        return Cursor()
+
+
+def test_explain_postgresql():
+    connection = Connection()
+    plan = SELECT(C.id).FROM(T.users).WHERE(C.id == 1).explain(connection, analyze=True)
+    check(plan)
+    assert connection.executed == (
+        'EXPLAIN (ANALYZE, FORMAT JSON) SELECT "id" FROM "users" WHERE ("id" = %s)', (1,))
+
+
+def test_explain_sqlite():
+    connection = SQLiteConnection()
+    connection.executescript('''
+        CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT);
+        CREATE TABLE orders (id INTEGER PRIMARY KEY, user_id INTEGER, total REAL);
+        CREATE INDEX orders_user_id ON orders (user_id);
+    ''')
+    plan = SELECT(C.id).FROM(T.users).WHERE(C.id == 1).explain(connection)
+    assert not plan.seq_scans()
+    assert plan.uses_index('users')
+    plan = SELECT(C.id).FROM(T.users).WHERE(C.name == 'x').explain(connection)
+    assert [node.relation for node in plan.seq_scans()] == ['users']
+    plan = SELECT(C.total).FROM(T.orders).WHERE(C.user_id == 1).explain(connection)
+    assert [node.index for node in plan] == [None, 'orders_user_id']
+    with pytest.raises(ValueError):
+        SELECT(C.id).FROM(T.users).explain(connection, analyze=True)
@@ -0,0 +1,80 @@
+import copy
+import pickle
+from rubiq.dummy import dummy_connection, dummy_context
+from rubiq.query import *
+from rubiq.sql.table import ConditionalJoin, Table
+from rubiq.sql.tree import transform
+from rubiq.sqlite import SQLiteConnection
+
+
+def base():
+    users = T.users()
+    return (SELECT(users.id, A.total(F.sum(C.total)))
+            .WITH('recent', SELECT(C.id).FROM(T.orders).WHERE(C.created > 7))
+            .FROM(T.users).LEFT_JOIN(T.recent, ON=(C.user_id == users.id))
+            .GROUP_BY(users.id)
+            .WINDOW('w', PARTITION_BY=(users.id,)))
+
+
+def render(query, connection=dummy_connection, context=dummy_context):
+    return query._as_sql(connection, context)
+
+
+def test_copy():
+    query = base()
+    varied = query.copy().WHERE(C.id == 1).LIMIT(10)
+    assert render(query) == render(base())
+    assert render(varied) == render(base().WHERE(C.id == 1).LIMIT(10))
+
+    frozen = base().freeze()
+    varied = frozen.copy().WHERE(C.id == 2).LIMIT(5)
+    assert not varied._frozen and not varied.source._frozen
+    assert varied.source.source is frozen.source.source
+    varied.columns.append(C.name)
+    assert render(frozen) == render(base())
+    expected = base().WHERE(C.id == 2).LIMIT(5)
+    expected.columns.append(C.name)
+    assert render(varied) == render(expected)
+
+
+def test_reuse(monkeypatch):
+    calls = []
+    as_sql = ConditionalJoin._as_sql
+    monkeypatch.setattr(ConditionalJoin, '_as_sql', lambda self, connection, context: (
+        calls.append(self), as_sql(self, connection, context))[1])
+
+    frozen = base().freeze()
+    for value in range(3):
+        query = frozen.copy().WHERE(C.id == value)
+        assert render(query) == render(base().WHERE(C.id == value))
+    # the unfrozen reference queries render the join every time
+    assert len(calls) == 4
+
+    # renderings are cached per connection class
+    sql, args = render(frozen.copy(), SQLiteConnection())
+    assert '"recent"' in sql
+    assert len(calls) == 5
+
+
+def test_variables():
+    frozen = (SELECT(C.id).FROM(T.users).WHERE(C.name == V.name)
+              .WITH('w', SELECT(C.id).FROM(T.orders).WHERE(C.total > V.total))
+              .freeze())
+    for name, total in (('a', 1), ('b', 2)):
+        sql, args = render(frozen.copy(), context={'name': name, 'total': total})
+        assert args == (total, name)
+
+
+def test_copies():
+    frozen = base().freeze()
+    render(frozen)
+    assert '_fragments' in vars(frozen.source.source)
+    assert render(pickle.loads(pickle.dumps(frozen))) == render(frozen)
+    assert '_fragments' not in vars(copy.copy(frozen.source.source))
+    assert '_fragments' not in vars(frozen.thaw().source.source)
+
+    # modified copies of frozen nodes do not reuse the original rendering
+    changed = transform(frozen, lambda node: (
+        T.others if isinstance(node, Table) and node._name == 'recent' else None))
+    assert render(changed)[0] == render(base())[0].replace(
+        'JOIN recent', 'JOIN others')
@@ -0,0 +1,80 @@
+import pytest
+from rubiq.query import *
+from rubiq.query.lint import Linter, LintError, PerformanceWarning, RULES, lint, max_offset
+from rubiq.sqlite import SQLiteConnection
+
+
+def rules(query, **kwargs):
+    return [issue.rule for issue in lint(query, **kwargs)]
+
+
+def test_clean():
+    query = (SELECT(C.id).FROM(T.users)
+             .WHERE(AND(C.name == 'x', LIKE(C.email, 'a%'))).ORDER_BY(C.id).LIMIT(10))
+    assert lint(query) == []
+
+
+def test_large_offset():
+    assert rules(SELECT(C.id).FROM(T.t).LIMIT(10, 5000)) == ['large_offset']
+    assert rules(SELECT(C.id).FROM(T.t).LIMIT(10, 50)) == []
+    assert rules(SELECT(C.id).FROM(T.t).LIMIT(10, 50),
+                 rules={'offset': max_offset(10)}) == ['offset']
+
+
+def test_leading_wildcard():
+    assert rules(SELECT(C.id).FROM(T.t).WHERE(ILIKE(C.name, '%bob'))) == ['leading_wildcard']
+    assert rules(SELECT(C.id).FROM(T.t).WHERE(LIKE(C.name, L('_ob')))) == ['leading_wildcard']
+    assert rules(SELECT(C.id).FROM(T.t).WHERE(RLIKE(C.name, '%bob'))) == []
+    assert rules(SELECT(C.id).FROM(T.t).WHERE(NOT_RLIKE(C.name, '_ob'))) == []
+
+
+def test_function_on_column():
+    query = SELECT(C.id).FROM(T.t).WHERE(F.lower(C.name) == 'bob')
+    issue, = lint(query)
+    assert issue.rule == 'function_on_column'
+    assert 'lower()' in issue.message
+    assert rules(SELECT(C.id).FROM(T.t).WHERE(C.name == F.lower('BOB'))) == []
+
+
+def test_select_star_subquery():
+    query = SELECT(C.id).FROM(T.t).WHERE(IN(C.id, SELECT().FROM(T.u)))
+    assert rules(query) == ['select_star_subquery']
+    query = SELECT(C.id).FROM(T.t).WHERE(F.EXISTS(SELECT().FROM(T.u)))
+    assert rules(query) == []
+    assert rules(SELECT().FROM(T.t)) == []
+
+
+def test_not_in_subquery():
+    query = SELECT(C.id).FROM(T.t).WHERE(NOT_IN(C.id, SELECT(C.id).FROM(T.u)))
+    assert rules(query) == ['not_in_subquery']
+    assert rules(SELECT(C.id).FROM(T.t).WHERE(NOT_IN(C.id, [1, 2]))) == []
+
+
+def test_cross_join():
+    query = SELECT(C.id).FROM(T.t).CROSS_JOIN(T.u)
+    assert rules(query) == ['unfiltered_cross_join']
+    assert rules(query.WHERE(C.a == C.b)) == []
+
+
+def test_order_without_limit():
+    assert rules(SELECT(C.id).FROM(T.t).ORDER_BY(C.id)) == ['unlimited_order']
+
+
+def test_strict():
+    query = SELECT(C.id).FROM(T.t).ORDER_BY(C.id)
+    with pytest.warns(PerformanceWarning):
+        lint(query, strict='warn')
+    with pytest.raises(LintError) as error:
+        lint(query, strict=True)
+    assert error.value.issues[0].rule == 'unlimited_order'
+
+
+def test_linter():
+    connection = SQLiteConnection()
+    connection.execute('CREATE TABLE t (id INTEGER)')
+    with Linter(strict=True):
+        with pytest.raises(LintError):
+            SELECT(C.id).FROM(T.t).ORDER_BY(C.id).execute(connection)
+        SELECT(C.id).FROM(T.t).execute(connection)
+    SELECT(C.id).FROM(T.t).ORDER_BY(C.id).execute(connection)
+    assert 'unlimited_order' in RULES
@@ -0,0 +1,375 @@
+import pytest
+from rubiq.query import *
+from rubiq.query.lint import lint
+from rubiq.query.optimize import eliminate_joins, extract_subqueries, prune_columns, push_predicates
+
+
+def test_prune_subquery():
+    sub = SELECT(C.foo, A.total(F.sum(C.qty))).FROM(T.table).GROUP_BY(C.foo)
+    select = SELECT(T.sub().foo).FROM(A.sub(sub))
+    sql = 'SELECT sub.foo FROM (SELECT foo FROM table GROUP BY foo) AS sub'
+    assert prune_columns(select) == (sql, ())
+
+
+def test_prune_subquery_unqualified():
+    sub = SELECT(C.foo, C.bar, C.baz).FROM(T.table)
+    select = SELECT(C.foo).FROM(A.sub(sub)).WHERE(C.bar > 1)
+    sql = 'SELECT foo FROM (SELECT foo, bar FROM table) AS sub WHERE (bar > %s)'
+    assert prune_columns(select) == (sql, (1,))
+
+
+def test_prune_subquery_columns():
+    sub = SELECT(C.foo, C.bar).FROM(T.table)
+    select = SELECT(C.y).FROM(A.sub(sub, columns=(C.x, C.y)))
+    sql = 'SELECT y FROM (SELECT bar FROM table) AS sub(y)'
+    assert prune_columns(select) == (sql, ())
+
+
+def test_prune_keeps_inner_references():
+    sub = SELECT(C.foo, A.total(C.qty * 2)).FROM(T.table).ORDER_BY(C.total)
+    select = SELECT(C.foo).FROM(A.sub(sub))
+    sql = ('SELECT foo FROM (SELECT foo, (qty * %s) AS total FROM table '
+           'ORDER BY total) AS sub')
+    assert prune_columns(select) == (sql, (2,))
+
+
+def test_prune_keeps_one_column():
+    sub = SELECT(C.foo, C.bar).FROM(T.table)
+    select = SELECT(F.count(C)).FROM(A.sub(sub))
+    sql = 'SELECT count(*) FROM (SELECT foo FROM table) AS sub'
+    assert prune_columns(select) == (sql, ())
+
+
+def test_prune_wildcard_bails():
+    sub = SELECT(C.foo, C.bar).FROM(T.table)
+    sql = 'SELECT sub.* FROM (SELECT foo, bar FROM table) AS sub'
+    assert prune_columns(SELECT(T.sub()).FROM(A.sub(sub))) == (sql, ())
+    sql = 'SELECT * FROM (SELECT foo, bar FROM table) AS sub'
+    assert prune_columns(SELECT().FROM(A.sub(sub))) == (sql, ())
+
+
+def test_prune_distinct_bails():
+    sub = SELECT(C.foo, C.bar).DISTINCT().FROM(T.table)
+    sql = 'SELECT foo FROM (SELECT DISTINCT foo, bar FROM table) AS sub'
+    assert prune_columns(SELECT(C.foo).FROM(A.sub(sub))) == (sql, ())
+
+
+def test_prune_aggregate_bails():
+    sub = SELECT(A.one(1), A.n(F.count(C('*')))).FROM(T.table)
+    sql = 'SELECT sub.one FROM (SELECT %s AS one, count(*) AS n FROM table) AS sub'
+    assert prune_columns(SELECT(T.sub().one).FROM(A.sub(sub))) == (sql, (1,))
+
+
+def test_prune_ordinal_bails():
+    sub = SELECT(C.foo, C.bar, A.n(F.count(C.id))).FROM(T.table).GROUP_BY(1, 2)
+    sql = 'SELECT sub.foo FROM (SELECT foo, bar, count(id) AS n FROM table GROUP BY %s, %s) AS sub'
+    assert prune_columns(SELECT(T.sub().foo).FROM(A.sub(sub))) == (sql, (1, 2))
+    sub = SELECT(C.foo, C.bar).FROM(T.table).ORDER_BY(DESC(2))
+    sql = 'SELECT sub.foo FROM (SELECT foo, bar FROM table ORDER BY %s DESC) AS sub'
+    assert prune_columns(SELECT(T.sub().foo).FROM(A.sub(sub))) == (sql, (2,))
+
+
+def test_prune_set_returning_bails():
+    sub = SELECT(C.id, A.tag(F.unnest(C.tags))).FROM(T.table)
+    sql = 'SELECT sub.id FROM (SELECT id, unnest(tags) AS tag FROM table) AS sub'
+    assert prune_columns(SELECT(T.sub().id).FROM(A.sub(sub))) == (sql, ())
+
+
+def test_prune_shared_subquery():
+    sub = SELECT(T.t().x, T.t().y).FROM(T.t)
+    select = SELECT(T.a().x, T.b().y).FROM(A.a(sub)).CROSS_JOIN(A.b(sub))
+    sql = ('SELECT a.x, b.y FROM (SELECT t.x FROM t) AS a '
+           'CROSS JOIN (SELECT t.y FROM t) AS b')
+    assert prune_columns(select) == (sql, ())
+    assert sub == ('SELECT t.x, t.y FROM t', ())
+
+
+def test_prune_cte():
+    select = (SELECT(T.alias().bar).WITH(C.cte, SELECT(C.foo, C.bar).FROM(T.table))
+              .FROM(A.alias(T.cte)))
+    sql = 'WITH cte AS (SELECT bar FROM table) SELECT alias.bar FROM cte AS alias'
+    assert prune_columns(select) == (sql, ())
+
+
+def test_prune_cte_columns():
+    select = (SELECT(C.x).WITH(C.cte(C.x, C.y), SELECT(C.foo, C.bar).FROM(T.table))
+              .FROM(T.cte))
+    sql = 'WITH cte(x) AS (SELECT foo FROM table) SELECT x FROM cte'
+    assert prune_columns(select) == (sql, ())
+
+
+def test_prune_recursive_cte_bails():
+    select = SELECT(C.bar).WITH(C.foo(C.bar, C.baz),
+                                SELECT(C.bar, C.baz) |
+                                SELECT(C.bar, C.baz).FROM(C.foo),
+                                RECURSIVE=True).FROM(C.foo)
+    sql = ('WITH RECURSIVE foo(bar, baz) AS (SELECT bar, baz UNION '
+           'SELECT bar, baz FROM foo) SELECT bar FROM foo')
+    assert prune_columns(select) == (sql, ())
+
+
+def test_prune_nested():
+    inner = SELECT(C.foo, C.bar, C.baz).FROM(T.table)
+    outer = SELECT(C.foo, C.bar).FROM(A.inner(inner))
+    select = SELECT(C.foo).FROM(A.outer(outer))
+    sql = 'SELECT foo FROM (SELECT foo FROM (SELECT foo FROM table) AS inner) AS outer'
+    assert prune_columns(select) == (sql, ())
+
+
+def test_prune_natural_join_bails():
+    sub = SELECT(C.x, C.k).FROM(T.t)
+    select = SELECT(T.s().x).FROM(A.s(sub)).INNER_JOIN(T.u, NATURAL=True)
+    sql = 'SELECT s.x FROM (SELECT x, k FROM t) AS s NATURAL INNER JOIN u'
+    assert prune_columns(select) == (sql, ())
+    select = (SELECT(T.c().x).WITH(C.c, SELECT(C.x, C.k).FROM(T.t))
+              .FROM(T.c).INNER_JOIN(T.u, NATURAL=True))
+    sql = 'WITH c AS (SELECT x, k FROM t) SELECT c.x FROM c NATURAL INNER JOIN u'
+    assert prune_columns(select) == (sql, ())
+
+
+def test_prune_using_join():
+    sub = SELECT(C.x, C.k, C.y).FROM(T.t)
+    select = SELECT(T.s().x).FROM(A.s(sub)).INNER_JOIN(T.u, USING=(C.k,))
+    sql = 'SELECT s.x FROM (SELECT x, k FROM t) AS s INNER JOIN u USING (k)'
+    assert prune_columns(select) == (sql, ())
+    select = (SELECT(T.c().x).WITH(C.c, SELECT(C.x, C.k, C.y).FROM(T.t))
+              .FROM(T.c).INNER_JOIN(T.u, USING=(C.k,)))
+    sql = 'WITH c AS (SELECT x, k FROM t) SELECT c.x FROM c INNER JOIN u USING (k)'
+    assert prune_columns(select) == (sql, ())
+
+
+def test_prune_frozen():
+    inner = SELECT(C.x).WITH(C.c, SELECT(C.x, C.y).FROM(T.t)).FROM(T.c)
+    frozen = SELECT(C.x).FROM(A.s(inner)).freeze()
+    with pytest.raises(AttributeError):
+        prune_columns(inner)
+    sql = 'WITH c AS (SELECT x, y FROM t) SELECT x FROM c'
+    assert inner == (sql, ())
+    assert frozen == ('SELECT x FROM ({sql}) AS s'.format(sql=sql), ())
+    assert prune_columns(inner.thaw()) == (sql.replace('x, y', 'x'), ())
+
+
+KEYS = {'bar': ['id'], 'baz': [('foo_id', 'kind')]}
+
+
+def test_eliminate_join_on():
+    select = (SELECT(T.foo().name).FROM(T.foo)
+              .LEFT_JOIN(T.bar, ON=(T.foo().bar_id == T.bar().id)))
+    assert eliminate_joins(select, KEYS) == ('SELECT foo.name FROM foo', ())
+
+
+def test_eliminate_join_using():
+    select = SELECT(T.foo().name).FROM(T.foo).LEFT_JOIN(T.bar, USING=C.id)
+    assert eliminate_joins(select, KEYS) == ('SELECT foo.name FROM foo', ())
+
+
+def test_eliminate_join_composite_key():
+    condition = AND(T.b().foo_id == T.foo().id, T.b().kind == 'x',
+                    T.b().active)
+    select = (SELECT(T.foo().name).FROM(T.foo)
+              .LEFT_JOIN(A.b(T.baz), ON=condition))
+    assert eliminate_joins(select, KEYS) == ('SELECT foo.name FROM foo', ())
+
+
+def test_eliminate_join_chain():
+    select = (SELECT(T.foo().name).FROM(T.foo)
+              .LEFT_JOIN(T.bar, ON=(T.foo().bar_id == T.bar().id))
+              .LEFT_JOIN(A.b(T.baz), ON=AND(T.b().foo_id == T.bar().id,
+                                            T.b().kind == 'x')))
+    assert eliminate_joins(select, KEYS) == ('SELECT foo.name FROM foo', ())
+
+
+def test_keep_referenced_join():
+    select = (SELECT(T.foo().name).FROM(T.foo)
+              .LEFT_JOIN(T.bar, ON=(T.foo().bar_id == T.bar().id))
+              .WHERE(IS_NULL(T.bar().deleted)))
+    sql = ('SELECT foo.name FROM foo LEFT OUTER JOIN bar '
+           'ON (foo.bar_id = bar.id) WHERE (bar.deleted IS NULL)')
+    assert eliminate_joins(select, KEYS) == (sql, ())
+
+
+def test_keep_join_without_unique_key():
+    select = (SELECT(T.foo().name).FROM(T.foo)
+              .LEFT_JOIN(A.b(T.baz), ON=(T.b().foo_id == T.foo().id)))
+    sql = ('SELECT foo.name FROM foo LEFT OUTER JOIN baz AS b '
+           'ON (b.foo_id = foo.id)')
+    assert eliminate_joins(select, KEYS) == (sql, ())
+
+
+def test_keep_join_with_unqualified_references():
+    select = (SELECT(C.name).FROM(T.foo)
+              .LEFT_JOIN(T.bar, ON=(T.foo().bar_id == T.bar().id)))
+    sql = 'SELECT name FROM foo LEFT OUTER JOIN bar ON (foo.bar_id = bar.id)'
+    assert eliminate_joins(select, KEYS) == (sql, ())
+
+
+def test_keep_inner_join():
+    select = (SELECT(T.foo().name).FROM(T.foo)
+              .INNER_JOIN(T.bar, ON=(T.foo().bar_id == T.bar().id)))
+    sql = 'SELECT foo.name FROM foo INNER JOIN bar ON (foo.bar_id = bar.id)'
+    assert eliminate_joins(select, KEYS) == (sql, ())
+
+
+def test_push_predicate_subquery():
+    sub = SELECT(C.foo, A.total(C.qty * C.price)).FROM(T.table)
+    select = (SELECT(C.foo).FROM(A.sub(sub))
+              .WHERE(AND(T.sub().foo > 1, T.sub().total < 100, C.bar == 2)))
+    sql = ('SELECT foo FROM (SELECT foo, (qty * price) AS total FROM table '
+           'WHERE ((foo > %s) AND ((qty * price) < %s))) AS sub '
+           'WHERE (bar = %s)')
+    assert push_predicates(select) == (sql, (1, 100, 2))
+
+
+def test_push_predicate_shared_subquery():
+    sub = SELECT(T.t().x, T.t().y).FROM(T.t)
+    select = SELECT(T.a().x, T.b().y).FROM(A.a(sub)).CROSS_JOIN(A.b(sub)).WHERE(T.a().x > 1)
+    sql = ('SELECT a.x, b.y FROM (SELECT t.x, t.y FROM t WHERE (t.x > %s)) AS a '
+           'CROSS JOIN (SELECT t.x, t.y FROM t) AS b')
+    assert push_predicates(select) == (sql, (1,))
+    assert sub == ('SELECT t.x, t.y FROM t', ())
+
+
+def test_push_predicate_set_returning_bails():
+    sub = SELECT(C.id, A.tag(F.unnest(C.tags))).FROM(T.table)
+    select = SELECT(T.sub().id).FROM(A.sub(sub)).WHERE(AND(T.sub().tag == 'x', T.sub().id == 1))
+    sql = ('SELECT sub.id FROM (SELECT id, unnest(tags) AS tag FROM table WHERE (id = %s)) AS sub '
+           'WHERE (sub.tag = %s)')
+    assert push_predicates(select) == (sql, (1, 'x'))
+
+
+def test_push_predicate_cte():
+    select = (SELECT(C.foo).WITH(C.cte, SELECT(C.foo).FROM(T.table).WHERE(C.bar))
+              .FROM(T.cte).WHERE(T.cte().foo > 1))
+    sql = ('WITH cte AS (SELECT foo FROM table WHERE (bar AND (foo > %s))) '
+           'SELECT foo FROM cte')
+    assert push_predicates(select) == (sql, (1,))
+
+
+def test_push_predicate_cte_referenced_twice():
+    select = (SELECT(C.foo).WITH(C.cte, SELECT(C.foo).FROM(T.table))
+              .FROM(T.cte).CROSS_JOIN(A.other(T.cte))
+              .WHERE(T.cte().foo > 1))
+    sql = ('WITH cte AS (SELECT foo FROM table) SELECT foo FROM cte '
+           'CROSS JOIN cte AS other WHERE (cte.foo > %s)')
+    assert push_predicates(select) == (sql, (1,))
+
+
+def test_push_predicate_aggregate_bails():
+    sub = SELECT(C.foo, A.total(F.sum(C.qty))).FROM(T.table).GROUP_BY(C.foo)
+    select = SELECT(C.foo).FROM(A.sub(sub)).WHERE(T.sub().foo > 1)
+    sql = ('SELECT foo FROM (SELECT foo, sum(qty) AS total FROM table '
+           'GROUP BY foo) AS sub WHERE (sub.foo > %s)')
+    assert push_predicates(select) == (sql, (1,))
+
+
+def test_push_predicate_limit_bails():
+    sub = SELECT(C.foo).FROM(T.table).LIMIT(10)
+    select = SELECT(C.foo).FROM(A.sub(sub)).WHERE(T.sub().foo > 1)
+    sql = ('SELECT foo FROM (SELECT foo FROM table LIMIT %s) AS sub '
+           'WHERE (sub.foo > %s)')
+    assert push_predicates(select) == (sql, (10, 1))
+
+
+def test_push_predicate_outer_join_bails():
+    sub = SELECT(C.foo).FROM(T.table)
+    select = (SELECT(C.foo).FROM(T.other).LEFT_JOIN(A.sub(sub), USING=C.foo)
+              .WHERE(IS_NULL(T.sub().foo)))
+    sql = ('SELECT foo FROM other LEFT OUTER JOIN (SELECT foo FROM table) '
+           'AS sub USING (foo) WHERE (sub.foo IS NULL)')
+    assert push_predicates(select) == (sql, ())
+
+
+def test_push_predicate_distinct_on():
+    sub = SELECT(C.foo, C.bar).DISTINCT(C.foo).FROM(T.table)
+    select = (SELECT(C.foo).FROM(A.sub(sub))
+              .WHERE(AND(T.sub().foo > 1, T.sub().bar > 2)))
+    sql = ('SELECT foo FROM (SELECT DISTINCT ON (foo) foo, bar FROM table '
+           'WHERE (foo > %s)) AS sub WHERE (sub.bar > %s)')
+    assert push_predicates(select) == (sql, (1, 2))
+
+
+def vip():
+    return SELECT(C.id).FROM(T.vip).WHERE(C.level > 3)
+
+
+def test_extract_subqueries():
+    select = (SELECT(C.name).FROM(T.users)
+              .WHERE(OR(IN(C.id, vip()), IN(C.referrer, vip()))))
+    sql = ('WITH subquery_1 AS (SELECT id FROM vip WHERE (level > %s)) '
+           'SELECT name FROM users WHERE ((id IN (SELECT id FROM subquery_1)) '
+           'OR (referrer IN (SELECT id FROM subquery_1)))')
+    assert extract_subqueries(select) == (sql, (3,))
+
+
+def test_extract_subqueries_materialized():
+    select = (SELECT(A.total(SELECT(F.count(C)).FROM(A.v(vip()))))
+              .FROM(T.users).WHERE(IN(C.id, vip())))
+    sql = ('WITH subquery_1 AS MATERIALIZED (SELECT id FROM vip WHERE (level > %s)) '
+           'SELECT (SELECT count(*) FROM (SELECT id FROM subquery_1) AS v) AS total '
+           'FROM users WHERE (id IN (SELECT id FROM subquery_1))')
+    assert extract_subqueries(select, MATERIALIZED=True) == (sql, (3,))
+
+
+def test_extract_nested_subqueries():
+    def top():
+        return SELECT(C.id).FROM(A.v(vip()))
+    select = (SELECT(C.name).FROM(T.users)
+              .WHERE(AND(IN(C.id, top()), IN(C.referrer, top()),
+                         IN(C.owner, vip()))))
+    sql = ('WITH subquery_2 AS (SELECT id FROM vip WHERE (level > %s)), '
+           'subquery_1 AS (SELECT id FROM (SELECT id FROM subquery_2) AS v) '
+           'SELECT name FROM users WHERE ((id IN (SELECT id FROM subquery_1)) '
+           'AND (referrer IN (SELECT id FROM subquery_1)) '
+           'AND (owner IN (SELECT id FROM subquery_2)))')
+    assert extract_subqueries(select) == (sql, (3,))
+
+
+def test_extract_correlated_subqueries_bails():
+    def correlated():
+        return SELECT(C.id).FROM(T.vip).WHERE(T.vip().id == T.users().id)
+    select = (SELECT(C.name).FROM(T.users)
+              .WHERE(OR(IN(C.id, correlated()), IN(C.referrer, correlated()))))
+    sql = ('SELECT name FROM users WHERE '
+           '((id IN (SELECT id FROM vip WHERE (vip.id = users.id))) '
+           'OR (referrer IN (SELECT id FROM vip WHERE (vip.id = users.id))))')
+    assert extract_subqueries(select) == (sql, ())
+
+
+def test_extract_volatile_subqueries_bails():
+    def sample():
+        return SELECT(C.id).FROM(T.vip).WHERE(F.random() < 0.1)
+    select = (SELECT(C.name).FROM(T.users)
+              .WHERE(OR(IN(C.id, sample()), IN(C.referrer, sample()))))
+    sql = ('SELECT name FROM users WHERE '
+           '((id IN (SELECT id FROM vip WHERE (random() < %s))) '
+           'OR (referrer IN (SELECT id FROM vip WHERE (random() < %s))))')
+    assert extract_subqueries(select) == (sql, (0.1, 0.1))
+
+
+def test_extract_unnamed_columns():
+    def top():
+        return SELECT(F.max(C.total)).FROM(T.orders)
+    select = SELECT(C.id, A.best(top())).FROM(T.orders).WHERE(IN(C.total, top()))
+    sql = ('WITH subquery_1 AS (SELECT max(total) FROM orders) '
+           'SELECT id, (SELECT * FROM subquery_1) AS best FROM orders '
+           'WHERE (total IN (SELECT * FROM subquery_1))')
+    assert extract_subqueries(select) == (sql, ())
+    # FROM clause subqueries are read by column name
+    select = SELECT(C.id).FROM(T.orders).CROSS_JOIN(A.a(top())).CROSS_JOIN(A.b(top()))
+    assert extract_subqueries(select) == (
+        'SELECT id FROM orders CROSS JOIN (SELECT max(total) FROM orders) AS a '
+        'CROSS JOIN (SELECT max(total) FROM orders) AS b', ())
+
+
+def test_extract_subqueries_frozen():
+    select = (SELECT(C.name).FROM(T.users)
+              .WHERE(OR(IN(C.id, vip()), IN(C.referrer, vip())))).freeze()
+    with pytest.raises(AttributeError, match='frozen'):
+        extract_subqueries(select)
+    assert extract_subqueries(select.thaw()).cte
+
+
+def test_extract_subqueries_lint():
+    select = (SELECT(C.name).FROM(T.users)
+              .WHERE(OR(IN(C.id, vip()), IN(C.referrer, vip()))))
+    assert lint(extract_subqueries(select)) == []
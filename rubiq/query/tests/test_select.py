@@ -298,6 +298,13 @@ def test_recursive_with():
     assert select == (sql, ())
 
 
+def test_materialized_with():
+    sql = 'WITH foo AS MATERIALIZED (SELECT *) SELECT *'
+    assert SELECT().WITH(C.foo, SELECT(), MATERIALIZED=True) == (sql, ())
+    sql = 'WITH foo AS NOT MATERIALIZED (SELECT *) SELECT *'
+    assert SELECT().WITH(C.foo, SELECT(), MATERIALIZED=False) == (sql, ())
+
+
 def test_table_from():
     assert SELECT().FROM(T.table) == ('SELECT * FROM table', ())
 
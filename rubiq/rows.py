@@ -0,0 +1,46 @@
+"""
+Typed result rows
+
+Rows of query results as named tuples, with a row type per projection:
+
+    for row in query.rows(connection):
+        print(row.id, row.total)
+
+Row types are created once per distinct list of column names and rows are
+built from the cursor as they are consumed.
+"""
+
+from __future__ import absolute_import
+from collections import namedtuple
+from functools import lru_cache
+
+from .sql.alias import column_name
+
+
+def column_names(query, description):
+    """Name the output columns of a query
+
+    Columns are named after their alias or column name in the projection,
+    or as the cursor describes them.
+    """
+    names = [column[0] for column in description]
+    columns = getattr(query, 'columns', None)
+    if columns and len(columns) == len(names):
+        names = [column_name(column) or name for column, name in zip(columns, names)]
+    return names
+
+
+@lru_cache(maxsize=1024)
+def row_type(names):
+    """Return the named tuple type of rows with the given column names
+
+    Names that are not valid or unique field names are replaced with their
+    position, e.g. `_2`.
+    """
+    return namedtuple('Row', names, rename=True)
+
+
+def rows(query, cursor):
+    """Iterate over the rows of an executed query as named tuples"""
+    make = row_type(tuple(column_names(query, cursor.description)))._make
+    return map(make, cursor)
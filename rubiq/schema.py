@@ -0,0 +1,277 @@
+"""
+Schema registry
+
+Optional description of the tables, columns, keys and indexes of a database,
+declared in Python or loaded from an `information_schema` style dump.
+"""
+
+from __future__ import absolute_import
+from collections import OrderedDict
+import json
+
+from .query.select import SELECT
+from .sql.alias import SubqueryAlias, TableAlias, column_name, relation_name
+from .sql.base import SQL
+from .sql.expression import Identifier
+from .sql.query import Query
+from .sql.table import ConditionalJoin, NaturalJoin, Table, TableFactory
+from .sql.tree import relations, walk, wildcard_qualifier
+
+
+class Column:
+    """Column of a table"""
+
+    def __init__(self, name, type=None, nullable=True):
+        self.name = name
+        self.type = type
+        self.nullable = nullable
+
+    def __repr__(self):
+        return '<Column {name!r} {type}>'.format(name=self.name, type=self.type)
+
+
+class TableSchema:
+    """Columns, keys and indexes of a table"""
+
+    def __init__(self, name, columns=(), primary_key=None, unique=(), indexes=None):
+        self.name = name
+        self.columns = OrderedDict()
+        for column in columns:
+            self.add_column(column)
+        self.primary_key = _key(primary_key)
+        self.unique = [_key(key) for key in unique]
+        self.indexes = OrderedDict(
+            (name, _key(key)) for name, key in (indexes or {}).items())
+
+    def __repr__(self):
+        return '<TableSchema {name!r} ({columns})>'.format(
+            name=self.name,
+            columns=', '.join(self.columns),
+        )
+
+    def add_column(self, column, type=None, nullable=True):
+        """Add a column, given as a `Column` or by name"""
+        if not isinstance(column, Column):
+            column = Column(column, type=type, nullable=nullable)
+        self.columns[column.name] = column
+        return column
+
+    @property
+    def unique_keys(self):
+        """Column tuples known to be unique, the primary key first"""
+        keys = [self.primary_key] if self.primary_key else []
+        return keys + [key for key in self.unique if key not in keys]
+
+    def indexed(self, *columns):
+        """Tell whether an index or key leads with the given columns"""
+        keys = list(self.indexes.values()) + self.unique_keys
+        return any(key[:len(columns)] == columns for key in keys)
+
+
+def _key(columns):
+    """Normalize a key, given as a column name or a sequence of names"""
+    if columns is None:
+        return None
+    if isinstance(columns, str):
+        return (columns,)
+    return tuple(columns)
+
+
+class Schema:
+    """Registry of table schemas
+
+    `schema.T` is a table name factory that knows the tables of the schema:
+    unknown tables and columns are rejected as soon as they are referenced.
+    """
+
+    def __init__(self, tables=()):
+        self.tables = OrderedDict()
+        for table in tables:
+            self.tables[table.name] = table
+
+    def __contains__(self, name):
+        return name in self.tables
+
+    def __getitem__(self, name):
+        return self.tables[name]
+
+    def __iter__(self):
+        return iter(self.tables.values())
+
+    def table(self, name, columns=(), primary_key=None, unique=(), indexes=None):
+        """Declare a table, columns are given as `Column` instances or names"""
+        table = TableSchema(name, columns=columns, primary_key=primary_key,
+                            unique=unique, indexes=indexes)
+        self.tables[name] = table
+        return table
+
+    @property
+    def T(self):
+        """Table name factory for the tables of this schema"""
+        return TableFactory(schema=self)
+
+    @property
+    def ONLY(self):
+        """Table name factory for `ONLY` references to tables of this schema"""
+        return TableFactory(ONLY=True, schema=self)
+
+    def unique_keys(self):
+        """Map table names to their unique keys, see `eliminate_joins`"""
+        return {table.name: table.unique_keys for table in self
+                if table.unique_keys}
+
+    @classmethod
+    def from_information_schema(cls, columns, constraints=(), indexes=()):
+        """Build a schema from `information_schema` style rows
+
+        `columns` are mappings with `table_name`, `column_name` and optionally
+        `data_type`, `is_nullable` and `ordinal_position` keys, as in
+        `information_schema.columns`. `constraints` are rows of
+        `information_schema.key_column_usage` joined with `table_constraints`:
+        `table_name`, `constraint_name`, `constraint_type` (`PRIMARY KEY` or
+        `UNIQUE`), `column_name` and `ordinal_position`. `indexes` are rows
+        with `table_name`, `index_name`, `column_name`, `ordinal_position` and
+        optionally `is_unique`.
+        """
+        schema = cls()
+        for row in sorted(columns, key=lambda row: row.get('ordinal_position', 0)):
+            name = row['table_name']
+            table = schema.tables.get(name) or schema.table(name)
+            table.add_column(
+                row['column_name'],
+                type=row.get('data_type'),
+                nullable=row.get('is_nullable', 'YES') in ('YES', True),
+            )
+        for name, kind, key in _group(constraints, 'constraint_name', 'constraint_type'):
+            table = schema[name]
+            if kind == 'PRIMARY KEY':
+                table.primary_key = key
+            elif kind == 'UNIQUE' and key not in table.unique:
+                table.unique.append(key)
+        for name, index, key, unique in _group(indexes, 'index_name', 'is_unique', index=True):
+            table = schema[name]
+            table.indexes[index] = key
+            if unique and key != table.primary_key and key not in table.unique:
+                table.unique.append(key)
+        return schema
+
+    @classmethod
+    def load(cls, path):
+        """Load a schema from a JSON dump
+
+        The dump is an object with `columns`, `constraints` and `indexes`
+        lists of rows, see `from_information_schema`.
+        """
+        with open(path) as f:
+            dump = json.load(f)
+        return cls.from_information_schema(
+            dump.get('columns', ()),
+            constraints=dump.get('constraints', ()),
+            indexes=dump.get('indexes', ()),
+        )
+
+    def columns(self, relation):
+        """Return the column names of a FROM clause relation, if known"""
+        if isinstance(relation, SubqueryAlias):
+            if relation._columns:
+                names = [column_name(SQL.wrap(column, id=True))
+                         for column in relation._columns]
+            else:
+                names = [column_name(column)
+                         for column in getattr(relation._origin, 'columns', ())]
+            return names if names and None not in names else None
+        if isinstance(relation, TableAlias):
+            if relation._columns:
+                return [column_name(SQL.wrap(column, id=True))
+                        for column in relation._columns]
+            relation = relation._origin
+        if isinstance(relation, (Table, Identifier)) and relation._name in self:
+            return list(self[relation._name].columns)
+        return None
+
+    def validate(self, query):
+        """Check that the tables and qualified columns of a query are known
+
+        Raises `AttributeError` for the first unknown name. Relations named
+        after a CTE of the query are not checked.
+        """
+        ctes = {relation_name(cte.name) for node in walk(query)
+                if isinstance(node, SELECT) for cte in node.cte}
+        for node in walk(query):
+            if not isinstance(node, SELECT) or node.source is None:
+                continue
+            known = {}
+            for relation in relations(node.source.source):
+                origin = relation._origin if isinstance(relation, TableAlias) else relation
+                if isinstance(origin, (Table, Identifier)) and origin._name not in ctes:
+                    if origin._name not in self:
+                        raise AttributeError('Unknown table: {name}'.format(
+                            name=origin._name))
+                alias = relation._alias if isinstance(relation, TableAlias) else relation
+                known[relation_name(alias)] = self.columns(relation)
+
+            def nested(ref):
+                return ref is not node and isinstance(ref, Query)
+
+            for ref in walk(node, prune=nested):
+                if not isinstance(ref, Identifier):
+                    continue
+                qualifier, _, column = ref._name.rpartition('.')
+                columns = known.get(qualifier)
+                if columns is not None and column not in columns:
+                    raise AttributeError('Unknown column: {name}'.format(
+                        name=ref._name))
+        return query
+
+    def expand(self, query):
+        """Replace wildcards in projections with explicit column lists
+
+        Wildcards are left alone where the columns of a relation are unknown,
+        as is `*` over NATURAL or USING joins, which merge columns.
+        """
+        for node in walk(query):
+            if isinstance(node, SELECT) and node.source is not None:
+                self._expand(node)
+        return query
+
+    def _expand(self, select):
+        """Expand the wildcards of a single query"""
+        named = []
+        for relation in relations(select.source.source):
+            alias = relation._alias if isinstance(relation, TableAlias) else relation
+            named.append((relation_name(alias), self.columns(relation)))
+        merging = any(isinstance(join, NaturalJoin)
+                      or (isinstance(join, ConditionalJoin) and join.using is not None)
+                      for join in walk(select.source.source))
+        columns = []
+        for column in select.columns or [None]:
+            qualifier = '' if column is None else wildcard_qualifier(column)
+            if qualifier is None:
+                columns.append(column)
+                continue
+            expanded = [(name, names) for name, names in named
+                        if not qualifier or name == qualifier]
+            if not expanded or any(names is None for _, names in expanded) \
+                    or (not qualifier and merging):
+                if column is None:
+                    return
+                columns.append(column)
+                continue
+            columns.extend(Identifier('{qualifier}.{column}'.format(
+                qualifier=name, column=column_))
+                for name, names in expanded for column_ in names)
+        select.columns = columns
+
+
+def _group(rows, name_key, kind_key, index=False):
+    """Group key column rows into `(table, name or kind, columns, ...)`"""
+    groups = OrderedDict()
+    for row in sorted(rows, key=lambda row: row.get('ordinal_position', 0)):
+        group = groups.setdefault((row['table_name'], row[name_key]),
+                                  [row.get(kind_key), []])
+        group[1].append(row['column_name'])
+    for (table, name), (kind, columns) in groups.items():
+        if index:
+            yield table, name, tuple(columns), kind in ('YES', True)
+        else:
+            yield table, kind, tuple(columns)
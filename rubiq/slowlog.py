@@ -0,0 +1,168 @@
+"""
+Slow query log
+
+Records executions of queries exceeding a duration threshold as JSON lines
+in a rotating log file, along with the plan of the query:
+
+    log = SlowQueryLog('slow.log', threshold=0.5).install()
+
+The plan is the output of `EXPLAIN`, or of `EXPLAIN ANALYZE` for a sample of
+the slow `SELECT` queries. The statements are configurable, e.g. SQLite has
+no `EXPLAIN ANALYZE` and its plans are returned by `EXPLAIN QUERY PLAN`:
+
+    SlowQueryLog('slow.log', explain='EXPLAIN QUERY PLAN', analyze=None)
+
+Queries failing after running longer than the threshold, e.g. cancelled by
+a statement timeout, are logged along with their error.
+
+Plans are best obtained on a separate connection, given by a `connect`
+function. Otherwise they are obtained on the connection of the query
+within a savepoint, rolled back if `EXPLAIN` fails so the transaction of
+the query is not aborted; this requires the connection to be in a
+transaction on PostgreSQL.
+"""
+
+from __future__ import absolute_import
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+import json
+import logging
+import random
+
+from . import instrument
+from .query.select import BaseSelect
+
+
+def redact_all(args):
+    """Replace every parameter of a query"""
+    return ['<redacted>'] * len(args)
+
+
+class SlowQueryLog:
+    """Log of the queries executing longer than `threshold` seconds
+
+    `redact` is a function mapping query parameters to their logged
+    representation, or `True` to log none of them. `sample` is the fraction
+    of slow `SELECT` queries explained with `analyze`, which executes them
+    once more. The log file is rotated after `max_bytes`, keeping
+    `backup_count` old files. `connect` is a function returning a new
+    connection for `EXPLAIN` statements, closed after use.
+    """
+
+    SAVEPOINT = 'rubiq_explain'
+
+    def __init__(self, path, threshold=1.0, explain='EXPLAIN',
+                 analyze='EXPLAIN ANALYZE', sample=0.0, redact=None,
+                 max_bytes=10 * 1024 * 1024, backup_count=5, connect=None):
+        self.threshold = threshold
+        self.explain = explain
+        self.analyze = analyze
+        self.sample = sample
+        self.redact = redact_all if redact is True else redact
+        self.handler = RotatingFileHandler(path, maxBytes=max_bytes,
+                                           backupCount=backup_count,
+                                           encoding='utf-8')
+        self.random = random.Random()
+        self.connect = connect
+
+    def after_execute(self, event):
+        entry = self.entry(event)
+        if entry is None:
+            return
+        entry['rowcount'] = event.rowcount
+        entry.update(self.plan(event))
+        self.write(entry)
+
+    def on_error(self, event):
+        if event.execute_time is None:
+            return  # failed before executing
+        entry = self.entry(event)
+        if entry is None:
+            return
+        entry['error'] = repr(event.error)
+        # the query failed, it is not analyzed again
+        entry.update(self.plan(event, analyze=False))
+        self.write(entry)
+
+    def entry(self, event):
+        """Return the log entry of a query, `None` if it was not slow"""
+        duration = event.render_time + event.execute_time
+        if duration < self.threshold:
+            return None
+        return {
+            'time': datetime.now(timezone.utc).isoformat(),
+            'fingerprint': event.fingerprint,
+            'statement': event.statement,
+            'sql': event.sql,
+            'args': list(self.redact(event.args) if self.redact else event.args),
+            'duration': duration,
+            'render_time': event.render_time,
+            'execute_time': event.execute_time,
+        }
+
+    def plan(self, event, analyze=True):
+        """Return the plan entries of a slow query"""
+        statement = self.explain
+        analyzed = False
+        if analyze and self.analyze and isinstance(event.query, BaseSelect) \
+                and self.random.random() < self.sample:
+            statement = self.analyze
+            analyzed = True
+        if not statement:
+            return {}
+        sql = '{explain} {sql}'.format(explain=statement, sql=event.sql)
+        try:
+            if self.connect is not None:
+                rows = self._explain_apart(sql, event.args)
+            else:
+                rows = self._explain_in_savepoint(event.connection, sql, event.args)
+        except Exception as error:
+            return {'explain_error': repr(error)}
+        return {'explain': rows, 'analyzed': analyzed}
+
+    def _explain_apart(self, sql, args):
+        connection = self.connect()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(sql, args)
+            return [list(row) for row in cursor.fetchall()]
+        finally:
+            connection.close()
+
+    def _explain_in_savepoint(self, connection, sql, args):
+        cursor = connection.cursor()
+        cursor.execute('SAVEPOINT {name}'.format(name=self.SAVEPOINT))
+        try:
+            cursor.execute(sql, args)
+            rows = [list(row) for row in cursor.fetchall()]
+        except Exception:
+            cursor.execute('ROLLBACK TO SAVEPOINT {name}'.format(name=self.SAVEPOINT))
+            raise
+        finally:
+            cursor.execute('RELEASE SAVEPOINT {name}'.format(name=self.SAVEPOINT))
+        return rows
+
+    def write(self, entry):
+        record = logging.makeLogRecord({
+            'msg': json.dumps(entry, default=repr, sort_keys=True),
+        })
+        self.handler.handle(record)
+
+    def install(self):
+        instrument.listen('after_execute', self.after_execute)
+        instrument.listen('on_error', self.on_error)
+        return self
+
+    def uninstall(self):
+        instrument.remove('after_execute', self.after_execute)
+        instrument.remove('on_error', self.on_error)
+
+    def close(self):
+        self.handler.close()
+
+    def __enter__(self):
+        return self.install()
+
+    def __exit__(self, *exc_info):
+        self.uninstall()
+        self.close()
@@ -1,6 +1,6 @@
 """SQL aliases"""
 
-from .base import SQL, SQLIterator
+from .base import SQL, SQLIterator, dunder
 from .table import Joinable, Table
 from .query import Query
 
@@ -32,6 +32,10 @@ class TableAlias(Alias, Joinable):
         self._columns = columns
 
     def __getattr__(self, name):
+        if dunder(name):
+            raise AttributeError(name)
+        if isinstance(self._origin, Table):
+            name = self._origin._column(name)
         return Identifier('{name}.{subname}'.format(
             name=self._alias,
             subname=name,
@@ -113,4 +117,28 @@ class AliasFactory:
 A = AliasFactory()
 
 
-from .expression import Identifier
+def column_name(expr):
+    """Return the name a projected expression is exposed under
+
+    Aliased expressions are exposed under their alias, column references
+    under their unqualified name; for anything else the name is up to the
+    database and `None` is returned.
+    """
+    if isinstance(expr, Alias):
+        alias = expr._alias
+        return alias._name if isinstance(alias, Identifier) else alias
+    if isinstance(expr, Identifier):
+        return expr._name.rsplit('.', 1)[-1]
+    return None
+
+
+def relation_name(name):
+    """Return the plain name of a table, alias or CTE name"""
+    if isinstance(name, (Identifier, Table)):
+        return name._name
+    if isinstance(name, FunctionCall):
+        return name.name
+    return name
+
+
+from .expression import FunctionCall, Identifier
@@ -1,5 +1,8 @@
 """SQL base syntax"""
 
+from itertools import chain
+import copy
+
 
 class SQL:
     """Base for classes that can be rendered as SQL
@@ -22,7 +25,7 @@ class SQL:
             return '', ()
         sql, args = zip(*iterable)
         sql = sep.join(sql)
-        args = sum(args, ())
+        args = tuple(chain.from_iterable(args))
         return sql, args
 
     @classmethod
@@ -38,6 +41,29 @@ class SQL:
     def _as_sql(self, connection, context):
         raise NotImplementedError()
 
+    _frozen = False
+
+    def freeze(self):
+        """Make this node and its descendants immutable, returns the node
+
+        Lists and iterators held by the nodes are replaced with tuples, so a
+        frozen tree can be rendered from several threads at once. Modifying
+        a frozen node raises `AttributeError`, `thaw` returns a modifiable
+        copy.
+        """
+        for node in walk(self):
+            if not node._frozen and type(node).__setattr__ is object.__setattr__:
+                _freeze(node)
+        return self
+
+    def thaw(self):
+        """Return a modifiable deep copy of a frozen tree"""
+        node = copy.deepcopy(self)
+        for node_ in walk(node):
+            if node_._frozen:
+                _thaw(node_)
+        return node
+
     def __unicode__(self):
         sql, args = self._as_sql(dummy_connection, dummy_context)
         return sql % args
@@ -51,8 +77,159 @@ class SQL:
         )
 
 
+_frozen_classes = {}
+
+
+def _frozen_class(cls):
+    """Return the subclass of a node class whose instances are frozen"""
+    frozen = _frozen_classes.get(cls)
+    if frozen is None:
+        frozen = _frozen_classes.setdefault(cls, type(cls.__name__, (cls,), {
+            '__module__': cls.__module__,
+            '__qualname__': cls.__qualname__,
+            '__setattr__': _immutable,
+            '__delattr__': _immutable,
+            '__reduce_ex__': _reduce_frozen,
+            '_frozen': True,
+        }))
+    return frozen
+
+
+def _immutable(self, name, value=None):
+    raise AttributeError('Cannot modify frozen {name}'.format(
+        name=type(self).__name__))
+
+
+def _reduce_frozen(self, protocol):
+    # frozen classes are not importable, pickle and copy their base class;
+    # copies may be modified through `object.__setattr__`, so they get
+    # their own fragment cache
+    state = {name: value for name, value in vars(self).items()
+             if name != '_fragments'}
+    return _unfrozen, (type(self).__bases__[0], state)
+
+
+def _unfrozen(cls, state):
+    """Recreate a frozen node from its class and attributes"""
+    node = cls.__new__(cls)
+    node.__dict__.update(state)
+    object.__setattr__(node, '__class__', _frozen_class(cls))
+    return node
+
+
+def _materialize(value):
+    """Return an immutable equivalent of a plain attribute value"""
+    if isinstance(value, (list, tuple)):
+        return tuple(_materialize(item) for item in value)
+    if hasattr(value, '__next__'):
+        return tuple(value)  # iterators are rendered only once otherwise
+    return value
+
+
+def _freeze(node):
+    lists = []
+    for name, value in vars(node).items():
+        if isinstance(value, list):
+            lists.append(name)
+        vars(node)[name] = _materialize(value)
+    node._lists = tuple(lists)
+    node.__class__ = _frozen_class(type(node))
+
+
+def _thaw(node):
+    object.__setattr__(node, '__class__', type(node).__bases__[0])
+    for name in node.__dict__.pop('_lists'):
+        node.__dict__[name] = list(node.__dict__[name])
+
+
+def fragment(node, connection, context):
+    """Render a node, reusing the previous rendering of frozen nodes
+
+    Frozen nodes cannot change, so their `(sql, args)` is cached per
+    connection class, which is assumed to decide how nodes are rendered.
+    Nodes containing variables depend on the context and are always
+    rendered.
+    """
+    if not node._frozen:
+        return node._as_sql(connection, context)
+    fragments = vars(node).get('_fragments')
+    if fragments is None:
+        if '_fragments' in vars(node):
+            return node._as_sql(connection, context)
+        static = not any(isinstance(item, Variable) for item in walk(node))
+        fragments = vars(node).setdefault('_fragments', {} if static else None)
+        if fragments is None:
+            return node._as_sql(connection, context)
+    key = type(connection)
+    rendered = fragments.get(key)
+    if rendered is None:
+        rendered = fragments[key] = node._as_sql(connection, context)
+    return rendered
+
+
+def modifiable_copy(node):
+    """Return a modifiable shallow copy of a node, frozen or not
+
+    Lists are copied, other attributes are shared with the original node.
+    """
+    cls = type(node).__bases__[0] if node._frozen else type(node)
+    copy = cls.__new__(cls)
+    state = vars(copy)
+    lists = vars(node).get('_lists', ())
+    for name, value in vars(node).items():
+        if name in ('_lists', '_fragments'):
+            continue
+        if name in lists or isinstance(value, list):
+            value = list(value)
+        state[name] = value
+    return copy
+
+
+def dunder(name):
+    """Tell whether `name` is a special (double underscore) attribute name
+
+    Classes turning attribute access into names must not do so for special
+    names, which the copy and pickle protocols look up on instances.
+    """
+    return name.startswith('__') and name.endswith('__')
+
+
+class OnePassIterator:
+    """Iterator of `IN` items, array values or `VALUES` rows
+
+    Iterators are consumed by the first rendering, iterating again raises
+    a `ValueError` rather than rendering no items; see `SQL.freeze`.
+    """
+
+    def __init__(self, iterator):
+        self.iterator = iterator
+        self.consumed = False
+
+    def __iter__(self):
+        if self.consumed:
+            raise ValueError('Iterator consumed by a previous rendering, '
+                             'freeze queries to render them several times')
+        self.consumed = True
+        return self.iterator
+
+    def __next__(self):
+        self.consumed = True
+        return next(self.iterator)
+
+
+def one_pass(value):
+    """Return an iterator as a `OnePassIterator`, other values unchanged"""
+    if hasattr(value, '__next__') and not isinstance(value, OnePassIterator):
+        return OnePassIterator(value)
+    return value
+
+
 class SQLIterator(SQL):
-    """Iterator of SQL objects"""
+    """Iterator of SQL objects
+
+    Iterators, e.g. generators, are consumed by the first rendering, see
+    `OnePassIterator`, `SQL.freeze` and `sql.stream`.
+    """
 
     def __init__(self, iterable, sep=', ', id=False):
         self.iterable = iterable
@@ -71,8 +248,39 @@ class SQLIterator(SQL):
     #     return self.__iter__()
 
     def _as_sql(self, connection, context):
-        return SQL.merge((item._as_sql(connection, context) for item in self), sep=self.sep)
+        if hasattr(self.iterable, '_as_sql'):
+            return self.iterable._as_sql(connection, context)
+        items = plain_items(self.iterable)
+        if not self.id and not any(isinstance(item, SQL) for item in items):
+            # plain values are bound in bulk, without a node per value
+            return self.sep.join(['%s'] * len(items)), tuple(items)
+        return SQL.merge((SQL.wrap(item, id=self.id)._as_sql(connection, context)
+                          for item in items), sep=self.sep)
+
+
+def plain_items(iterable):
+    """Return the items of an iterable as a list
+
+    Array-likes (NumPy arrays, pandas series, ...) are converted by their
+    `tolist` method, which turns their items into Python values at once.
+    NumPy scalars of other iterables are converted by `plain_value`.
+    """
+    if hasattr(iterable, 'tolist'):
+        return iterable.tolist()
+    return [plain_value(item) for item in iterable]
+
+
+def plain_value(value):
+    """Return the Python value of a NumPy scalar, other values unchanged
+
+    Drivers do not all adapt NumPy scalars. NumPy is not imported, its
+    scalars are told by their type module and empty shape.
+    """
+    if type(value).__module__ == 'numpy' and getattr(value, 'shape', None) == ():
+        return value.item()
+    return value
 
 
-from .expression import Identifier, Value
+from .expression import Identifier, Value, Variable
 from ..dummy import dummy_connection, dummy_context
+from .tree import walk
@@ -1,7 +1,7 @@
 """SQL expressions"""
 
 from __future__ import absolute_import
-from .base import SQL, SQLIterator
+from .base import SQL, SQLIterator, dunder, one_pass, plain_items, plain_value
 from enum import Enum
 
 
@@ -74,7 +74,7 @@ class Value(Expression):
 
     def _as_sql(self, connection, context):
         """Return SQL for this instance"""
-        return '%s', (self.value, )
+        return '%s', (plain_value(self.value), )
 
     def __repr__(self):
         return '<Value {value!r}>'.format(value=self.value)
@@ -125,6 +125,8 @@ class Identifier(Expression):
         return '<Identifier {name!r}>'.format(name=self._name)
 
     def __getattr__(self, name):
+        if dunder(name):
+            raise AttributeError(name)
         return Identifier('{name}.{subname}'.format(
             name=self._name,
             subname=name,
@@ -289,7 +291,7 @@ class InOperator(BinaryOperator):
     """Wrapper for IN operator"""
 
     def __init__(self, left, right, invert=False):
-        super().__init__(left, 'IN', right, invert=invert)
+        super().__init__(left, 'IN', one_pass(right), invert=invert)
 
     def right_to_sql(self, connection, context):
         sql, args = SQLIterator(self.right)._as_sql(connection, context)
@@ -340,6 +342,31 @@ class CASE(Expression):
         return sql, cases_args + else_args
 
 
+class ARRAY(Expression):
+    """Array of plain values, bound as a single parameter
+
+    Drivers adapting sequences to arrays (e.g. psycopg2) receive the values
+    as one list, converted by `tolist` from array-likes.
+    """
+
+    def __init__(self, values):
+        self.values = one_pass(values)
+
+    def _as_sql(self, connection, context):
+        return '%s', (plain_items(self.values), )
+
+
+class ANY(Expression):
+    """ANY array comparison operand, e.g. `C.id == ANY(ids)`"""
+
+    def __init__(self, values):
+        self.values = values if isinstance(values, SQL) else ARRAY(values)
+
+    def _as_sql(self, connection, context):
+        sql, args = self.values._as_sql(connection, context)
+        return 'ANY({values})'.format(values=sql), args
+
+
 from .window import Window
 
 
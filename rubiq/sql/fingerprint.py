@@ -0,0 +1,77 @@
+"""Query fingerprints
+
+A fingerprint identifies the shape of a query: queries differing only in
+their values, `LIMIT` and `OFFSET` numbers, the length of `IN` lists or the
+number of `VALUES` rows have the same fingerprint.
+"""
+
+from collections import namedtuple
+import copy
+import hashlib
+
+from .base import SQL
+
+Fingerprint = namedtuple('Fingerprint', 'digest sql')
+Fingerprint.__doc__ = """Short hash and normalized SQL text of a query shape"""
+
+
+class Marker(SQL):
+    """Fixed SQL text standing for normalized away parts of a query"""
+
+    def __init__(self, sql):
+        self.sql = sql
+
+    def _as_sql(self, connection, context):
+        return self.sql, ()
+
+
+class Repeated(SQL):
+    """Node followed by a marker of repetition"""
+
+    def __init__(self, node):
+        self.node = node
+
+    def _as_sql(self, connection, context):
+        sql, args = self.node._as_sql(connection, context)
+        return sql + ', ...', args
+
+
+def _normalize(node):
+    """Collapse `IN` lists and `VALUES` rows, see `transform`
+
+    Iterators are never consumed: arrays render as a placeholder and
+    `VALUES` rows from an iterator as a single marker.
+    """
+    if isinstance(node, expression.InOperator) and not isinstance(node.right, SQL):
+        node = copy.copy(node)
+        # copies of frozen nodes are frozen
+        object.__setattr__(node, 'left', transform(SQL.wrap(node.left), _normalize))
+        object.__setattr__(node, 'right', Marker('...'))
+        return node
+    if isinstance(node, expression.ARRAY):
+        return Marker('%s')
+    if isinstance(node, table.VALUES) and hasattr(node.rows, '__next__'):
+        return Marker('VALUES (...)')
+    if isinstance(node, table.VALUES) and node.rows:
+        values = copy.copy(node)
+        row = tuple(transform(item, _normalize) if isinstance(item, SQL) else item
+                    for item in node.rows[0])
+        object.__setattr__(values, 'rows', [row])
+        return Repeated(values)
+    return None
+
+
+def fingerprint(query):
+    """Return the `Fingerprint` of a query
+
+    Values, including `LIMIT` and `OFFSET` numbers and variables, render as
+    `?` placeholders and are not part of the fingerprint.
+    """
+    sql, _ = transform(query, _normalize)._as_sql(dummy_connection, dummy_context)
+    sql = sql.replace('%s', '?')
+    return Fingerprint(hashlib.sha1(sql.encode('utf-8')).hexdigest()[:16], sql)
+
+
+from . import expression, table
+from .tree import transform
+from ..dummy import dummy_connection, dummy_context
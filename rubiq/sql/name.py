@@ -1,16 +1,23 @@
-from .base import SQL
+from .base import SQL, dunder
 
 
-# this could be a metaclass
-def NameFactory(Class, prefix=None, as_sql=None, args=None, kwargs=None):
-    """Returns a new class that converts attribute access to Class instances"""
+class NameFactory(SQL):
+    """Converts attribute access to identifiers
 
-    prefix = prefix or ''
-    args = args or ()
-    kwargs = kwargs or {}
+    Identifiers are qualified with the name of the table of the factory, if
+    any. The factory itself renders as the `*` or `table.*` wildcard.
+    """
+
+    def __init__(self, table=None):
+        object.__setattr__(self, '_table', table)
+        object.__setattr__(self, '_prefix', '' if table is None else table._name + '.')
 
     def __getattr__(self, name):
-        return Class(prefix + name, *args, **kwargs)
+        if dunder(name):
+            raise AttributeError(name)
+        if self._table is not None:
+            name = self._table._column(name)
+        return Identifier(self._prefix + name)
 
     def __setattr__(self, name, value):
         raise AttributeError('Names are not assignable')
@@ -18,26 +25,16 @@ def NameFactory(Class, prefix=None, as_sql=None, args=None, kwargs=None):
     def __call__(self, name):
         return getattr(self, name)
 
-    name = '{classname}Factory'.format(classname=Class.__name__)
-    bases = (object,)
-    attrs = dict(
-        __getattr__=__getattr__,
-        __setattr__=__setattr__,
-        __call__=__call__,
-    )
-
-    if as_sql:
-        # create factory that renders as SQL
-        attrs['_as_sql'] = as_sql
-        bases = (SQL,)
+    def __reduce__(self):
+        return NameFactory, (self._table,)
 
-    return type(name, bases, attrs)()
+    def _as_sql(self, connection, context):
+        return Wildcard(self._table)._as_sql(connection, context)
 
 
-from .expression import Variable, Identifier
-from .table import Table, Wildcard
+from .expression import Identifier
+from .table import Wildcard
 
 # prepare importable shorthand names for the various name factories
 
-C = F = IdentifierFactory = NameFactory(
-    Identifier, as_sql=lambda self, connection, context: Wildcard()._as_sql(connection, context))
+C = F = IdentifierFactory = NameFactory()
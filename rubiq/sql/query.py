@@ -12,19 +12,39 @@ from ..dummy import dummy_connection, dummy_context
 class Query(SQL):
     """Abstract base class for queries"""
 
+    commenter = None
+    """Callable object taking a query and its rendered SQL and returning the
+    SQL to execute, see `rubiq.comment.Commenter`. Process-global, overridden
+    by the `commenter` attribute of connections having one"""
+
     def __eq__(self, other):
         sql, args = self._as_sql(dummy_connection, dummy_context)
         if isinstance(other, SQL):
             other = other._as_sql(dummy_connection, dummy_context)
         return (sql, args) == other
 
+    def fingerprint(self):
+        """Return the `Fingerprint` of the shape of the query"""
+        return fingerprint(self)
+
     def execute(self, connection, *args, **context):
         """Allocate a cursor from the connection and execute the query"""
-        sql, args = self._as_sql(connection, context)
+        return self._execute(connection, context)
+
+    def _execute(self, connection, context, rendered=None):
+        """Execute the query, given its `(sql, args)` if already rendered"""
+        if instrument.active:
+            return instrument.execute(self, connection, context, rendered)
+        sql, args = instrument.render(self, connection, context, rendered)
         cursor = connection.cursor()
-        cursor.execute(sql, *args)
+        cursor.execute(sql, args)
         return cursor
 
+    def comment(self, connection, sql):
+        """Return the SQL to execute on a connection, see `commenter`"""
+        commenter = getattr(connection, 'commenter', self.commenter)
+        return sql if commenter is None else commenter(self, sql)
+
 
 class DataManipulationQuery(Query):
     """Abstract base class for data manipulation queries"""
@@ -32,3 +52,7 @@ class DataManipulationQuery(Query):
 
 class DataDefinitionQuery(Query):
     """Abstract base class for data definition queries"""
+
+
+from .fingerprint import fingerprint
+from .. import instrument
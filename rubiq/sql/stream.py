@@ -0,0 +1,106 @@
+"""Streaming rendering
+
+Renders a query as a sequence of `(sql, args)` chunks, so that huge
+generated statements can be written out without building their full SQL
+string and arguments tuple:
+
+    for sql, args in stream(query, connection, batch_size=1000):
+        buffer.write(sql, args)
+
+`IN` items and `VALUES` rows are rendered `batch_size` at a time, the rest
+of the query at once. Every chunk holds exactly the placeholders of its
+arguments, and joining the chunks gives the rendering of `_as_sql`.
+
+Iterators are consumed while the chunks are produced: a query holding
+generators streams once, like it renders once, and raises a `ValueError`
+when streamed or rendered again. Freeze a query to render it several times.
+"""
+
+from functools import partial
+from itertools import islice
+import copy
+import re
+
+from .base import SQL, SQLIterator
+from .tree import transform
+from . import expression, table
+
+_TOKEN = re.compile(r'\x00(\d+)\x00')
+_PLACEHOLDER = re.compile(r'%[s%]')
+
+
+class _Streamed(SQL):
+    """Stand-in for a streamed node, rendered as a token to split on"""
+
+    def __init__(self, index):
+        self.index = index
+
+    def _as_sql(self, connection, context):
+        return '\x00{index}\x00'.format(index=self.index), ()
+
+
+def _placeholders(sql):
+    return sum(1 for match in _PLACEHOLDER.finditer(sql) if match.group() == '%s')
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _items(items, connection, context, batch_size):
+    """Stream `IN` items, separated by commas"""
+    sep = ''
+    for batch in _batches(items, batch_size):
+        sql, args = SQLIterator(batch)._as_sql(connection, context)
+        yield sep + sql, args
+        sep = ', '
+
+
+def _rows(rows, connection, context, batch_size):
+    """Stream `VALUES` rows"""
+    sql = 'VALUES ('
+    for batch in _batches(rows, batch_size):
+        rows_sql, args = SQL.merge((SQLIterator(row)._as_sql(connection, context)
+                                    for row in batch), sep='), (')
+        yield sql + rows_sql, args
+        sql = '), ('
+    if sql == 'VALUES (':
+        raise ValueError('No rows in VALUES expression')
+    yield ')', ()
+
+
+def stream(query, connection, context=None, batch_size=1000):
+    """Render a query in `(sql, args)` chunks, see the module documentation"""
+    context = {} if context is None else context
+    streamed = []
+
+    def replace(node):
+        if isinstance(node, expression.InOperator) and not isinstance(node.right, SQL):
+            right = _Streamed(len(streamed))
+            streamed.append(partial(_items, node.right, connection, context, batch_size))
+            node = copy.copy(node)
+            object.__setattr__(node, 'left', transform(SQL.wrap(node.left), replace))
+            object.__setattr__(node, 'right', right)
+            return node
+        if isinstance(node, table.VALUES):
+            streamed.append(partial(_rows, node.rows, connection, context, batch_size))
+            return _Streamed(len(streamed) - 1)
+        return None
+
+    sql, args = transform(query, replace)._as_sql(connection, context)
+    parts = _TOKEN.split(sql)
+    start = 0
+    # parts alternate between rendered SQL and indexes of streamed nodes
+    for index, part in enumerate(parts):
+        if index % 2:
+            yield from streamed[int(part)]()
+            continue
+        end = start + _placeholders(part)
+        if part:
+            yield part, args[start:end]
+        start = end
@@ -1,6 +1,6 @@
 """SQL joins"""
 
-from .base import SQL, SQLIterator
+from .base import SQL, SQLIterator, dunder, one_pass, plain_items
 from .query import Query
 from enum import Enum
 
@@ -46,6 +46,8 @@ class Table(Joinable):
         return sql, args
 
     def __getattr__(self, name):
+        if dunder(name):
+            raise AttributeError(name)
         return Table('{name}.{subname}'.format(
             name=self._name,
             subname=name,
@@ -56,7 +58,38 @@ class Table(Joinable):
 
     def __call__(self):
         """Column identifier factory"""
-        return NameFactory(Identifier, prefix=self._name + '.', as_sql=lambda _, connection, context: Wildcard(self)._as_sql(connection, context))
+        return NameFactory(self)
+
+    def _column(self, name):
+        """Return the name of a column of the table"""
+        return name
+
+
+class SchemaTable(Table):
+    """Reference to a table described by a schema
+
+    Attribute access returns the known columns of the table.
+    """
+
+    def __init__(self, name, meta, ONLY=None):
+        super().__init__(name, ONLY=ONLY)
+        object.__setattr__(self, '_meta', meta)
+
+    def __getattr__(self, name):
+        if dunder(name):
+            raise AttributeError(name)
+        return Identifier('{name}.{subname}'.format(
+            name=self._name,
+            subname=self._column(name),
+        ))
+
+    def _column(self, name):
+        if name not in self._meta.columns:
+            raise AttributeError('Unknown column: {table}.{column}'.format(
+                table=self._name,
+                column=name,
+            ))
+        return name
 
 
 class VALUES(Joinable, Query):
@@ -70,17 +103,27 @@ class VALUES(Joinable, Query):
         self.rows.append(values)
         return self
 
+    @classmethod
+    def from_rows(cls, rows):
+        """Create a VALUES expression from an iterable of rows
+
+        Array-likes, e.g. two dimensional NumPy arrays, are converted by
+        their `tolist` method at once. Iterators are kept and consumed by the
+        first rendering, like `IN` items, see `OnePassIterator`.
+        """
+        values = cls.__new__(cls)
+        if hasattr(rows, '__next__'):
+            values.rows = one_pass(map(tuple, rows))
+        else:
+            values.rows = [tuple(row) for row in plain_items(rows)]
+        return values
+
     def _as_sql(self, connection, context):
-        assert len(self.rows), 'No rows in VALUE expression'
-        rows = []
-        args = ()
-        for row in self.rows:
-            row_sql, row_args = SQLIterator(row)._as_sql(connection, context)
-            rows.append('({row})'.format(row=row_sql))
-            args += row_args
-        sql = 'VALUES {rows}'.format(
-            rows=', '.join(rows),
-        )
+        rows_sql, args = SQL.merge((SQLIterator(row)._as_sql(connection, context)
+                                    for row in self.rows), sep='), (')
+        if not rows_sql:
+            raise ValueError('No rows in VALUES expression')
+        sql = 'VALUES ({rows})'.format(rows=rows_sql)
         return sql, args
 
 
@@ -196,11 +239,16 @@ from .name import NameFactory
 
 class TableFactory:
 
-    def __init__(self, ONLY=False):
+    def __init__(self, ONLY=False, schema=None):
         super().__setattr__('ONLY', ONLY)
+        super().__setattr__('schema', schema)
 
     def __getattr__(self, name):
-        return Table(name, ONLY=self.ONLY)
+        if self.schema is None:
+            return Table(name, ONLY=self.ONLY)
+        if name not in self.schema:
+            raise AttributeError('Unknown table: {name}'.format(name=name))
+        return SchemaTable(name, self.schema[name], ONLY=self.ONLY)
 
     def __setattr__(self, name, value):
         raise AttributeError('Tables are not assignable')
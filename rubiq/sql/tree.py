@@ -0,0 +1,114 @@
+"""SQL syntax tree traversal"""
+
+from .base import SQL
+import copy
+
+
+def children(node):
+    """Yield the direct SQL children of a node
+
+    Lists and tuples held by the node are flattened, plain values are
+    skipped. Other iterables are left alone, so a traversal never consumes
+    a generator that is meant to be rendered.
+    """
+    stack = list(reversed(list(vars(node).values())))
+    while stack:
+        value = stack.pop()
+        if isinstance(value, SQL):
+            yield value
+        elif isinstance(value, (list, tuple)):
+            stack.extend(reversed(value))
+
+
+def single_pass(node):
+    """Tell whether a node or its descendants hold iterators
+
+    Rendering consumes iterators, e.g. generators of `IN` items or `VALUES`
+    rows, so such trees render correctly only once; `SQL.freeze`
+    materializes them.
+    """
+    for node in walk(node):
+        stack = list(vars(node).values())
+        while stack:
+            value = stack.pop()
+            if hasattr(value, '__next__'):
+                return True
+            if isinstance(value, (list, tuple)):
+                stack.extend(value)
+    return False
+
+
+def walk(node, prune=None):
+    """Iterate over a node and its descendants, depth first
+
+    Children are looked up only after the consumer has processed their
+    parent, so a parent may be rewritten during the iteration. Descendants
+    of nodes for which `prune(node)` is true are not visited.
+    """
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        if prune is None or not prune(node):
+            stack.extend(reversed(list(children(node))))
+
+
+def transform(node, function):
+    """Return the tree under a node with some of its nodes replaced
+
+    `function(node)` returns the replacement of a node, or `None` to keep it
+    and transform its children instead. Nodes with changed children are
+    shallow copies, unchanged subtrees are shared with the original tree.
+    """
+    replacement = function(node)
+    if replacement is not None:
+        return replacement
+    changed = {}
+    for attr, value in vars(node).items():
+        result = _transform_value(value, function)
+        if result is not value:
+            changed[attr] = result
+    if not changed:
+        return node
+    node = copy.copy(node)
+    for attr, value in changed.items():
+        object.__setattr__(node, attr, value)
+    return node
+
+
+def _transform_value(value, function):
+    """Transform SQL nodes in an attribute value"""
+    if isinstance(value, SQL):
+        return transform(value, function)
+    if isinstance(value, (list, tuple)):
+        items = [_transform_value(item, function) for item in value]
+        if all(item is old for item, old in zip(items, value)):
+            return value
+        return type(value)(items)
+    return value
+
+
+def relations(source):
+    """Iterate over the tables and aliases joined in a FROM source"""
+    if isinstance(source, table.Join):
+        yield from relations(source.left)
+        yield from relations(source.right)
+    else:
+        yield source
+
+
+def wildcard_qualifier(node):
+    """Return the qualifier of a wildcard node
+
+    Returns `''` for a bare `*`, the table name for a `table.*` wildcard and
+    `None` if the node is not a wildcard.
+    """
+    if isinstance(node, table.Wildcard):
+        return '' if node.table is None else node.table._name
+    if isinstance(node, name.NameFactory):
+        return node._prefix[:-1]
+    return None
+
+
+# the module, not names: this module is imported while `table` is initialized
+from . import name, table
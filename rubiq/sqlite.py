@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+SQLite connection adapter
+"""
+
+from __future__ import absolute_import
+import re
+import sqlite3
+
+
+_PLACEHOLDER = re.compile('%([s%])')
+
+
+def _placeholder(match):
+    return '?' if match.group(1) == 's' else '%'
+
+
+class SQLiteConnection(object):
+    """
+    Wrapper of a `sqlite3` connection, rendering queries for SQLite
+
+    Identifiers are quoted, `%s` placeholders are bound as SQLite `?`
+    placeholders and operators SQLite lacks are rewritten. Other attributes
+    are those of the wrapped connection.
+    """
+
+    dialect = 'sqlite'
+
+    def __init__(self, database=':memory:', **kwargs):
+        if isinstance(database, sqlite3.Connection):
+            self.connection = database
+        else:
+            self.connection = sqlite3.connect(database, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+    def quote_identifier(self, identifier):
+        """
+        Quote each part of a dotted identifier
+        """
+        return '.'.join('"{part}"'.format(part=part.replace('"', '""'))
+                        for part in identifier.split('.'))
+
+    def quote_function_name(self, name):
+        """
+        Function names are not quoted, quoted names are not looked up as
+        built-in functions
+        """
+        return name
+
+    def operator_to_sql(self, op, left, right=None, context=None):
+        """
+        Render ILIKE as LIKE, which is case insensitive in SQLite
+        """
+        if op in ('ILIKE', 'NOT ILIKE'):
+            return BinaryOperator(left, op[:-5] + 'LIKE', right)._as_sql(self, context)
+        return NotImplemented
+
+    def bind(self, sql, args):
+        """
+        Translate rendered `format` placeholders to SQLite placeholders
+        """
+        return _PLACEHOLDER.sub(_placeholder, sql), tuple(args)
+
+    def cursor(self):
+        return SQLiteCursor(self, self.connection.cursor())
+
+
+class SQLiteCursor(object):
+    """
+    Wrapper of a `sqlite3` cursor, executing rendered queries
+    """
+
+    def __init__(self, connection, cursor):
+        self.connection = connection
+        self.cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+    def execute(self, sql, args=()):
+        self.cursor.execute(*self.connection.bind(sql, args))
+        return self
+
+    def executemany(self, sql, seq_of_args):
+        sql, _ = self.connection.bind(sql, ())
+        self.cursor.executemany(sql, seq_of_args)
+        return self
+
+
+from .sql.expression import BinaryOperator
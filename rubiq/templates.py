@@ -0,0 +1,185 @@
+"""
+Compiled query templates
+
+A template is a query rendered once for a connection dialect, with its
+variables left as parameter slots. Binding values to it takes no rendering:
+
+    template = compile_template(SELECT(C.name).FROM(T.users).WHERE(C.id == V.id), connection)
+    sql, args = template.bind(id=42)
+
+`TemplateCache` keeps the templates of a process in a file, so that other
+processes load them instead of building and rendering the queries:
+
+    cache = TemplateCache('templates.cache', connection)
+    template = cache.get('user_by_id', lambda: SELECT(...).WHERE(C.id == V.id))
+    ...
+    cache.save()
+
+The file is JSON: templates whose constant arguments are not JSON strings,
+numbers, booleans or nulls are compiled again by every process.
+"""
+
+from __future__ import absolute_import
+import json
+import os
+import tempfile
+import threading
+
+from . import __version__
+
+FORMAT = 2
+"""Version of the template cache file format"""
+
+
+class _Slot:
+    """Argument standing for a variable while a template is compiled"""
+
+    def __init__(self, name):
+        self.name = name
+
+
+class _SlotContext:
+    """Rendering context returning slots for every variable"""
+
+    def __getitem__(self, name):
+        return _Slot(name)
+
+
+class Template:
+    """Rendered SQL and the plan of its arguments
+
+    `slots` holds a `(True, name)` pair for arguments bound from variables
+    and a `(False, value)` pair for constant arguments.
+    """
+
+    def __init__(self, sql, slots, fingerprint=None):
+        self.sql = sql
+        self.slots = slots
+        self.fingerprint = fingerprint
+
+    def __repr__(self):
+        return '<Template {sql!r}>'.format(sql=self.sql)
+
+    @property
+    def variables(self):
+        return {value for variable, value in self.slots if variable}
+
+    def bind(self, **values):
+        """Return the `(sql, args)` of the template for variable values"""
+        return self.sql, tuple(values[value] if variable else value
+                               for variable, value in self.slots)
+
+    def execute(self, connection, **values):
+        """Allocate a cursor from the connection and execute the template"""
+        cursor = connection.cursor()
+        cursor.execute(*self.bind(**values))
+        return cursor
+
+
+def compile_template(query, connection):
+    """Compile a query into a `Template` for a connection
+
+    Variables are bound as single parameters: a variable standing for a
+    list is passed to the driver as one list argument.
+    """
+    sql, args = query._as_sql(connection, _SlotContext())
+    slots = tuple((True, arg.name) if isinstance(arg, _Slot) else (False, arg)
+                  for arg in args)
+    return Template(sql, slots, fingerprint=query.fingerprint().digest)
+
+
+_PLAIN = (str, int, float, bool, type(None))
+
+
+def _dump(template):
+    """Return the JSON representation of a template, `None` if it holds
+    constants JSON does not represent as they are"""
+    if not all(variable or isinstance(value, _PLAIN)
+               for variable, value in template.slots):
+        return None
+    return {'sql': template.sql, 'slots': [list(slot) for slot in template.slots],
+            'fingerprint': template.fingerprint}
+
+
+def _load(data):
+    slots = tuple((bool(variable), value) for variable, value in data['slots'])
+    return Template(data['sql'], slots, fingerprint=data['fingerprint'])
+
+
+def dialect(connection):
+    """Name the SQL dialect rendered for a connection"""
+    return getattr(connection, 'dialect', None) or type(connection).__name__
+
+
+class TemplateCache:
+    """Templates by name compiled for a connection, persisted in a file
+
+    The file holds the templates of every dialect and is discarded when it
+    was written by another version of rubiq or of the file format, or when
+    its `version` differs from the one given, which applications bump when
+    they change the queries behind template names.
+    """
+
+    def __init__(self, path, connection, version=None):
+        self.path = path
+        self.connection = connection
+        self.dialect = dialect(connection)
+        self.version = version
+        self.changed = False
+        self._lock = threading.Lock()
+        self.templates = self._load()
+
+    def _header(self):
+        # as read back from JSON
+        return json.loads(json.dumps(
+            {'format': FORMAT, 'rubiq': __version__, 'version': self.version}))
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data['header'] != self._header():
+                return {}
+            return {(entry['name'], entry['dialect']): _load(entry)
+                    for entry in data['templates']}
+        except (OSError, ValueError, KeyError, TypeError):
+            return {}
+
+    def __contains__(self, name):
+        return (name, self.dialect) in self.templates
+
+    def __len__(self):
+        return sum(1 for _, dialect in self.templates if dialect == self.dialect)
+
+    def get(self, name, build):
+        """Return the template of a name, compiling the query `build()`
+        returns if it is not cached yet"""
+        key = name, self.dialect
+        template = self.templates.get(key)
+        if template is None:
+            template = compile_template(build(), self.connection)
+            with self._lock:
+                self.templates[key] = template
+                self.changed = True
+        return template
+
+    def save(self):
+        """Write the templates to the file, if any template was compiled"""
+        with self._lock:
+            if not self.changed:
+                return
+            templates = []
+            for (name, dialect), template in self.templates.items():
+                entry = _dump(template)
+                if entry is not None:
+                    templates.append(dict(entry, name=name, dialect=dialect))
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump({'header': self._header(), 'templates': templates}, f)
+                os.replace(temporary, self.path)
+            except BaseException:
+                os.unlink(temporary)
+                raise
+            self.changed = False
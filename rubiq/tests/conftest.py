@@ -0,0 +1,13 @@
+import pytest
+from rubiq.sqlite import SQLiteConnection
+
+
+@pytest.fixture
+def connection():
+    """SQLite connection to a database of Alice and Bob users"""
+    connection = SQLiteConnection()
+    connection.executescript('''
+        CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT);
+        INSERT INTO users VALUES (1, 'Alice'), (2, 'Bob');
+    ''')
+    return connection
@@ -0,0 +1,58 @@
+import pytest
+from rubiq.query import *
+from rubiq.sql.base import SQL
+from rubiq.sqlite import SQLiteConnection
+
+
+class ArrayLike:
+    """Array-like converting its items on `tolist`, as NumPy arrays do"""
+
+    def __init__(self, items):
+        self.items = items
+
+    def tolist(self):
+        return [int(item) for item in self.items]
+
+
+def test_merge():
+    assert SQL.merge([('a', (1,)), ('b', ()), ('c', (2, 3))]) == ('a, b, c', (1, 2, 3))
+
+
+def test_in_bulk():
+    query = SELECT(C.a).FROM(T.t).WHERE(IN(C.a, ArrayLike(['1', '2', '3'])))
+    assert query == ('SELECT a FROM t WHERE (a IN (%s, %s, %s))', (1, 2, 3))
+    query = SELECT(C.a).FROM(T.t).WHERE(IN(C.a, (x for x in [1, C.b])))
+    assert query == ('SELECT a FROM t WHERE (a IN (%s, b))', (1,))
+
+
+def test_values():
+    values = VALUES.from_rows([[1, 'a'], [2, None]])
+    assert SELECT().FROM(values) == ('SELECT * FROM VALUES (%s, %s), (%s, %s)', (1, 'a', 2, None))
+    assert VALUES(1, C.a)(2, 3) == ('VALUES (%s, a), (%s, %s)', (1, 2, 3))
+
+
+def test_any():
+    query = SELECT(C.a).FROM(T.t).WHERE(C.a == ANY(ArrayLike(['1', '2'])))
+    assert query == ('SELECT a FROM t WHERE (a = ANY(%s))', ([1, 2],))
+    query = SELECT(C.a).FROM(T.t).WHERE(C.a == ANY(SELECT(C.b).FROM(T.u)))
+    assert query == ('SELECT a FROM t WHERE (a = ANY(SELECT b FROM u))', ())
+
+
+def test_numpy():
+    numpy = pytest.importorskip('numpy')
+    ids = numpy.arange(3, dtype=numpy.int64)
+    sql, args = SELECT(C.a).FROM(T.t).WHERE(IN(C.a, ids))._as_sql(SQLiteConnection(), {})
+    assert args == (0, 1, 2) and all(type(arg) is int for arg in args)
+    values = VALUES.from_rows(numpy.array([[1.5, 2.5], [3.5, 4.5]]))
+    assert values == ('VALUES (%s, %s), (%s, %s)', (1.5, 2.5, 3.5, 4.5))
+
+
+def test_numpy_scalars():
+    numpy = pytest.importorskip('numpy')
+    query = SELECT(C.a).FROM(T.t).WHERE(AND(C.a == numpy.int64(1), IN(C.b, [numpy.float32(2.5)])))
+    sql, args = query._as_sql(SQLiteConnection(), {})
+    assert args == (1, 2.5) and [type(arg) for arg in args] == [int, float]
+    sql, args = VALUES.from_rows([numpy.array([1, 2])])._as_sql(SQLiteConnection(), {})
+    assert [type(arg) for arg in args] == [int, int]
+    sql, args = SELECT(C.a).FROM(T.t).WHERE(C.a == ANY([numpy.int32(3)]))._as_sql(SQLiteConnection(), {})
+    assert args == ([3],) and type(args[0][0]) is int
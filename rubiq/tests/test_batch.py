@@ -0,0 +1,114 @@
+import json
+import pytest
+from rubiq.batch import Batch
+from rubiq.comment import Commenter
+from rubiq.dummy import DummyConnection
+from rubiq.instrument import QueryStats, listen, remove
+from rubiq.query import *
+from rubiq.sql.query import Query
+from rubiq.sqlite import SQLiteConnection
+
+
+class Cursor:
+    """Cursor returning canned result sets"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.results = list(connection.results)
+
+    def execute(self, sql, args):
+        self.connection.executed.append((sql, args))
+
+    def fetchall(self):
+        return self.results[0]
+
+    def nextset(self):
+        self.results.pop(0)
+        return True if self.results else None
+
+
+class Connection(DummyConnection):
+
+    def __init__(self, results, batch_mode=None):
+        self.results = results
+        self.batch_mode = batch_mode
+        self.executed = []
+
+    def cursor(self):
+        return Cursor(self)
+
+
+def queries():
+    return (SELECT(C.id).FROM(T.users).WHERE(C.id == 1),
+            SELECT(C.total).FROM(T.orders).WHERE(C.user_id == 1).LIMIT(5))
+
+
+def test_multi():
+    connection = Connection([[(1,)], [(10.0,), (20.0,)]], batch_mode='multi')
+    assert Batch(*queries()).execute(connection) == [[(1,)], [(10.0,), (20.0,)]]
+    assert connection.executed == [(
+        'SELECT id FROM users WHERE (id = %s); '
+        'SELECT total FROM orders WHERE (user_id = %s) LIMIT %s', (1, 1, 5))]
+    with pytest.raises(RuntimeError):
+        Batch(*queries()).execute(Connection([[(1,)]]), mode='multi')
+
+
+def test_json():
+    connection = Connection([[
+        (1, json.dumps([[10.0], [20.0]])),
+        (0, [[1]]),
+    ]])
+    batch = Batch()
+    assert batch.add(queries()[0]) == 0
+    assert batch.add(queries()[1]) == 1
+    batch.add(SELECT(C.id).FROM(T.empty))
+    assert batch.execute(connection, mode='json') == [[(1,)], [(10.0,), (20.0,)], []]
+    sql, args = connection.executed[0]
+    row = ('json_agg((SELECT json_agg(c.value ORDER BY c.n) FROM json_each(row_to_json(t)) '
+           'WITH ORDINALITY AS c(key, value, n))) AS rows')
+    assert sql == (
+        'SELECT 0 AS tag, {row} FROM '
+        '(SELECT id FROM users WHERE (id = %s)) AS t UNION ALL '
+        'SELECT 1 AS tag, {row} FROM '
+        '(SELECT total FROM orders WHERE (user_id = %s) LIMIT %s) AS t UNION ALL '
+        'SELECT 2 AS tag, {row} FROM (SELECT id FROM empty) AS t').format(row=row)
+    assert args == (1, 1, 5)
+    # rows are positional, repeated column names are kept
+    connection = Connection([[(0, [[1, 2]])]])
+    users = T.users()
+    assert Batch(SELECT(users.id, C.id)).execute(connection, mode='json') == [[(1, 2)]]
+
+
+def test_sequential():
+    connection = SQLiteConnection()
+    connection.executescript('''
+        CREATE TABLE users (id INTEGER);
+        CREATE TABLE orders (user_id INTEGER, total REAL);
+        INSERT INTO users VALUES (1), (2);
+        INSERT INTO orders VALUES (1, 10.0), (2, 5.0);
+    ''')
+    assert Batch(*queries()).execute(connection) == [[(1,)], [(10.0,)]]
+    assert Batch().execute(connection) == []
+    with pytest.raises(ValueError):
+        Batch(*queries()).execute(connection, mode='parallel')
+
+
+@pytest.mark.parametrize('mode', ['multi', 'json'])
+def test_instrument(mode):
+    results = [[(1,)], [(10.0,), (20.0,)]]
+    if mode == 'json':
+        results = [[(0, [[1]]), (1, [[10.0], [20.0]])]]
+    connection = Connection(results)
+    events = []
+    listener = listen('after_execute', events.append)
+    Query.commenter = Commenter(caller=False, application='app')
+    try:
+        with QueryStats() as stats:
+            Batch(*queries()).execute(connection, mode=mode)
+    finally:
+        Query.commenter = None
+        remove('after_execute', listener)
+    assert [event.rowcount for event in events] == [1, 2]
+    assert events[0].sql == "SELECT id FROM users WHERE (id = %s) /*application='app'*/"
+    assert len(stats) == 2
+    assert connection.executed[0][0].count("/*application='app'*/") == 2
@@ -0,0 +1,123 @@
+import time
+import pytest
+from rubiq.cache import MemoryBackend, ResultCache, tables
+from rubiq.query import *
+from rubiq.sqlite import SQLiteConnection
+
+
+@pytest.fixture
+def connection(connection):
+    connection.executescript('''
+        CREATE TABLE orders (id INTEGER PRIMARY KEY, user_id INTEGER);
+        INSERT INTO orders VALUES (1, 1);
+    ''')
+    return connection
+
+
+def users():
+    return SELECT(C.name).FROM(T.users).ORDER_BY(C.id)
+
+
+def test_tables():
+    u, o = T.users(), T.orders()
+    query = (SELECT(u.name).FROM(T.users).INNER_JOIN(T.orders, ON=(o.user_id == u.id))
+             .WHERE(IN(u.id, SELECT(C.user_id).FROM(T.bans))))
+    assert tables(query) == {'users', 'orders', 'bans'}
+    query = SELECT().FROM(T.recent).WITH('recent', SELECT().FROM(T.orders))
+    assert tables(query) == {'orders'}
+
+
+def test_hits(connection):
+    cache = ResultCache()
+    first = cache.execute(users(), connection)
+    assert not first.hit and first.fetchall() == [('Alice',), ('Bob',)]
+    connection.execute("INSERT INTO users VALUES (3, 'Carol')")
+    second = cache.execute(users(), connection)
+    assert second.hit and second.fetchone() == ('Alice',)
+    assert second.fetchall() == [('Bob',)]
+    assert second.description[0][0] == 'name'
+    assert cache.execute(users().LIMIT(1), connection).hit is False
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    cache.invalidate('orders')
+    assert cache.execute(users(), connection).hit
+    cache.invalidate('users')
+    assert len(cache.execute(users(), connection).fetchall()) == 3
+
+
+def test_ttl(connection):
+    cache = ResultCache(ttl=0.01)
+    cache.execute(users(), connection)
+    time.sleep(0.02)
+    assert not cache.execute(users(), connection).hit
+    assert cache.execute(users(), connection, ttl=None).hit
+
+
+def test_lru():
+    cache = ResultCache(backend=MemoryBackend(max_entries=2))
+    connection = SQLiteConnection()
+    queries = [SELECT(L(n)) for n in range(3)]
+    for query in queries:
+        cache.execute(query, connection)
+    cache.execute(queries[1], connection)
+    assert len(cache.backend) == 2
+    assert not cache.execute(queries[0], connection).hit
+    assert cache.execute(queries[1], connection).hit
+    assert not cache.execute(queries[2], connection).hit
+
+
+def test_max_rows(connection):
+    backend = MemoryBackend(max_rows=2)
+    cache = ResultCache(backend=backend)
+    cache.execute(users(), connection)
+    cache.execute(SELECT(C.id).FROM(T.orders), connection)
+    assert backend.rows == 1 and len(backend) == 1
+
+
+def test_fingerprint_key(connection):
+    cache = ResultCache(key='fingerprint')
+    cache.execute(users().WHERE(C.id == 1), connection)
+    assert cache.execute(users().WHERE(C.id == 1), connection).hit
+    assert not cache.execute(users().WHERE(C.id == 2), connection).hit
+
+
+def test_fingerprint_lengths(connection):
+    cache = ResultCache(key='fingerprint')
+    query = users().WHERE(AND(IN(C.id, [1, 2]), IN(C.name, ['Bob'])))
+    assert cache.execute(query, connection).fetchall() == [('Bob',)]
+    query = users().WHERE(AND(IN(C.id, [1]), IN(C.name, [2, 'Bob'])))
+    assert not cache.execute(query, connection).hit
+    query = users().WHERE(IN(C.id, (i for i in (1, 2))))
+    assert not cache.execute(query, connection).hit
+    assert len(cache.backend) == 2
+
+
+def test_invalidated_while_executing(connection, monkeypatch):
+    cache = ResultCache()
+    execute = SELECT._execute
+
+    def invalidating(query, connection, context, rendered=None):
+        cursor = execute(query, connection, context, rendered)
+        cache.invalidate('users')
+        return cursor
+
+    monkeypatch.setattr(SELECT, '_execute', invalidating)
+    assert not cache.execute(users(), connection).hit
+    assert len(cache.backend) == 0
+    monkeypatch.undo()
+    cache.execute(users(), connection)
+    assert cache.execute(users(), connection).hit
+
+
+def test_rendered_once(connection, monkeypatch):
+    cache = ResultCache()
+    rendered = []
+    as_sql = SELECT._as_sql
+
+    def rendering(query, connection, context):
+        rendered.append(query)
+        return as_sql(query, connection, context)
+
+    monkeypatch.setattr(SELECT, '_as_sql', rendering)
+    assert cache.execute(users(), connection).fetchall() == [('Alice',), ('Bob',)]
+    assert len(rendered) == 1
@@ -0,0 +1,70 @@
+import pytest
+from rubiq.rows import column_names
+from rubiq.query import *
+from rubiq.sqlite import SQLiteConnection
+
+numpy = pytest.importorskip('numpy')
+
+
+@pytest.fixture
+def connection():
+    connection = SQLiteConnection()
+    connection.execute('CREATE TABLE orders (id INTEGER, total REAL, note TEXT)')
+    connection.executemany('INSERT INTO orders VALUES (?, ?, ?)',
+                           [(i, i / 2, 'note {}'.format(i) if i % 3 else None)
+                            for i in range(25)])
+    return connection
+
+
+def test_column_names():
+    orders = T.orders()
+    query = SELECT(orders.id, A.half(C.total / 2), F.count(C))
+    assert column_names(query, [('x',), ('y',), ('z',)]) == ['id', 'half', 'z']
+    assert column_names(SELECT(), [('a',), ('b',)]) == ['a', 'b']
+
+
+def test_fetch_columns(connection):
+    query = SELECT(C.id, A.amount(C.total), C.note).FROM(T.orders).ORDER_BY(C.id)
+    columns = query.fetch_columns(connection, batch_size=4)
+    assert list(columns) == ['id', 'amount', 'note']
+    assert columns['id'].dtype == numpy.int64
+    assert columns['id'].tolist() == list(range(25))
+    assert columns['amount'].dtype == numpy.float64
+    assert columns['amount'].sum() == sum(i / 2 for i in range(25))
+    assert columns['note'].dtype == object
+    assert columns['note'][0] is None and columns['note'][1] == 'note 1'
+
+
+def test_dtypes(connection):
+    query = SELECT(C.id, C.total).FROM(T.orders).WHERE(C.id < 3)
+    columns = query.fetch_columns(connection, dtypes={'total': 'float32'})
+    assert columns['total'].dtype == numpy.float32
+    columns = query.fetch_columns(connection, dtypes=['int16', 'float16'])
+    assert columns['id'].dtype == numpy.int16
+    empty = SELECT(C.id).FROM(T.orders).WHERE(C.id < 0).fetch_columns(connection)
+    assert len(empty['id']) == 0
+
+
+def test_promotion():
+    connection = SQLiteConnection()
+    connection.execute('CREATE TABLE t (a INTEGER, b INTEGER, c INTEGER, d TEXT)')
+    connection.executemany('INSERT INTO t VALUES (?, ?, ?, ?)',
+                           [(1, 1, None, None), (2, 2, None, 'x'), (None, 2.5, 3, None)])
+    query = SELECT(C.a, C.b, C.c, C.d).FROM(T.t).ORDER_BY(C.rowid)
+    columns = query.fetch_columns(connection, batch_size=1)
+    assert isinstance(columns['a'], numpy.ma.MaskedArray)
+    assert columns['a'].dtype == numpy.int64 and columns['a'].tolist() == [1, 2, None]
+    assert columns['b'].dtype == numpy.float64 and columns['b'].tolist() == [1, 2, 2.5]
+    assert not isinstance(columns['b'], numpy.ma.MaskedArray)
+    assert columns['c'].dtype == numpy.int64 and columns['c'].tolist() == [None, None, 3]
+    assert columns['d'].dtype == object and columns['d'].tolist() == [None, 'x', None]
+    columns = query.fetch_columns(connection, dtypes={'a': 'float32'})
+    assert columns['a'].dtype == numpy.float32 and columns['a'].mask.tolist() == [False, False, True]
+
+
+def test_duplicate_names(connection):
+    orders = T.orders()
+    query = SELECT(orders.id, C.id, A.id(C.total)).FROM(T.orders).WHERE(C.id == 3)
+    columns = query.fetch_columns(connection)
+    assert list(columns) == ['id', '_1', '_2']
+    assert columns['_2'].tolist() == [1.5]
@@ -0,0 +1,65 @@
+import pytest
+from rubiq.comment import Commenter, comment_tags, format_comment
+from rubiq.query import *
+from rubiq.sql.query import Query
+from rubiq.sqlite import SQLiteConnection
+from rubiq.instrument import QueryStats
+
+
+@pytest.fixture
+def commenter():
+    Query.commenter = commenter = Commenter(application='app')
+    yield commenter
+    Query.commenter = None
+
+
+class Connection(SQLiteConnection):
+    """Connection recording the executed statements"""
+
+    def __init__(self):
+        super().__init__()
+        self.executed = []
+        self.connection.set_trace_callback(self.executed.append)
+
+
+def test_format():
+    assert format_comment({}) == ''
+    assert format_comment({'route': '/a b', 'id': "x'y"}) == \
+        "/*id='x%%27y',route='%%2Fa%%20b'*/"
+
+
+def run(connection):
+    SELECT(A.x(L(1))).execute(connection)
+
+
+def test_execute(commenter):
+    connection = Connection()
+    for value in (1, 2):
+        SELECT(L(value)).execute(connection)
+        run(connection)
+    with comment_tags(route='/users'):
+        SELECT(L(3)).execute(connection)
+    one, two, three, four, five = connection.executed
+    assert one.endswith(
+        "/*application='app',function='test_execute',module='test_comment'*/")
+    assert two.endswith("function='run',module='test_comment'*/")
+    assert one.replace('1', '2') == three
+    assert five.endswith("route='%2Fusers'*/")
+
+
+def test_fingerprint(commenter):
+    commenter.fingerprint = True
+    connection = Connection()
+    with QueryStats() as stats:
+        SELECT(L(1)).execute(connection)
+    entry, = stats.report()
+    assert "fingerprint='{digest}'".format(digest=entry.fingerprint) in connection.executed[0]
+
+
+def test_connection_commenter(commenter):
+    connection = Connection()
+    connection.commenter = Commenter(caller=False, application='reports')
+    SELECT(L(1)).execute(connection)
+    connection.commenter = None
+    SELECT(L(2)).execute(connection)
+    assert connection.executed == ["SELECT 1 /*application='reports'*/", 'SELECT 2']
@@ -0,0 +1,34 @@
+from rubiq.query import *
+from rubiq.sql.fingerprint import fingerprint
+
+
+def test_values_ignored():
+    one = SELECT(C.a).FROM(T.t).WHERE(AND(C.a == 1, C.b == 'x')).LIMIT(10, 20)
+    two = SELECT(C.a).FROM(T.t).WHERE(AND(C.a == 2, C.b == V.b)).LIMIT(5, 0)
+    assert one.fingerprint() == two.fingerprint()
+    assert one.fingerprint().sql == 'SELECT a FROM t WHERE ((a = ?) AND (b = ?)) LIMIT ? OFFSET ?'
+    assert one.fingerprint() != SELECT(C.a).FROM(T.t).WHERE(C.a == 1).fingerprint()
+
+
+def test_in_list():
+    one = SELECT(C.a).FROM(T.t).WHERE(IN(C.a, [1]))
+    three = SELECT(C.a).FROM(T.t).WHERE(IN(C.a, [1, 2, 3]))
+    assert one.fingerprint() == three.fingerprint()
+    assert three.fingerprint().sql == 'SELECT a FROM t WHERE (a IN (...))'
+    # the query itself is left alone
+    assert three == ('SELECT a FROM t WHERE (a IN (%s, %s, %s))', (1, 2, 3))
+    assert fingerprint(SELECT(C.a).FROM(T.t).WHERE(NOT_IN(C.a, [1]))) != one.fingerprint()
+
+
+def test_in_subquery():
+    query = SELECT(C.a).FROM(T.t).WHERE(IN(C.a, SELECT(C.b).FROM(T.u).WHERE(IN(C.c, [1, 2]))))
+    assert query.fingerprint().sql == \
+        'SELECT a FROM t WHERE (a IN (SELECT b FROM u WHERE (c IN (...))))'
+
+
+def test_values_rows():
+    one = SELECT(C).FROM(VALUES(1, 'a'))
+    two = SELECT(C).FROM(VALUES(1, 'a')(2, 'b'))
+    assert one.fingerprint() == two.fingerprint()
+    assert two.fingerprint().sql == 'SELECT * FROM VALUES (?, ?), ...'
+    assert one.fingerprint() != SELECT(C).FROM(VALUES(1)).fingerprint()
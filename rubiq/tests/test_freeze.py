@@ -0,0 +1,64 @@
+from concurrent.futures import ThreadPoolExecutor
+import sys
+import pytest
+from rubiq.dummy import dummy_connection
+from rubiq.query import *
+
+
+def template():
+    users = T.users()
+    return (SELECT(users.id, F.count(C.order_id).DISTINCT, A.total(F.sum(C.total)))
+            .FROM(T.users).LEFT_JOIN(T.orders, ON=(C.user_id == users.id))
+            .WHERE(AND(IN(users.id, (id for id in range(50))), C.name == V.name))
+            .GROUP_BY(users.id).ORDER_BY(DESC(C.total).NULLS_LAST).LIMIT(10))
+
+
+def render(query, name='x'):
+    return query._as_sql(dummy_connection, {'name': name})
+
+
+def test_freeze():
+    query = template().freeze()
+    expected = render(template())
+    # iterators are materialized, rendering repeatedly gives the same SQL
+    assert render(query) == render(query) == expected
+    with pytest.raises(AttributeError):
+        query.LIMIT(5)
+    with pytest.raises(AttributeError):
+        query.columns[1].ALL
+    with pytest.raises(AttributeError):
+        query.order[0].NULLS_FIRST
+    with pytest.raises(AttributeError):
+        query.source.WHERE(None)
+    assert isinstance(query, SELECT)
+    assert query.fingerprint() == template().fingerprint()
+
+
+def test_thaw():
+    query = template().freeze()
+    copy = query.thaw()
+    copy.LIMIT(5)
+    copy.columns.append(C.extra)
+    assert render(query) == render(template())
+    assert render(copy) != render(query)
+    assert 'extra' in render(copy)[0]
+    copy.freeze()
+
+
+def test_concurrent_render():
+    shared = template().freeze()
+    expected = {name: render(template(), name) for name in 'abcdefgh'}
+
+    def work(index):
+        for _ in range(50):
+            name = 'abcdefgh'[index % 8]
+            assert render(shared, name) == expected[name]
+        return True
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # switch threads as often as possible
+    try:
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            assert all(executor.map(work, range(64)))
+    finally:
+        sys.setswitchinterval(interval)
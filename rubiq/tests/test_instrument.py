@@ -0,0 +1,64 @@
+import pytest
+from rubiq import instrument
+from rubiq.instrument import Histogram, QueryStats, listen, remove
+from rubiq.query import *
+
+
+def test_events(connection):
+    events = []
+    listeners = {name: (lambda event, name=name: events.append((name, event.sql)))
+                 for name in instrument.EVENTS}
+    for name, listener in listeners.items():
+        listen(name, listener)
+    try:
+        SELECT(C.name).FROM(T.users).WHERE(C.id == 1).execute(connection)
+    finally:
+        for name, listener in listeners.items():
+            remove(name, listener)
+    sql = 'SELECT "name" FROM "users" WHERE ("id" = %s)'
+    assert events == [
+        ('before_render', None),
+        ('after_render', sql),
+        ('before_execute', sql),
+        ('after_execute', sql),
+    ]
+    assert not instrument.active
+
+
+def test_error(connection):
+    errors = []
+    listener = listen('on_error', errors.append)
+    try:
+        with pytest.raises(Exception):
+            SELECT(C.id).FROM(T.missing).execute(connection)
+    finally:
+        remove('on_error', listener)
+    assert len(errors) == 1
+    assert errors[0].fingerprint is not None
+    assert 'missing' in str(errors[0].error)
+
+
+def test_query_stats(connection):
+    with QueryStats() as stats:
+        for id in (1, 2, 3):
+            SELECT(C.name).FROM(T.users).WHERE(C.id == id).execute(connection)
+        SELECT(F.count(C)).FROM(T.users).execute(connection)
+    SELECT(C.name).FROM(T.users).execute(connection)
+    report = stats.report()
+    assert len(report) == 2
+    select, = [entry for entry in report if 'WHERE' in entry.sql]
+    count, = [entry for entry in report if entry is not select]
+    assert select.count == 3
+    assert sum(select.histogram.counts) == 3
+    assert count.count == 1 and count.errors == 0
+    assert stats[select.fingerprint] is select
+
+
+def test_histogram():
+    histogram = Histogram()
+    assert histogram.percentile(50) is None
+    for value in (0.00001, 0.0002, 0.0002, 0.003, 100):
+        histogram.add(value)
+    assert histogram.percentile(50) == 0.00025
+    assert histogram.percentile(80) == 0.005
+    assert histogram.percentile(100) == float('inf')
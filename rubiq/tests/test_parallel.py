@@ -0,0 +1,58 @@
+import copy
+import pickle
+import pytest
+from rubiq.dummy import dummy_connection
+from rubiq.parallel import chunks, render_parallel
+from rubiq.query import *
+from rubiq.sqlite import SQLiteConnection
+
+
+def query(n):
+    users = T.users()
+    return (SELECT(C, users, users.id, F.count(C.x).DISTINCT, A.total(F.sum(C.y)))
+            .FROM(T.users).LEFT_JOIN(T.orders, ON=(C.user_id == users.id))
+            .WHERE(AND(IN(C.a, [n, n + 1]), LIKE(C.c, 'x%'), C.d == V.d))
+            .GROUP_BY(C.a).ORDER_BY(DESC(C.a).NULLS_LAST).LIMIT(n)
+            .WITH('w', SELECT(L(1))))
+
+
+def render(query):
+    return query._as_sql(dummy_connection, {'d': 'd'})
+
+
+@pytest.mark.parametrize('freeze', [False, True])
+def test_pickle(freeze):
+    original = query(1).freeze() if freeze else query(1)
+    for copied in (pickle.loads(pickle.dumps(original)), copy.deepcopy(original)):
+        assert render(copied) == render(query(1))
+        assert copied._frozen is freeze
+    assert render(pickle.loads(pickle.dumps(C))) == ('*', ())
+
+
+def test_chunks():
+    assert list(chunks(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+
+def test_render_parallel():
+    queries = [query(n) for n in range(50)]
+    rendered = list(render_parallel(iter(queries), workers=2, chunksize=8,
+                                    context={'d': 'd'}))
+    assert rendered == [render(query) for query in queries]
+    sqlite = list(render_parallel(queries[:3], SQLiteConnection, workers=1,
+                                  context={'d': 'd'}))
+    assert sqlite[0] == queries[0]._as_sql(SQLiteConnection(), {'d': 'd'})
+
+
+def test_bounded():
+    read = []
+
+    def queries():
+        for n in range(50):
+            read.append(n)
+            yield query(n)
+
+    rendered = render_parallel(queries(), workers=1, chunksize=1, context={'d': 'd'})
+    assert next(rendered) == render(query(0))
+    # two chunks in flight, one more submitted once the first is rendered
+    assert read == [0, 1, 2]
+    rendered.close()
@@ -0,0 +1,150 @@
+import time
+from contextlib import contextmanager
+import pytest
+from rubiq.dummy import DummyConnection
+from rubiq.pipeline import Pipeline, PipelineAborted
+from rubiq.query import *
+
+
+class Cursor:
+    """Cursor returning the arguments of its query as its row"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = None
+        self.rowcount = -1
+        self.error = None
+
+    def execute(self, sql, args):
+        self.connection.executed.append(sql)
+        if 'missing' in sql:
+            self.error = RuntimeError('relation "missing" does not exist')
+        if self.connection.pipelined:
+            # results are deferred until the end of the pipeline
+            self.connection.pending.append(self)
+        else:
+            self.connection.round_trip()
+            self.check()
+        self.description = [('value',)]
+        self.rows = [tuple(args)]
+
+    def check(self):
+        if self.error is not None:
+            raise self.error
+
+    def fetchall(self):
+        self.check()
+        return self.rows
+
+
+class Connection(DummyConnection):
+    """Connection with a fixed latency per round trip"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.pipelined = False
+        self.pending = []
+        self.executed = []
+        self.round_trips = 0
+
+    def round_trip(self):
+        self.round_trips += 1
+        time.sleep(self.latency)
+
+    def cursor(self):
+        return Cursor(self)
+
+
+class PipelineConnection(Connection):
+
+    @contextmanager
+    def pipeline(self):
+        self.pipelined = True
+        try:
+            yield
+        finally:
+            self.pipelined = False
+            self.pending = []
+            self.round_trip()
+
+
+class ExitErrorConnection(PipelineConnection):
+    """Connection reporting errors only when its pipeline exits"""
+
+    @contextmanager
+    def pipeline(self):
+        with super().pipeline():
+            yield
+            errors = [cursor.error for cursor in self.pending if cursor.error]
+            for cursor in self.pending:
+                cursor.error = None
+        if errors:
+            raise errors[0]
+
+
+def query(value):
+    return SELECT(C.id).FROM(T.users).WHERE(C.id == value)
+
+
+def test_results():
+    connection = PipelineConnection()
+    with Pipeline(connection, batch_size=4) as pipeline:
+        futures = [pipeline.submit(query(value)) for value in range(10)]
+        assert len(pipeline) == 2
+        assert all(future.done() for future in futures[:8])
+    assert [future.result() for future in futures] == [[(value,)] for value in range(10)]
+    assert connection.round_trips == 3
+
+
+def test_latency():
+    connection = PipelineConnection(latency=0.01)
+    start = time.perf_counter()
+    with Pipeline(connection, batch_size=50) as pipeline:
+        futures = [pipeline.submit(query(value)) for value in range(50)]
+    assert time.perf_counter() - start < 0.25
+    assert connection.round_trips == 1
+    assert futures[-1].result() == [(49,)]
+
+
+def test_sequential():
+    connection = Connection()
+    pipeline = Pipeline(connection)
+    futures = [pipeline.submit(query(value)) for value in range(3)]
+    assert not any(future.done() for future in futures)
+    pipeline.flush()
+    assert [future.result() for future in futures] == [[(0,)], [(1,)], [(2,)]]
+    assert connection.round_trips == 3
+
+
+@pytest.mark.parametrize('connection_class',
+                         [Connection, PipelineConnection, ExitErrorConnection])
+def test_error(connection_class):
+    connection = connection_class()
+    pipeline = Pipeline(connection)
+    first = pipeline.submit(query(1))
+    failing = pipeline.submit(SELECT(C.id).FROM(T.missing))
+    skipped = [pipeline.submit(query(value)) for value in range(3)]
+    pipeline.flush()
+    if connection_class is ExitErrorConnection:
+        # no result tells the failed query apart, the whole batch fails
+        failing, skipped = first, [failing] + skipped
+    else:
+        assert first.result() == [(1,)]
+    with pytest.raises(RuntimeError):
+        failing.result()
+    for future in skipped:
+        with pytest.raises(PipelineAborted) as info:
+            future.result()
+        assert info.value.error is failing.exception()
+    if connection_class is Connection:
+        assert len(connection.executed) == 2
+
+
+def test_abort():
+    pipeline = Pipeline(Connection())
+    with pytest.raises(ValueError):
+        with pipeline:
+            future = pipeline.submit(query(1))
+            raise ValueError
+    assert isinstance(future.exception(), PipelineAborted)
+    assert len(pipeline) == 0
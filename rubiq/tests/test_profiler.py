@@ -0,0 +1,36 @@
+from rubiq.dummy import dummy_connection, dummy_context
+from rubiq.profiler import RenderProfiler
+from rubiq.query import *
+from rubiq.sql.base import SQL
+import pytest
+
+
+def query():
+    return (SELECT(C.a, C.b).FROM(T.t)
+            .WHERE(AND(C.a == 1, IN(C.b, [1, 2, 3]), C.c.IN(SELECT(C.c).FROM(T.u)))))
+
+
+def test_profiler():
+    select = query()
+    with RenderProfiler() as profiler:
+        sql = select._as_sql(dummy_connection, dummy_context)
+    assert sql == query()._as_sql(dummy_connection, dummy_context)
+    assert profiler.stats['SELECT'].calls == 2
+    assert 'SELECT' in profiler.report()
+    assert 'InOperator' in profiler.stats
+    for stats in profiler.stats.values():
+        assert 0 <= stats.own_time <= stats.time
+
+
+def test_restored():
+    originals = {cls: cls.__dict__.get('_as_sql') for cls in SQL.__subclasses__()}
+    with RenderProfiler():
+        with pytest.raises(RuntimeError):
+            RenderProfiler().start()
+    assert originals == {cls: cls.__dict__.get('_as_sql') for cls in SQL.__subclasses__()}
+
+
+def test_memory():
+    with RenderProfiler(memory=True) as profiler:
+        query()._as_sql(dummy_connection, dummy_context)
+    assert profiler.stats['SELECT'].memory > 0
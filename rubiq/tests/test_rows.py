@@ -0,0 +1,25 @@
+from rubiq.query import *
+from rubiq.rows import row_type
+
+
+def test_rows(connection):
+    users = T.users()
+    rows = SELECT(users.id, A.upper(F.upper(C.name))).FROM(T.users).ORDER_BY(C.id).rows(connection)
+    first = next(rows)
+    assert (first.id, first.upper) == (1, 'ALICE')
+    assert first == (1, 'ALICE')
+    assert not hasattr(first, '__dict__')
+    assert list(rows) == [(2, 'BOB')]
+
+
+def test_row_type_cache(connection):
+    one = next(SELECT(C.id, C.name).FROM(T.users).rows(connection))
+    two = next(SELECT(C.id, C.name).FROM(T.users).WHERE(C.id == 2).rows(connection))
+    assert type(one) is type(two)
+    assert type(one)._fields == ('id', 'name')
+
+
+def test_rename(connection):
+    assert row_type(('id', 'id', 'count(*)', 'class'))._fields == ('id', '_1', '_2', '_3')
+    row = next(SELECT().FROM(T.users).rows(connection))
+    assert row._fields == ('id', 'name')
@@ -0,0 +1,105 @@
+import json
+
+import pytest
+from rubiq.query import *
+from rubiq.query.optimize import eliminate_joins
+from rubiq.schema import Schema
+
+
+@pytest.fixture
+def schema():
+    schema = Schema()
+    schema.table('orders', ['id', 'user_id', 'total'], primary_key='id',
+                 indexes={'orders_user_id': 'user_id'})
+    schema.table('users', ['id', 'name'], primary_key='id')
+    return schema
+
+
+def test_known_columns(schema):
+    assert schema.T.orders.total == ('orders.total', ())
+    assert A.o(schema.T.orders).total == ('o.total', ())
+    assert schema.T.orders().total == ('orders.total', ())
+
+
+def test_unknown_names(schema):
+    with pytest.raises(AttributeError):
+        schema.T.products
+    with pytest.raises(AttributeError):
+        schema.T.orders.price
+    with pytest.raises(AttributeError):
+        A.o(schema.T.orders).price
+    with pytest.raises(AttributeError):
+        schema.T.orders().price
+
+
+def test_expand_wildcard(schema):
+    T = schema.T
+    orders = A.o(T.orders)
+    select = (SELECT().FROM(orders)
+              .LEFT_JOIN(T.users, ON=(T.users.id == orders.user_id)))
+    sql = ('SELECT o.id, o.user_id, o.total, users.id, users.name '
+           'FROM orders AS o LEFT OUTER JOIN users ON (users.id = o.user_id)')
+    assert schema.expand(select) == (sql, ())
+
+
+def test_expand_table_wildcard(schema):
+    T = schema.T
+    select = SELECT(T.users(), C.total).FROM(T.orders).LEFT_JOIN(T.users, USING=C.id)
+    sql = ('SELECT users.id, users.name, total '
+           'FROM orders LEFT OUTER JOIN users USING (id)')
+    assert schema.expand(select) == (sql, ())
+
+
+def test_expand_unknown_keeps_wildcard(schema):
+    select = SELECT().FROM(schema.T.orders).CROSS_JOIN(T.other)
+    assert schema.expand(select) == ('SELECT * FROM orders CROSS JOIN other', ())
+
+
+def test_validate(schema):
+    orders = A.o(schema.T.orders)
+    select = SELECT(orders.total).FROM(orders)
+    assert schema.validate(select) is select
+    with pytest.raises(AttributeError):
+        schema.validate(SELECT(T.o().price).FROM(orders))
+    with pytest.raises(AttributeError):
+        schema.validate(SELECT().FROM(T.products))
+
+
+def test_unique_keys(schema):
+    assert schema.unique_keys() == {'orders': [('id',)], 'users': [('id',)]}
+    assert schema['orders'].indexed('user_id')
+    assert not schema['orders'].indexed('total')
+    T = schema.T
+    select = (SELECT(T.orders.total).FROM(T.orders)
+              .LEFT_JOIN(T.users, ON=(T.orders.user_id == T.users.id)))
+    assert eliminate_joins(select, schema.unique_keys()) == (
+        'SELECT orders.total FROM orders', ())
+
+
+def test_load(tmpdir):
+    dump = {
+        'columns': [
+            {'table_name': 'orders', 'column_name': 'total',
+             'data_type': 'numeric', 'ordinal_position': 2},
+            {'table_name': 'orders', 'column_name': 'id', 'data_type': 'integer',
+             'is_nullable': 'NO', 'ordinal_position': 1},
+        ],
+        'constraints': [
+            {'table_name': 'orders', 'constraint_name': 'orders_pkey',
+             'constraint_type': 'PRIMARY KEY', 'column_name': 'id',
+             'ordinal_position': 1},
+        ],
+        'indexes': [
+            {'table_name': 'orders', 'index_name': 'orders_total',
+             'column_name': 'total', 'ordinal_position': 1, 'is_unique': 'NO'},
+        ],
+    }
+    path = tmpdir.join('schema.json')
+    path.write(json.dumps(dump))
+    schema = Schema.load(str(path))
+    orders = schema['orders']
+    assert list(orders.columns) == ['id', 'total']
+    assert orders.columns['id'].type == 'integer'
+    assert not orders.columns['id'].nullable
+    assert orders.unique_keys == [('id',)]
+    assert orders.indexes == {'orders_total': ('total',)}
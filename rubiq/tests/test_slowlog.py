@@ -0,0 +1,85 @@
+import json
+import pytest
+from rubiq.query import *
+from rubiq.slowlog import SlowQueryLog
+from rubiq.sqlite import SQLiteConnection
+
+
+def entries(path):
+    with open(str(path)) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_slow_queries(connection, tmp_path):
+    path = tmp_path / 'slow.log'
+    with SlowQueryLog(str(path), threshold=0, explain='EXPLAIN QUERY PLAN',
+                      analyze=None):
+        SELECT(C.name).FROM(T.users).WHERE(C.id == 2).execute(connection)
+    entry, = entries(path)
+    assert entry['sql'] == 'SELECT "name" FROM "users" WHERE ("id" = %s)'
+    assert entry['args'] == [2]
+    assert entry['statement'] == 'SELECT name FROM users WHERE (id = ?)'
+    assert entry['fingerprint'] == SELECT(C.name).FROM(T.users).WHERE(C.id == 1).fingerprint().digest
+    assert entry['analyzed'] is False
+    assert 'users' in str(entry['explain'])
+    # uninstalled
+    SELECT(C.name).FROM(T.users).execute(connection)
+    assert len(entries(path)) == 1
+
+
+def test_threshold(connection, tmp_path):
+    path = tmp_path / 'slow.log'
+    with SlowQueryLog(str(path), threshold=60):
+        SELECT(C.name).FROM(T.users).execute(connection)
+    assert entries(path) == []
+
+
+def test_redact_and_explain_error(connection, tmp_path):
+    path = tmp_path / 'slow.log'
+    with SlowQueryLog(str(path), threshold=0, analyze='EXPLAIN ANALYZE',
+                      sample=1, redact=True):
+        SELECT(C.name).FROM(T.users).WHERE(C.name == 'Bob').execute(connection)
+    entry, = entries(path)
+    assert entry['args'] == ['<redacted>']
+    # SQLite does not know EXPLAIN ANALYZE
+    assert 'explain_error' in entry
+
+
+def test_failed_queries(connection, tmp_path):
+    path = tmp_path / 'slow.log'
+    with SlowQueryLog(str(path), threshold=0, explain=None):
+        with pytest.raises(Exception):
+            SELECT(C.name).FROM(T.missing).execute(connection)
+    entry, = entries(path)
+    assert 'missing' in entry['error']
+    assert entry['execute_time'] >= 0
+
+
+def test_explain_keeps_transaction(connection, tmp_path):
+    path = tmp_path / 'slow.log'
+    connection.execute("INSERT INTO users VALUES (3, 'Carol')")
+    assert connection.in_transaction
+    with SlowQueryLog(str(path), threshold=0, analyze='EXPLAIN ANALYZE', sample=1):
+        SELECT(C.name).FROM(T.users).execute(connection)
+    assert 'explain_error' in entries(path)[0]
+    # the failed EXPLAIN was rolled back to its savepoint only
+    assert connection.in_transaction
+    assert SELECT(C.name).FROM(T.users).WHERE(C.id == 3).execute(connection).fetchall() == [('Carol',)]
+    connection.rollback()
+    assert SELECT(C.name).FROM(T.users).WHERE(C.id == 3).execute(connection).fetchall() == []
+
+
+def test_explain_connection(tmp_path):
+    database = str(tmp_path / 'test.db')
+    SQLiteConnection(database).executescript('CREATE TABLE users (id INTEGER, name TEXT);')
+    connections = []
+
+    def connect():
+        connections.append(SQLiteConnection(database))
+        return connections[-1]
+
+    path = tmp_path / 'slow.log'
+    with SlowQueryLog(str(path), threshold=0, explain='EXPLAIN QUERY PLAN', connect=connect):
+        SELECT(C.name).FROM(T.users).execute(SQLiteConnection(database))
+    assert 'users' in str(entries(path)[0]['explain'])
+    assert len(connections) == 1
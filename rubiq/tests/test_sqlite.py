@@ -0,0 +1,36 @@
+import pytest
+from rubiq.query import *
+from rubiq.sqlite import SQLiteConnection
+
+
+@pytest.fixture
+def connection(connection):
+    connection.executescript('''
+        ALTER TABLE users ADD COLUMN "group" TEXT;
+        UPDATE users SET "group" = CASE id WHEN 1 THEN 'admin' ELSE 'staff' END;
+        INSERT INTO users VALUES (3, 'Carol', 'staff');
+    ''')
+    return connection
+
+
+def test_quote_identifier(connection):
+    sql, args = SELECT(T.users().group).FROM(T.users)._as_sql(connection, {})
+    assert sql == 'SELECT "users"."group" FROM "users"'
+
+
+def test_execute(connection):
+    select = (SELECT(C.name).FROM(T.users)
+              .WHERE(IN(C.id, (1, 3))).ORDER_BY(C.id))
+    assert select.execute(connection).fetchall() == [('Alice',), ('Carol',)]
+
+
+def test_ilike(connection):
+    select = SELECT(C.id).FROM(T.users).WHERE(ILIKE(C.name, 'BOB'))
+    assert select.execute(connection).fetchall() == [(2,)]
+    select = SELECT(F.count(C)).FROM(T.users).WHERE(NOT_ILIKE(C.name, 'BOB'))
+    assert select.execute(connection).fetchone() == (2,)
+
+
+def test_bind():
+    connection = SQLiteConnection()
+    assert connection.bind('SELECT %s /* 100%% */', [1]) == ('SELECT ? /* 100% */', (1,))
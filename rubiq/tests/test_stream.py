@@ -0,0 +1,77 @@
+import pytest
+from rubiq.dummy import dummy_connection
+from rubiq.query import *
+from rubiq.query.optimize import extract_subqueries
+from rubiq.sql.base import SQL
+from rubiq.sql.stream import stream
+from rubiq.sql.tree import single_pass
+
+
+def query(ids, rows):
+    return (SELECT(C.id).FROM(A.v(VALUES.from_rows(rows)))
+            .WHERE(AND(C.a == 1, IN(C.id, ids), C.b == 2)))
+
+
+def render(query):
+    return query._as_sql(dummy_connection, {})
+
+
+def test_stream():
+    expected = render(query(list(range(7)), [(i, 'x') for i in range(5)]))
+    chunks = list(stream(query((i for i in range(7)), ((i, 'x') for i in range(5))),
+                         dummy_connection, batch_size=3))
+    assert SQL.merge(chunks, sep='') == expected
+    assert chunks[1] == ('VALUES (%s, %s), (%s, %s), (%s, %s', (0, 'x', 1, 'x', 2, 'x'))
+    assert chunks[5] == ('%s, %s, %s', (0, 1, 2))
+    for sql, args in chunks:
+        assert sql.count('%s') == len(args)
+
+
+def test_nested():
+    inner = IN(C.id, (i for i in range(3)))
+    outer = SELECT(C.id).FROM(T.t).WHERE(IN(inner, (i for i in range(4))))
+    chunks = list(stream(outer, dummy_connection, batch_size=2))
+    assert SQL.merge(chunks, sep='') == render(
+        SELECT(C.id).FROM(T.t).WHERE(IN(IN(C.id, [0, 1, 2]), [0, 1, 2, 3])))
+
+
+def test_single_pass():
+    values = query((i for i in range(3)), [(1, 'x')])
+    assert single_pass(values)
+    assert not single_pass(query([1], [(1, 'x')]))
+    assert render(values)[1] == (1, 'x', 1, 0, 1, 2, 2)
+    # consumed by the first rendering
+    with pytest.raises(ValueError, match='consumed'):
+        render(values)
+    with pytest.raises(ValueError, match='consumed'):
+        list(stream(values, dummy_connection))
+    rows = VALUES.from_rows((i, 'x') for i in range(2))
+    list(stream(rows, dummy_connection))
+    with pytest.raises(ValueError, match='consumed'):
+        render(SELECT().FROM(rows))
+    assert not single_pass(query((i for i in range(3)), [(1, 'x')]).freeze())
+    with pytest.raises(ValueError, match='No rows'):
+        list(stream(VALUES.from_rows(iter([])), dummy_connection))
+    with pytest.raises(ValueError, match='No rows'):
+        render(VALUES.from_rows([]))
+
+
+def test_fingerprint():
+    rows = ((i, 'x') for i in range(3))
+    ids = (i for i in range(3))
+    values = query(ids, rows)
+    assert values.fingerprint().sql == (
+        'SELECT id FROM (VALUES (...)) AS v WHERE ((a = ?) AND (id IN (...)) AND (b = ?))')
+    assert SELECT(C.id).FROM(T.t).WHERE(C.id == ANY(i for i in range(3))).fingerprint().sql == (
+        'SELECT id FROM t WHERE (id = ANY(?))')
+    assert next(rows) == (0, 'x') and next(ids) == 0
+
+
+def test_extract_subqueries():
+    def subquery():
+        return SELECT(C.id).FROM(T.t).WHERE(IN(C.id, (i for i in range(3))))
+
+    selected = SELECT(C.id).FROM(T.t).WHERE(OR(IN(C.id, subquery()), IN(C.id, subquery())))
+    extract_subqueries(selected)
+    assert not selected.cte
+    assert render(selected)[1] == (0, 1, 2, 0, 1, 2)
@@ -0,0 +1,86 @@
+import datetime
+import json
+import pytest
+import rubiq
+from rubiq.dummy import dummy_connection
+from rubiq.query import *
+from rubiq.sqlite import SQLiteConnection
+from rubiq.templates import TemplateCache, compile_template
+
+
+def by_id():
+    return SELECT(C.name).FROM(T.users).WHERE(AND(C.id == V.id, C.active == 1)).LIMIT(V.limit)
+
+
+def test_compile():
+    template = compile_template(by_id(), dummy_connection)
+    assert template.sql == 'SELECT name FROM users WHERE ((id = %s) AND (active = %s)) LIMIT %s'
+    assert template.variables == {'id', 'limit'}
+    assert template.bind(id=3, limit=10) == (template.sql, (3, 1, 10))
+    assert template.bind(id=3, limit=10) == by_id()._as_sql(dummy_connection, {'id': 3, 'limit': 10})
+    assert template.fingerprint == by_id().fingerprint().digest
+    with pytest.raises(KeyError):
+        template.bind(id=3)
+
+
+def test_execute():
+    connection = SQLiteConnection()
+    connection.executescript('''
+        CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, active BOOLEAN);
+        INSERT INTO users VALUES (1, 'Alice', 1), (2, 'Bob', 1);
+    ''')
+    template = compile_template(by_id(), connection)
+    assert template.execute(connection, id=2, limit=1).fetchall() == [('Bob',)]
+
+
+def test_cache(tmp_path):
+    path = str(tmp_path / 'templates.cache')
+    builds = []
+
+    def build():
+        builds.append(1)
+        return by_id()
+
+    cache = TemplateCache(path, dummy_connection)
+    template = cache.get('by_id', build)
+    assert cache.get('by_id', build) is template
+    cache.save()
+
+    cache = TemplateCache(path, dummy_connection)
+    assert 'by_id' in cache and len(cache) == 1
+    assert cache.get('by_id', build).bind(id=1, limit=2) == template.bind(id=1, limit=2)
+    assert len(builds) == 1
+
+    # other dialects are compiled separately
+    sqlite = TemplateCache(path, SQLiteConnection())
+    assert 'by_id' not in sqlite
+    assert '"users"' in sqlite.get('by_id', build).sql
+
+
+def test_stale(tmp_path, monkeypatch):
+    path = str(tmp_path / 'templates.cache')
+    cache = TemplateCache(path, dummy_connection, version=1)
+    cache.get('by_id', by_id)
+    cache.save()
+    assert 'by_id' not in TemplateCache(path, dummy_connection, version=2)
+    monkeypatch.setattr('rubiq.templates.__version__', rubiq.__version__ + '.1')
+    assert 'by_id' not in TemplateCache(path, dummy_connection, version=1)
+    with open(path, 'wb') as f:
+        f.write(b'garbage')
+    assert len(TemplateCache(path, dummy_connection)) == 0
+
+
+def test_json(tmp_path):
+    path = str(tmp_path / 'templates.cache')
+    cache = TemplateCache(path, dummy_connection)
+    cache.get('by_id', by_id)
+    cache.get('dated', lambda: SELECT(C.id).FROM(T.users).WHERE(
+        C.created > datetime.date(2020, 1, 1)))
+    cache.save()
+    with open(path) as f:
+        entry, = json.load(f)['templates']
+    assert entry['slots'] == [[True, 'id'], [False, 1], [True, 'limit']]
+    cache = TemplateCache(path, dummy_connection)
+    assert 'by_id' in cache and 'dated' not in cache
+    assert cache.get('by_id', by_id).bind(id=1, limit=2) == by_id()._as_sql(
+        dummy_connection, {'id': 1, 'limit': 2})